@@ -1,26 +1,31 @@
 """FastAPI application for SHL Assessment Recommender."""
 import sys
 import os
+import re
+import json
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import logging
+import time
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
 from config import Config
 from api.schemas import (
     RecommendRequest,
+    BatchRecommendRequest,
     RecommendResponse,
     HealthResponse,
     ErrorResponse,
     Recommendation
 )
 from rag.recommender import Recommender
+from monitoring.metrics import REGISTRY, collect_stage_timings, render_cache_stats
 
 logging.basicConfig(level=Config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
@@ -28,6 +33,20 @@ logger = logging.getLogger(__name__)
 # Global recommender instance
 recommender = None
 
+REQUESTS_IN_FLIGHT = REGISTRY.gauge('shl_http_requests_in_flight', 'HTTP requests currently being served')
+REQUESTS_TOTAL = REGISTRY.counter('shl_http_requests_total', 'HTTP requests served', ['path', 'status'])
+REQUEST_DURATION = REGISTRY.histogram('shl_http_request_duration_seconds', 'HTTP request latency', ['path'])
+
+
+def _cache_metrics():
+    """Cache hit/miss metrics for the /metrics endpoint."""
+    if recommender is None:
+        return []
+    return render_cache_stats(recommender.get_cache_stats())
+
+
+REGISTRY.register_collector(_cache_metrics)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -70,10 +89,26 @@ app.add_middleware(
 
 @app.middleware("http")
 async def log_requests(request, call_next):
-    """Log all requests."""
+    """Log all requests and record request metrics."""
     logger.info(f"{request.method} {request.url.path}")
-    response = await call_next(request)
-    logger.info(f"Response status: {response.status_code}")
+    start = time.perf_counter()
+    status_code = 500
+    
+    REQUESTS_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        
+        # Label by route template so unknown paths can't blow up metric cardinality
+        route = request.scope.get('route')
+        path = route.path if route is not None else 'unmatched'
+        elapsed = time.perf_counter() - start
+        REQUEST_DURATION.observe(elapsed, path=path)
+        REQUESTS_TOTAL.inc(path=path, status=status_code)
+    
+    logger.info(f"Response status: {status_code} ({elapsed * 1000:.1f}ms)")
     return response
 
 
@@ -87,6 +122,9 @@ async def root():
         "endpoints": {
             "health": "/health",
             "recommend": "/recommend",
+            "recommend_stream": "/recommend/stream",
+            "recommend_batch": "/recommend/batch",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
@@ -108,6 +146,76 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get(
+    "/metrics",
+    tags=["Health"],
+    summary="Prometheus metrics",
+    response_class=PlainTextResponse
+)
+async def metrics():
+    """
+    Expose metrics in the Prometheus text format.
+    
+    Includes per-stage pipeline latency histograms, HTTP request latency and
+    counts, in-flight requests, and cache hit rates.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+def _format_assessment(rec):
+    """
+    Format a recommendation or retrieved product according to the API specification.
+    
+    Args:
+        rec: Enriched recommendation or retrieved product dictionary
+    
+    Returns:
+        dict: Assessment with url, name, adaptive_support, description,
+            duration (minutes), remote_support and test_type (list)
+    """
+    name = rec.get('assessment_name') or rec.get('name') or rec.get('product_name') or ''
+    
+    # Get the assessment URL
+    url = rec.get('assessment_url') or rec.get('url') or ''
+    if not url or url == 'N/A':
+        # Try to construct URL from name
+        if name:
+            # Create a slug from the name
+            slug = name.lower().replace(' ', '-').replace('/', '-')
+            url = f"https://www.shl.com/solutions/products/{slug}/"
+    
+    # Get test type as list
+    test_type = rec.get('test_type', '')
+    if isinstance(test_type, str):
+        test_type_list = [test_type] if test_type and test_type != 'N/A' else []
+    else:
+        test_type_list = test_type if test_type else []
+    
+    # Get duration as integer
+    duration_str = rec.get('duration', '0')
+    if isinstance(duration_str, str):
+        # Extract first number from duration string (e.g., "20-45 minutes" -> 20)
+        duration_match = re.search(r'\d+', duration_str)
+        duration = int(duration_match.group()) if duration_match else 0
+    else:
+        duration = int(duration_str) if duration_str else 0
+    
+    return {
+        "url": url,
+        "name": name,
+        "adaptive_support": "No",  # Default value, can be enhanced
+        "description": rec.get('description', ''),
+        "duration": duration,
+        "remote_support": "Yes",  # Default value, can be enhanced
+        "test_type": test_type_list
+    }
+
+
+def _stream_event(event, data):
+    """Encode one NDJSON stream line."""
+    return json.dumps({"event": event, "data": data}, default=str) + "\n"
+
+
 @app.post(
     "/recommend",
     tags=["Recommendations"],
@@ -153,11 +261,13 @@ async def get_recommendations(request: RecommendRequest):
         )
     
     try:
-        # Generate recommendations
-        result = recommender.recommend(
-            query=request.query,
-            top_k=min(request.top_k, 10)  # Max 10 as per spec
-        )
+        # Generate recommendations (embedding/search run on a thread pool, LLM call is awaited)
+        with collect_stage_timings() as timings:
+            result = await recommender.arecommend(
+                query=request.query,
+                top_k=min(request.top_k, 10),  # Max 10 as per spec
+                mode=request.mode
+            )
         
         # Check for errors in result
         if 'error' in result:
@@ -167,48 +277,15 @@ async def get_recommendations(request: RecommendRequest):
             )
         
         # Format recommendations according to exact API specification
-        recommendations = []
-        for rec in result['recommendations']:
-            # Get the assessment URL
-            url = rec.get('assessment_url', rec.get('url', ''))
-            if not url or url == 'N/A':
-                # Try to construct URL from name
-                name = rec.get('assessment_name', rec.get('name', ''))
-                if name:
-                    # Create a slug from the name
-                    slug = name.lower().replace(' ', '-').replace('/', '-')
-                    url = f"https://www.shl.com/solutions/products/{slug}/"
-            
-            # Get test type as list
-            test_type = rec.get('test_type', '')
-            if isinstance(test_type, str):
-                test_type_list = [test_type] if test_type and test_type != 'N/A' else []
-            else:
-                test_type_list = test_type if test_type else []
-            
-            # Get duration as integer
-            duration_str = rec.get('duration', '0')
-            if isinstance(duration_str, str):
-                # Extract first number from duration string (e.g., "20-45 minutes" -> 20)
-                import re
-                duration_match = re.search(r'\d+', duration_str)
-                duration = int(duration_match.group()) if duration_match else 0
-            else:
-                duration = int(duration_str) if duration_str else 0
-            
-            recommendations.append({
-                "url": url,
-                "name": rec.get('assessment_name', rec.get('name', '')),
-                "adaptive_support": "No",  # Default value, can be enhanced
-                "description": rec.get('description', ''),
-                "duration": duration,
-                "remote_support": "Yes",  # Default value, can be enhanced
-                "test_type": test_type_list
-            })
+        recommendations = [_format_assessment(rec) for rec in result['recommendations']]
         
-        return {
+        response = {
             "recommended_assessments": recommendations
         }
+        if request.debug:
+            response["timings_ms"] = dict(timings, total=result.get('processing_time', 0) * 1000)
+        
+        return response
     
     except HTTPException:
         raise
@@ -220,6 +297,148 @@ async def get_recommendations(request: RecommendRequest):
         )
 
 
+@app.post(
+    "/recommend/stream",
+    tags=["Recommendations"],
+    summary="Stream assessment recommendations",
+    status_code=200,
+    responses={
+        200: {"description": "NDJSON stream of recommendation events"},
+        400: {"description": "Invalid request"},
+        500: {"description": "Internal server error"}
+    }
+)
+async def stream_recommendations(request: RecommendRequest):
+    """
+    Stream assessment recommendations as newline-delimited JSON.
+    
+    Each line is an object {"event": ..., "data": ...}:
+    - retrieval: top-k assessments from vector search, sent before the LLM runs
+    - token: a chunk of LLM output text (not sent in fast mode)
+    - final: the LLM-ranked assessments, in the /recommend response format
+    - error: the request failed; data holds the error message
+    """
+    global recommender
+    
+    if recommender is None:
+        logger.error("Recommender not initialized")
+        raise HTTPException(
+            status_code=500,
+            detail="Recommendation service not available"
+        )
+    
+    if not request.query.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="Query cannot be empty"
+        )
+    
+    async def event_stream():
+        try:
+            async for event, payload in recommender.astream_recommend(
+                query=request.query,
+                top_k=min(request.top_k, 10),  # Max 10 as per spec
+                mode=request.mode
+            ):
+                if event == 'retrieval':
+                    yield _stream_event(event, [_format_assessment(doc) for doc in payload])
+                elif event == 'token':
+                    yield _stream_event(event, payload)
+                elif 'error' in payload:
+                    yield _stream_event('error', payload['error'])
+                else:
+                    yield _stream_event(event, {
+                        "recommended_assessments": [
+                            _format_assessment(rec) for rec in payload['recommendations']
+                        ]
+                    })
+        
+        except Exception as e:
+            logger.error(f"Error streaming recommendations: {e}", exc_info=True)
+            yield _stream_event('error', f"Failed to generate recommendations: {str(e)}")
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+def _format_batch_item(index, query, result):
+    """Format one /recommend/batch result, or its error."""
+    if 'error' in result:
+        return {"index": index, "query": query, "error": result['error']}
+    
+    return {
+        "index": index,
+        "query": query,
+        "recommended_assessments": [_format_assessment(rec) for rec in result['recommendations']]
+    }
+
+
+@app.post(
+    "/recommend/batch",
+    tags=["Recommendations"],
+    summary="Get assessment recommendations for many queries",
+    status_code=200,
+    responses={
+        200: {"description": "Per-item results (JSON, or NDJSON when streaming)"},
+        500: {"description": "Internal server error"}
+    }
+)
+async def batch_recommendations(request: BatchRecommendRequest):
+    """
+    Generate recommendations for a list of requests in one call.
+    
+    All queries are embedded and searched as one matrix and their LLM calls
+    run concurrently. Each item gets its own result or error, so one bad item
+    doesn't fail the batch. Results carry the index of the request they
+    answer; with stream=true they are sent as NDJSON lines in completion order.
+    """
+    global recommender
+    
+    if recommender is None:
+        logger.error("Recommender not initialized")
+        raise HTTPException(
+            status_code=500,
+            detail="Recommendation service not available"
+        )
+    
+    items = request.requests
+    valid = [i for i, item in enumerate(items) if item.query.strip()]
+    invalid_results = [
+        {"index": i, "query": item.query, "error": "Query cannot be empty"}
+        for i, item in enumerate(items) if not item.query.strip()
+    ]
+    batch = [(items[i].query, min(items[i].top_k, 10), items[i].mode) for i in valid]  # Max 10 as per spec
+    
+    async def item_results():
+        for result in invalid_results:
+            yield result
+        async for j, result in recommender.aiter_recommend_batch(batch):
+            yield _format_batch_item(valid[j], items[valid[j]].query, result)
+    
+    if request.stream:
+        async def event_stream():
+            try:
+                async for result in item_results():
+                    yield json.dumps(result, default=str) + "\n"
+            except Exception as e:
+                logger.error(f"Error streaming batch recommendations: {e}", exc_info=True)
+                yield json.dumps({"error": f"Failed to generate recommendations: {str(e)}"}) + "\n"
+        
+        return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+    
+    try:
+        results = [result async for result in item_results()]
+    except Exception as e:
+        logger.error(f"Error generating batch recommendations: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate recommendations: {str(e)}"
+        )
+    
+    return {
+        "results": sorted(results, key=lambda result: result["index"])
+    }
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler."""
@@ -1,5 +1,5 @@
 """Pydantic schemas for API request/response validation."""
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 
 
@@ -7,6 +7,8 @@ class RecommendRequest(BaseModel):
     """Request schema for recommendation endpoint."""
     query: str = Field(..., description="Natural language query, job description text, or URL containing JD", min_length=1)
     top_k: int = Field(10, description="Number of recommendations to return", ge=1, le=10)
+    mode: Optional[Literal["llm", "fast"]] = Field(None, description="Ranking mode: \"llm\" or \"fast\" (local reranker, no LLM call); defaults to the server setting")
+    debug: bool = Field(False, description="Include per-stage timings (ms) in the response")
     
     class Config:
         json_schema_extra = {
@@ -17,6 +19,23 @@ class RecommendRequest(BaseModel):
         }
 
 
+class BatchRecommendRequest(BaseModel):
+    """Request schema for the batch recommendation endpoint."""
+    requests: List[RecommendRequest] = Field(..., description="Recommendation requests to process", min_length=1, max_length=500)
+    stream: bool = Field(False, description="Stream per-item results as NDJSON as they finish")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "requests": [
+                    {"query": "Java developers who collaborate with business teams", "top_k": 5},
+                    {"query": "Entry-level sales representatives", "top_k": 5}
+                ],
+                "stream": False
+            }
+        }
+
+
 class Recommendation(BaseModel):
     """Schema for a single recommendation."""
     assessment_name: str = Field(..., description="Name of the recommended assessment")
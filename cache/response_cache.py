@@ -0,0 +1,146 @@
+"""Exact-match cache for full recommendation responses."""
+import json
+import hashlib
+import logging
+from config import Config
+from cache.lru_cache import LRUCache
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('none', 'memory', 'sqlite')
+
+
+class ResponseCache:
+    """
+    Cache Recommender results keyed on normalized query, k, template, index
+    version and the LLM settings that produced them.
+    
+    Entries are stored as JSON so every hit returns an independent copy.
+    Including the index version in the key means a rebuilt vector store never
+    serves stale answers; check_index_version() additionally purges them.
+    Likewise a persisted cache is not served after the LLM model, temperature
+    or prompt template changes.
+    """
+    
+    def __init__(self, backend='memory', max_size=512, ttl=None, path=None):
+        """
+        Initialize response cache.
+        
+        Args:
+            backend: "memory" (in-process LRU) or "sqlite" (local file)
+            max_size: Maximum number of cached responses
+            ttl: Entry lifetime in seconds (None or 0 = never expire)
+            path: SQLite file path, relative to Config.BASE_DIR (sqlite backend only)
+        """
+        if backend == 'sqlite':
+            from cache.sqlite_cache import SQLiteCache
+            self.backend = SQLiteCache(
+                Config.BASE_DIR / (path or Config.RESPONSE_CACHE_PATH), max_size=max_size, ttl=ttl
+            )
+        elif backend == 'memory':
+            self.backend = LRUCache(max_size=max_size, ttl=ttl)
+        else:
+            raise ValueError(f"Unknown response cache backend '{backend}'. Expected one of: {', '.join(BACKENDS)}")
+        
+        self.backend_name = backend
+        self.index_version = None
+    
+    @staticmethod
+    def make_key(query, top_k, template_type, index_version, model=None, temperature=None,
+                 prompt_version=None, **extra):
+        """
+        Build a stable cache key.
+        
+        Args:
+            query: Raw query string (lowercased and whitespace-collapsed before
+                hashing; punctuation is kept so "C#" and "C++" stay distinct)
+            top_k: Number of recommendations requested
+            template_type: Prompt template type
+            index_version: Vector store version the answer was produced from
+            model: LLM model the answer was generated with
+            temperature: LLM sampling temperature
+            prompt_version: Fingerprint of the prompt template (see rag.prompt.prompt_version)
+            **extra: Any other request options that change the response
+        
+        Returns:
+            str: Hex digest key
+        """
+        key_data = {
+            'query': " ".join(query.lower().split()),
+            'top_k': top_k,
+            'template_type': template_type,
+            'index_version': index_version,
+            'model': model,
+            'temperature': temperature,
+            'prompt_version': prompt_version,
+        }
+        key_data.update(extra)
+        payload = json.dumps(key_data, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def check_index_version(self, index_version):
+        """
+        Drop all entries if the vector store has been rebuilt since the last call.
+        
+        Args:
+            index_version: Current vector store version
+        """
+        if self.index_version is not None and self.index_version != index_version:
+            logger.info(f"Vector store version changed to {index_version}, clearing response cache")
+            self.backend.clear()
+        self.index_version = index_version
+    
+    def get(self, key):
+        """
+        Get a cached response.
+        
+        Args:
+            key: Key from make_key()
+        
+        Returns:
+            dict: Cached result, or None on a miss
+        """
+        data = self.backend.get(key)
+        if data is None:
+            return None
+        return json.loads(data)
+    
+    def set(self, key, result):
+        """
+        Cache a response.
+        
+        Args:
+            key: Key from make_key()
+            result: JSON-serializable result dict
+        """
+        self.backend.set(key, json.dumps(result, ensure_ascii=False).encode('utf-8'))
+    
+    def invalidate(self):
+        """Remove all cached responses."""
+        self.backend.clear()
+    
+    def stats(self):
+        """Get hit/miss counters and size."""
+        stats = self.backend.stats()
+        stats['backend'] = self.backend_name
+        return stats
+
+
+def create_response_cache():
+    """
+    Create the response cache configured in Config.
+    
+    Returns:
+        ResponseCache: Cache instance, or None if RESPONSE_CACHE_BACKEND is "none"
+    """
+    backend = Config.RESPONSE_CACHE_BACKEND
+    if backend == 'none' or Config.RESPONSE_CACHE_SIZE <= 0:
+        return None
+    
+    return ResponseCache(
+        backend=backend,
+        max_size=Config.RESPONSE_CACHE_SIZE,
+        ttl=Config.RESPONSE_CACHE_TTL,
+        path=Config.RESPONSE_CACHE_PATH
+    )
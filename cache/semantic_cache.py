@@ -0,0 +1,181 @@
+"""Semantic (near-duplicate) cache of LLM answers backed by a small FAISS index."""
+import json
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+import faiss
+from config import Config
+from monitoring.metrics import SEMANTIC_CACHE_SIMILARITY
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    Reuse a cached answer when a new query is a near-duplicate of a past one.
+    
+    Past query embeddings are kept in an inner-product FAISS index over unit
+    vectors, so search scores are cosine similarities. A hit requires the
+    similarity to pass the threshold AND the retrieved document set, top_k,
+    template and index version to match the cached entry exactly, so the LLM
+    would have been given the same context.
+    """
+    
+    def __init__(self, threshold=0.95, max_size=1000, candidates=5):
+        """
+        Initialize semantic cache.
+        
+        Args:
+            threshold: Minimum cosine similarity for a hit
+            max_size: Maximum number of cached answers (LRU eviction)
+            candidates: Nearest cached queries to check per lookup
+        """
+        self.threshold = threshold
+        self.max_size = max_size
+        self.candidates = candidates
+        
+        self.index = None
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        
+        self.lookups = 0
+        self.hits = 0
+        self.near_misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def _normalize(embedding):
+        """Convert an embedding to a unit-length (1, d) float32 matrix."""
+        vector = np.array(embedding, dtype='float32').reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+    
+    @staticmethod
+    def _context_key(doc_ids, top_k, template_type, index_version):
+        """Everything besides the query text that determines the LLM answer."""
+        return (frozenset(doc_ids), top_k, template_type, index_version)
+    
+    def lookup(self, query_embedding, doc_ids, top_k, template_type, index_version):
+        """
+        Find a cached answer for a near-duplicate query with the same context.
+        
+        Args:
+            query_embedding: Embedding of the new query
+            doc_ids: Product ids retrieved for the new query
+            top_k: Number of recommendations requested
+            template_type: Prompt template type
+            index_version: Vector store version
+        
+        Returns:
+            tuple: (cached result dict, similarity) or (None, best similarity)
+        """
+        context = self._context_key(doc_ids, top_k, template_type, index_version)
+        
+        with self._lock:
+            self.lookups += 1
+            
+            if self.index is None or self.index.ntotal == 0:
+                return None, 0.0
+            
+            vector = self._normalize(query_embedding)
+            if vector.shape[1] != self.index.d:
+                return None, 0.0
+            
+            k = min(self.candidates, self.index.ntotal)
+            similarities, ids = self.index.search(vector, k)
+            best_similarity = float(similarities[0][0]) if ids[0][0] >= 0 else 0.0
+            
+            for similarity, entry_id in zip(similarities[0], ids[0]):
+                if entry_id < 0 or similarity < self.threshold:
+                    break
+                
+                entry = self._entries.get(int(entry_id))
+                if entry is None:
+                    continue
+                
+                if entry['context'] == context:
+                    self._entries.move_to_end(int(entry_id))
+                    self.hits += 1
+                    SEMANTIC_CACHE_SIMILARITY.observe(float(similarity), outcome='hit')
+                    return json.loads(entry['result']), float(similarity)
+            
+            if best_similarity >= self.threshold:
+                # Similar wording, but retrieval produced a different context
+                self.near_misses += 1
+                SEMANTIC_CACHE_SIMILARITY.observe(best_similarity, outcome='near_miss')
+            else:
+                SEMANTIC_CACHE_SIMILARITY.observe(best_similarity, outcome='miss')
+            
+            return None, best_similarity
+    
+    def add(self, query_embedding, doc_ids, top_k, template_type, index_version, result):
+        """
+        Cache an LLM answer for a query.
+        
+        Args:
+            query_embedding: Embedding of the query
+            doc_ids: Product ids retrieved for the query
+            top_k: Number of recommendations requested
+            template_type: Prompt template type
+            index_version: Vector store version
+            result: JSON-serializable result dict
+        """
+        vector = self._normalize(query_embedding)
+        
+        with self._lock:
+            if self.index is None or self.index.d != vector.shape[1]:
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+                self._entries.clear()
+            
+            entry_id = self._next_id
+            self._next_id += 1
+            
+            self.index.add_with_ids(vector, np.array([entry_id], dtype='int64'))
+            self._entries[entry_id] = {
+                'context': self._context_key(doc_ids, top_k, template_type, index_version),
+                'result': json.dumps(result, ensure_ascii=False),
+            }
+            
+            while len(self._entries) > self.max_size:
+                evicted_id, _ = self._entries.popitem(last=False)
+                self.index.remove_ids(np.array([evicted_id], dtype='int64'))
+                self.evictions += 1
+    
+    def clear(self):
+        """Remove all cached answers."""
+        with self._lock:
+            self.index = None
+            self._entries.clear()
+    
+    def stats(self):
+        """Get hit rate, threshold and eviction metrics."""
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'threshold': self.threshold,
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'misses': self.lookups - self.hits,
+            'near_misses': self.near_misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / self.lookups if self.lookups else 0.0,
+        }
+
+
+def create_semantic_cache():
+    """
+    Create the semantic cache configured in Config.
+    
+    Returns:
+        SemanticCache: Cache instance, or None if disabled
+    """
+    if not Config.SEMANTIC_CACHE_ENABLED:
+        return None
+    
+    return SemanticCache(
+        threshold=Config.SEMANTIC_CACHE_THRESHOLD,
+        max_size=Config.SEMANTIC_CACHE_SIZE
+    )
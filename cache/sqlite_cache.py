@@ -0,0 +1,141 @@
+"""Disk-backed key/value cache stored in a local SQLite file."""
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from config import Config
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+
+class SQLiteCache:
+    """Persistent LRU cache of bytes values with optional TTL."""
+    
+    def __init__(self, path, max_size=10000, ttl=None):
+        """
+        Open (or create) a cache file.
+        
+        Args:
+            path: Path to the SQLite database file
+            max_size: Maximum number of entries to keep
+            ttl: Entry lifetime in seconds (None or 0 = never expire)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.ttl = ttl or None
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+        self._conn.commit()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        logger.info(f"Opened SQLite cache at {self.path}")
+    
+    def get(self, key):
+        """
+        Get a cached value.
+        
+        Args:
+            key: Cache key (string)
+        
+        Returns:
+            bytes: Cached value, or None on a miss or expired entry
+        """
+        now = time.time()
+        
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            
+            if row is None:
+                self.misses += 1
+                return None
+            
+            value, created_at = row
+            if self.ttl and created_at + self.ttl < now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return value
+    
+    def set(self, key, value):
+        """
+        Store a value, evicting the least recently used entries if full.
+        
+        Args:
+            key: Cache key (string)
+            value: bytes to store
+        """
+        now = time.time()
+        
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, sqlite3.Binary(value), now, now)
+            )
+            
+            count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            if count > self.max_size:
+                excess = count - self.max_size
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN "
+                    "(SELECT key FROM cache ORDER BY accessed_at ASC LIMIT ?)",
+                    (excess,)
+                )
+                self.evictions += excess
+            
+            self._conn.commit()
+    
+    def delete(self, key):
+        """Remove an entry if present."""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+    
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+    
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+    
+    def stats(self):
+        """Get hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
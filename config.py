@@ -18,10 +18,30 @@ class Config:
     LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
     LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.3"))
     
+    # LLM output format: "json" (JSON mode, products referenced by id) or "text" (free-text templates)
+    LLM_OUTPUT_FORMAT = os.getenv("LLM_OUTPUT_FORMAT", "json").lower()
+    
     # Vector Store Configuration
     VECTOR_STORE_PATH = os.getenv("VECTOR_STORE_PATH", "vector_store/shl_faiss")
     EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "1536"))
     
+    # Memory-map the index, embeddings and metadata on load (read-only, shared across workers)
+    VECTOR_STORE_MMAP = os.getenv("VECTOR_STORE_MMAP", "false").lower() == "true"
+    
+    # Similarity metric: "l2" (score = 1/(1+distance)) or "cosine" (normalized inner product)
+    VECTOR_METRIC = os.getenv("VECTOR_METRIC", "l2").lower()
+    
+    # FAISS Index Configuration
+    # Index type: "flat" (exact), "hnsw", "ivf_flat" or "ivf_pq"
+    FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+    FAISS_NLIST = int(os.getenv("FAISS_NLIST", "100"))
+    FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "10"))
+    FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+    FAISS_EF_CONSTRUCTION = int(os.getenv("FAISS_EF_CONSTRUCTION", "200"))
+    FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+    FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "16"))
+    FAISS_PQ_NBITS = int(os.getenv("FAISS_PQ_NBITS", "8"))
+    
     # API Configuration
     API_HOST = os.getenv("API_HOST", "0.0.0.0")
     API_PORT = int(os.getenv("API_PORT", "8000"))
@@ -29,6 +49,67 @@ class Config:
     # Retrieval Configuration
     TOP_K_RESULTS = int(os.getenv("TOP_K_RESULTS", "5"))
     
+    # Turn duration / test type constraints stated in queries into search filters
+    QUERY_CONSTRAINTS_ENABLED = os.getenv("QUERY_CONSTRAINTS_ENABLED", "false").lower() == "true"
+    
+    # Hybrid retrieval: BM25 keyword search fused with the vector search
+    HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+    HYBRID_FUSION = os.getenv("HYBRID_FUSION", "rrf").lower()  # rrf or weighted
+    HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))  # per retriever, before fusion
+    HYBRID_SPARSE_WEIGHT = float(os.getenv("HYBRID_SPARSE_WEIGHT", "1.0"))  # dense list weighs 1
+    RRF_K = int(os.getenv("RRF_K", "60"))
+    BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+    BM25_B = float(os.getenv("BM25_B", "0.75"))
+    
+    # Chunked products are collapsed to one result: "max" scores a product by its
+    # best chunk, "sum" by the sum of its best CHUNK_SUM_TOP_N chunks
+    CHUNK_AGGREGATION = os.getenv("CHUNK_AGGREGATION", "max").lower()
+    CHUNK_SUM_TOP_N = int(os.getenv("CHUNK_SUM_TOP_N", "2"))
+    
+    # LLM context budget: products are listed in a compact table trimmed to fit
+    CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "1500"))
+    CONTEXT_DESCRIPTION_TOKENS = int(os.getenv("CONTEXT_DESCRIPTION_TOKENS", "60"))  # per product
+    CONTEXT_LIST_ITEMS = int(os.getenv("CONTEXT_LIST_ITEMS", "4"))  # target roles / skills shown per product
+    
+    # Recommendation mode: "llm" (LLM ranking) or "fast" (local reranker, no LLM call)
+    RECOMMENDER_MODE = os.getenv("RECOMMENDER_MODE", "llm").lower()
+    RERANKER = os.getenv("RERANKER", "feature").lower()  # feature or cross_encoder
+    RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+    CROSS_ENCODER_MODEL = os.getenv("CROSS_ENCODER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    
+    # Minimum trigram similarity for matching LLM-written names to catalogue products
+    NAME_MATCH_MIN_SIMILARITY = float(os.getenv("NAME_MATCH_MIN_SIMILARITY", "0.6"))
+    
+    # Threads for embedding/search work offloaded from the async API path
+    RECOMMENDER_THREAD_WORKERS = int(os.getenv("RECOMMENDER_THREAD_WORKERS", "4"))
+    
+    # Max concurrent LLM calls issued by a /recommend/batch request
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    
+    # Offline prediction runner (generate_submission.py / export_predictions.py)
+    BATCH_RUNNER_WORKERS = int(os.getenv("BATCH_RUNNER_WORKERS", "4"))
+    LLM_REQUESTS_PER_SECOND = float(os.getenv("LLM_REQUESTS_PER_SECOND", "2"))  # 0 disables
+    
+    # Query Embedding Cache
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))  # 0 disables
+    QUERY_EMBEDDING_CACHE_TTL = int(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "0"))  # seconds, 0 = no expiry
+    QUERY_EMBEDDING_CACHE_PATH = os.getenv("QUERY_EMBEDDING_CACHE_PATH", "")  # SQLite file, empty disables
+    
+    # Async query embedding micro-batching
+    EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+    EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+    
+    # Recommendation Response Cache
+    RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()  # none, memory, sqlite
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "86400"))  # seconds, 0 = no expiry
+    RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "data/cache/responses.sqlite")
+    
+    # Semantic (near-duplicate query) LLM Answer Cache
+    SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))  # cosine similarity
+    SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1000"))
+    
     # Logging
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     
@@ -3,12 +3,19 @@ import json
 import time
 import logging
 import numpy as np
+from functools import lru_cache, partial
 from pathlib import Path
 from config import Config
 
 logging.basicConfig(level=Config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
+# Input limit of the OpenAI embedding models
+OPENAI_MAX_INPUT_TOKENS = 8191
+
+# Model used unless an OpenAI embedding model is requested
+DEFAULT_HF_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
 
 class EmbeddingGenerator:
     """Generate embeddings using OpenAI or HuggingFace models."""
@@ -24,7 +31,7 @@ class EmbeddingGenerator:
             self._init_openai()
         else:
             # Default to HuggingFace
-            self.model_name = "sentence-transformers/all-MiniLM-L6-v2"
+            self.model_name = DEFAULT_HF_MODEL
             self._init_huggingface()
     
     def _init_openai(self):
@@ -41,7 +48,7 @@ class EmbeddingGenerator:
         except Exception as e:
             logger.error(f"Failed to initialize OpenAI: {e}")
             logger.info("Falling back to HuggingFace model")
-            self.model_name = "sentence-transformers/all-MiniLM-L6-v2"
+            self.model_name = DEFAULT_HF_MODEL
             self._init_huggingface()
     
     def _init_huggingface(self):
@@ -86,6 +93,30 @@ class EmbeddingGenerator:
             embedding = self.model.encode(text, convert_to_numpy=True)
             return embedding
     
+    def generate_embeddings(self, texts):
+        """
+        Generate embeddings for a list of texts in a single model call.
+        
+        Unlike generate_embeddings_batch, errors are raised rather than
+        replaced with zero vectors, which suits latency-sensitive query paths.
+        
+        Args:
+            texts: List of text strings
+        
+        Returns:
+            np.ndarray: Array of shape (len(texts), dimension)
+        """
+        if self.client:
+            # OpenAI
+            response = self.client.embeddings.create(
+                input=list(texts),
+                model=self.model_name
+            )
+            return np.array([item.embedding for item in response.data])
+        else:
+            # HuggingFace
+            return self.model.encode(list(texts), convert_to_numpy=True)
+    
     def generate_embeddings_batch(self, texts, batch_size=100):
         """
         Generate embeddings for multiple texts in batches.
@@ -148,6 +179,105 @@ class EmbeddingGenerator:
         else:
             # HuggingFace - get from model
             return self.model.get_sentence_embedding_dimension()
+    
+    @property
+    def max_seq_length(self):
+        """Longest input, in the model's own tokens, that is embedded without truncation."""
+        if self.client:
+            return OPENAI_MAX_INPUT_TOKENS
+        return self.model.max_seq_length
+    
+    @property
+    def num_special_tokens(self):
+        """Tokens the model adds to every input (e.g. [CLS] and [SEP])."""
+        if self.client:
+            return 0
+        return self.model.tokenizer.num_special_tokens_to_add()
+    
+    def count_tokens_batch(self, texts, normalize=False):
+        """
+        Count tokens in many texts with this model's own tokenizer.
+        
+        Args:
+            texts: List of text strings
+            normalize: Count the texts as embedded, after normalize_text_for_embedding
+        
+        Returns:
+            list: Token count per text, excluding special tokens
+        """
+        if normalize:
+            from preprocessing.clean_text import normalize_text_for_embedding
+            texts = [normalize_text_for_embedding(text) for text in texts]
+        
+        if self.client:
+            from preprocessing.tokenizer import count_tokens_batch
+            return count_tokens_batch(texts, self.model_name)
+        return _count_with_tokenizer(self.model.tokenizer, texts)
+    
+    def embedding_text_overhead(self, product):
+        """
+        Count the tokens a product's embedding text spends outside its description.
+        
+        Covers the name and category before the description, the roles and
+        skills after it, and the model's special tokens.
+        
+        Args:
+            product: Product dictionary
+        
+        Returns:
+            int: Tokens left out of the description's share of max_seq_length
+        """
+        from preprocessing.clean_text import create_embedding_text
+        
+        surrounding_text = create_embedding_text(dict(product, description=''))
+        return self.count_tokens_batch([surrounding_text])[0] + self.num_special_tokens
+
+
+def _count_with_tokenizer(tokenizer, texts):
+    """Token count per text with a HuggingFace tokenizer, excluding special tokens."""
+    encoded = tokenizer(list(texts), add_special_tokens=False, return_attention_mask=False, verbose=False)
+    return [len(ids) for ids in encoded['input_ids']]
+
+
+@lru_cache(maxsize=None)
+def load_tokenizer(model_name=DEFAULT_HF_MODEL):
+    """
+    Load only the tokenizer of a HuggingFace embedding model.
+    
+    Args:
+        model_name: HuggingFace model name
+    
+    Returns:
+        Tokenizer, or None if transformers or the model files are unavailable
+    """
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(model_name)
+    except Exception as e:
+        logger.warning(f"Could not load the {model_name} tokenizer, approximating token counts: {e}")
+        return None
+
+
+def count_embedding_tokens_batch(texts, model_name=DEFAULT_HF_MODEL):
+    """
+    Count tokens in many texts with the default embedding model's tokenizer.
+    
+    Loads only the tokenizer, so text can be sized for the embedding model
+    without loading the model itself.
+    
+    Args:
+        texts: List of text strings
+        model_name: HuggingFace model name
+    
+    Returns:
+        list: Token count per text, excluding special tokens (approximated
+            if the tokenizer is unavailable)
+    """
+    tokenizer = load_tokenizer(model_name)
+    if tokenizer is None:
+        from preprocessing.tokenizer import count_tokens_batch
+        return count_tokens_batch(texts, Config.EMBEDDING_MODEL)
+    return _count_with_tokenizer(tokenizer, texts)
 
 
 def load_products(filename="shl_products.json"):
@@ -191,16 +321,24 @@ def main():
     from preprocessing.clean_text import clean_products
     products = clean_products(products)
     
-    # Chunk if necessary
+    generator = EmbeddingGenerator()
+    
+    # Chunk if necessary, sized with the embedding model's own tokenizer so
+    # no chunk's embedding text is truncated by the encoder
     from preprocessing.chunk_products import chunk_products
-    products = chunk_products(products, max_tokens=512, overlap_tokens=50)
+    products = chunk_products(
+        products,
+        max_tokens=generator.max_seq_length,
+        overlap_tokens=50,
+        token_counter=partial(generator.count_tokens_batch, normalize=True),
+        reserved_tokens=generator.embedding_text_overhead,
+    )
     
     # Prepare embedding texts
     texts = prepare_texts_for_embedding(products)
     
     # Generate embeddings
     logger.info("Generating embeddings...")
-    generator = EmbeddingGenerator()
     embeddings = generator.generate_embeddings_batch(texts, batch_size=100)
     
     logger.info(f"Generated embeddings with shape: {embeddings.shape}")
@@ -9,7 +9,7 @@ logging.basicConfig(level=Config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 
-def save_embeddings(embeddings, metadata, base_path=None):
+def save_embeddings(embeddings, metadata, base_path=None, extra_info=None):
     """
     Save embeddings and metadata to disk.
     
@@ -17,6 +17,7 @@ def save_embeddings(embeddings, metadata, base_path=None):
         embeddings: numpy array of embeddings
         metadata: list of product dictionaries
         base_path: base directory path (defaults to Config.VECTOR_STORE_DIR)
+        extra_info: additional fields to record in embedding_info.json (e.g. metric)
     """
     if base_path is None:
         base_path = Config.VECTOR_STORE_DIR
@@ -31,30 +32,58 @@ def save_embeddings(embeddings, metadata, base_path=None):
     np.save(embeddings_path, embeddings)
     logger.info(f"Saved embeddings to {embeddings_path} (shape: {embeddings.shape})")
     
-    # Save metadata as JSON
-    metadata_path = base_path / "metadata.json"
-    with open(metadata_path, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, indent=2, ensure_ascii=False)
-    logger.info(f"Saved metadata for {len(metadata)} items to {metadata_path}")
+    # Save metadata as a compact, row-addressable binary store
+    from embeddings.metadata_store import write_metadata_store
+    write_metadata_store(metadata, base_path)
     
     # Save embedding info
-    info = {
-        'num_embeddings': len(embeddings),
-        'embedding_dimension': embeddings.shape[1] if len(embeddings) > 0 else 0,
-        'model': Config.EMBEDDING_MODEL
-    }
+    save_embedding_info(
+        len(embeddings),
+        embeddings.shape[1] if len(embeddings) > 0 else 0,
+        base_path,
+        extra_info=extra_info
+    )
+
+
+def save_embedding_info(num_embeddings, embedding_dimension, base_path=None, extra_info=None):
+    """
+    Write embedding_info.json, preserving any fields already recorded there.
+    
+    Args:
+        num_embeddings: number of stored vectors
+        embedding_dimension: vector dimension
+        base_path: base directory path (defaults to Config.VECTOR_STORE_DIR)
+        extra_info: additional fields to record (e.g. metric, index_type)
+    """
+    if base_path is None:
+        base_path = Config.VECTOR_STORE_DIR
+    else:
+        base_path = Path(base_path)
+    
+    base_path.mkdir(parents=True, exist_ok=True)
+    
+    info = load_embedding_info(base_path) if (base_path / "embedding_info.json").exists() else {}
+    info.setdefault('model', Config.EMBEDDING_MODEL)
+    info.update({
+        'num_embeddings': num_embeddings,
+        'embedding_dimension': embedding_dimension,
+    })
+    if extra_info:
+        info.update(extra_info)
+    
     info_path = base_path / "embedding_info.json"
     with open(info_path, 'w', encoding='utf-8') as f:
         json.dump(info, f, indent=2)
     logger.info(f"Saved embedding info to {info_path}")
 
 
-def load_embeddings(base_path=None):
+def load_embeddings(base_path=None, mmap=False):
     """
     Load embeddings and metadata from disk.
     
     Args:
         base_path: base directory path (defaults to Config.VECTOR_STORE_DIR)
+        mmap: memory-map the embeddings (read-only) and decode metadata lazily
     
     Returns:
         tuple: (embeddings array, metadata list)
@@ -69,17 +98,11 @@ def load_embeddings(base_path=None):
     if not embeddings_path.exists():
         raise FileNotFoundError(f"Embeddings file not found at {embeddings_path}")
     
-    embeddings = np.load(embeddings_path)
+    embeddings = np.load(embeddings_path, mmap_mode='r' if mmap else None)
     logger.info(f"Loaded embeddings from {embeddings_path} (shape: {embeddings.shape})")
     
     # Load metadata
-    metadata_path = base_path / "metadata.json"
-    if not metadata_path.exists():
-        raise FileNotFoundError(f"Metadata file not found at {metadata_path}")
-    
-    with open(metadata_path, 'r', encoding='utf-8') as f:
-        metadata = json.load(f)
-    logger.info(f"Loaded metadata for {len(metadata)} items from {metadata_path}")
+    metadata = load_metadata(base_path, lazy=mmap)
     
     # Verify consistency
     if len(embeddings) != len(metadata):
@@ -90,6 +113,42 @@ def load_embeddings(base_path=None):
     return embeddings, metadata
 
 
+def load_metadata(base_path=None, lazy=True):
+    """
+    Load only the metadata, without reading the embeddings file.
+    
+    Args:
+        base_path: base directory path (defaults to Config.VECTOR_STORE_DIR)
+        lazy: return the memory-mapped MetadataStore, which decodes rows on
+            access, instead of a fully decoded list
+    
+    Returns:
+        list or MetadataStore: Sequence of product dictionaries
+    """
+    if base_path is None:
+        base_path = Config.VECTOR_STORE_DIR
+    else:
+        base_path = Path(base_path)
+    
+    from embeddings.metadata_store import MetadataStore, metadata_store_exists
+    
+    if metadata_store_exists(base_path):
+        metadata = MetadataStore(base_path)
+        logger.info(f"Opened metadata store for {len(metadata)} items in {base_path}")
+        return metadata if lazy else list(metadata)
+    
+    # Stores built before the binary format only have metadata.json
+    metadata_path = base_path / "metadata.json"
+    if not metadata_path.exists():
+        raise FileNotFoundError(f"Metadata file not found at {metadata_path}")
+    
+    with open(metadata_path, 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    logger.info(f"Loaded metadata for {len(metadata)} items from {metadata_path}")
+    
+    return metadata
+
+
 def load_embedding_info(base_path=None):
     """
     Load embedding information.
@@ -132,10 +191,14 @@ def embeddings_exist(base_path=None):
     else:
         base_path = Path(base_path)
     
+    from embeddings.metadata_store import metadata_store_exists
+    
     embeddings_path = base_path / "embeddings.npy"
     metadata_path = base_path / "metadata.json"
     
-    return embeddings_path.exists() and metadata_path.exists()
+    return embeddings_path.exists() and (
+        metadata_store_exists(base_path) or metadata_path.exists()
+    )
 
 
 if __name__ == "__main__":
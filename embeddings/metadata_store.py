@@ -0,0 +1,163 @@
+"""Compact binary metadata store with row-level lazy decoding.
+
+Layout (all files live next to index.faiss):
+
+    metadata.bin          header (magic + codec byte) followed by one encoded record per row
+    metadata_offsets.npy  int64 array of n+1 byte offsets into metadata.bin
+    metadata_ids.npy      fixed-width byte-string array of product ids
+
+Records are msgpack-encoded when msgpack is installed, otherwise compact
+UTF-8 JSON. Any row can be decoded from its offsets without touching the rest.
+"""
+import json
+import mmap
+import logging
+import numpy as np
+from pathlib import Path
+from config import Config
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+RECORDS_FILENAME = "metadata.bin"
+OFFSETS_FILENAME = "metadata_offsets.npy"
+IDS_FILENAME = "metadata_ids.npy"
+
+MAGIC = b"SHLMETA1"
+CODEC_JSON = b"j"
+CODEC_MSGPACK = b"m"
+HEADER_SIZE = len(MAGIC) + 1
+
+
+def _get_msgpack():
+    """Import msgpack if available."""
+    try:
+        import msgpack
+        return msgpack
+    except ImportError:
+        return None
+
+
+def _encoder(codec):
+    """Get a record encoder function for a codec."""
+    if codec == CODEC_MSGPACK:
+        packb = _get_msgpack().packb
+        return lambda item: packb(item, use_bin_type=True)
+    return lambda item: json.dumps(item, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _decoder(codec):
+    """Get a record decoder function for a codec."""
+    if codec == CODEC_MSGPACK:
+        msgpack = _get_msgpack()
+        if msgpack is None:
+            raise ImportError(
+                "Metadata store is msgpack-encoded. Install with: pip install msgpack"
+            )
+        return lambda data: msgpack.unpackb(data, raw=False)
+    return json.loads
+
+
+def write_metadata_store(metadata, base_path):
+    """
+    Write metadata as a binary record blob with fixed-width offset and id arrays.
+    
+    Args:
+        metadata: list of product dictionaries
+        base_path: directory to write to
+    """
+    base_path = Path(base_path)
+    base_path.mkdir(parents=True, exist_ok=True)
+    
+    codec = CODEC_MSGPACK if _get_msgpack() is not None else CODEC_JSON
+    encode = _encoder(codec)
+    
+    offsets = np.zeros(len(metadata) + 1, dtype='int64')
+    offsets[0] = HEADER_SIZE
+    records_path = base_path / RECORDS_FILENAME
+    
+    with open(records_path, 'wb') as f:
+        f.write(MAGIC + codec)
+        for i, item in enumerate(metadata):
+            record = encode(item)
+            f.write(record)
+            offsets[i + 1] = offsets[i] + len(record)
+    
+    ids = np.array([str(item.get('id', '')).encode('utf-8') for item in metadata], dtype='S')
+    
+    np.save(base_path / OFFSETS_FILENAME, offsets)
+    np.save(base_path / IDS_FILENAME, ids)
+    logger.info(
+        f"Saved metadata store for {len(metadata)} items to {records_path} "
+        f"({int(offsets[-1])} bytes, codec={codec.decode()})"
+    )
+
+
+def metadata_store_exists(base_path):
+    """Check if a binary metadata store exists in a directory."""
+    base_path = Path(base_path)
+    return all(
+        (base_path / filename).exists()
+        for filename in (RECORDS_FILENAME, OFFSETS_FILENAME, IDS_FILENAME)
+    )
+
+
+class MetadataStore:
+    """
+    Read-only sequence of metadata dicts backed by memory-mapped files.
+    
+    Opening is O(1) regardless of catalogue size: only the records that are
+    indexed get decoded, and the mapped pages are shared between processes.
+    """
+    
+    def __init__(self, base_path):
+        """
+        Open a metadata store written by write_metadata_store().
+        
+        Args:
+            base_path: directory containing the store
+        """
+        base_path = Path(base_path)
+        self.offsets = np.load(base_path / OFFSETS_FILENAME, mmap_mode='r')
+        self.ids = np.load(base_path / IDS_FILENAME, mmap_mode='r')
+        
+        self._file = open(base_path / RECORDS_FILENAME, 'rb')
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        header = self._buffer[:HEADER_SIZE]
+        if header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{base_path / RECORDS_FILENAME} is not a metadata store")
+        self._decode = _decoder(header[len(MAGIC):])
+    
+    def __len__(self):
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        
+        idx = self._check_index(idx)
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        return self._decode(self._buffer[start:end])
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+    
+    def _check_index(self, idx):
+        """Normalize a (possibly negative) row index and bounds-check it."""
+        idx = int(idx)
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(f"Metadata index {idx} out of range")
+        return idx
+    
+    def get_id(self, idx):
+        """Get a row's product id without decoding the record."""
+        return self.ids[self._check_index(idx)].decode('utf-8')
+    
+    def close(self):
+        """Release the memory maps and file handle."""
+        self._buffer.close()
+        self._file.close()
@@ -0,0 +1,300 @@
+"""Retrieval quality and per-stage latency benchmark on the labelled test queries.
+
+Run from the repository root:
+
+    python evaluation/benchmark.py                      # retriever only
+    python evaluation/benchmark.py --recommender fast   # also time Recommender modes
+    python evaluation/benchmark.py --baseline evaluation/reports/<old>.json
+
+Each run writes a JSON report (metrics, latency percentiles and the index /
+model configuration) that can be diffed against a report from another commit.
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add parent directory to path so this file can run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from config import Config
+from evaluation.retrieval_metrics import (
+    load_ground_truth,
+    recommendation_slugs,
+    score_predictions,
+    url_slug
+)
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+REPORTS_DIR = Config.BASE_DIR / "evaluation" / "reports"
+
+
+class StageTimer:
+    """Collect wall-clock latencies per pipeline stage."""
+    
+    def __init__(self):
+        self.samples = {}
+    
+    def time(self, stage, fn, *args, **kwargs):
+        """Call fn, recording its latency under stage, and return its result."""
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.samples.setdefault(stage, []).append((time.perf_counter() - start) * 1000)
+        return result
+    
+    def summary(self):
+        """
+        Summarize recorded latencies.
+        
+        Returns:
+            dict: stage -> {count, mean, p50, p95, p99, max} in milliseconds
+        """
+        summary = {}
+        for stage, samples in self.samples.items():
+            samples = np.array(samples)
+            summary[stage] = {
+                'count': int(len(samples)),
+                'mean_ms': float(samples.mean()),
+                'p50_ms': float(np.percentile(samples, 50)),
+                'p95_ms': float(np.percentile(samples, 95)),
+                'p99_ms': float(np.percentile(samples, 99)),
+                'max_ms': float(samples.max()),
+            }
+        return summary
+
+
+def benchmark_retriever(retriever, ground_truth, ks=(5, 10)):
+    """
+    Run the retriever over every labelled query, timing each stage.
+    
+    Query embedding caches are cleared first so the embed stage measures
+    the model, not cache lookups.
+    
+    Args:
+        retriever: Retriever instance
+        ground_truth: dict of query -> relevant slugs
+        ks: Cut-offs to report
+    
+    Returns:
+        dict: Quality metrics and per-stage latency summary
+    """
+    query_processor = retriever.query_processor
+    if query_processor.embedding_cache is not None:
+        query_processor.embedding_cache.clear()
+    disk_cache, query_processor.disk_cache = query_processor.disk_cache, None
+    
+    k = max(ks)
+    timer = StageTimer()
+    predictions = {}
+    
+    try:
+        # Load the embedding model before timing anything
+        query_processor._initialize_generator()
+        
+        for query in ground_truth:
+            start = time.perf_counter()
+            embedding = timer.time('embed', query_processor.generate_query_embedding, query)
+            query_filter = timer.time('constraints', retriever._query_filter, query)
+            results = timer.time(
+                'search', retriever._search_constrained, embedding[None, :], k, [query_filter], [query]
+            )[0]
+            docs = timer.time('format', retriever._format_results, results)
+            timer.samples.setdefault('retrieve_total', []).append((time.perf_counter() - start) * 1000)
+            
+            predictions[query] = [url_slug(doc.get('assessment_url') or doc.get('url')) for doc in docs]
+    finally:
+        query_processor.disk_cache = disk_cache
+    
+    return {
+        'metrics': score_predictions(predictions, ground_truth, ks),
+        'latency': timer.summary(),
+    }
+
+
+def benchmark_recommender(recommender, ground_truth, mode, ks=(5, 10)):
+    """
+    Run the full recommendation pipeline over every labelled query.
+    
+    Response and semantic caches are disabled so every query pays its full cost.
+    
+    Args:
+        recommender: Recommender instance
+        ground_truth: dict of query -> relevant slugs
+        mode: "llm" or "fast"
+        ks: Cut-offs to report
+    
+    Returns:
+        dict: Quality metrics, error count and end-to-end latency summary
+    """
+    recommender.response_cache = None
+    recommender.semantic_cache = None
+    
+    timer = StageTimer()
+    predictions = {}
+    errors = 0
+    
+    for query in ground_truth:
+        result = timer.time('recommend_total', recommender.recommend, query, top_k=max(ks), mode=mode)
+        if 'error' in result:
+            errors += 1
+        predictions[query] = recommendation_slugs(result)
+    
+    return {
+        'metrics': score_predictions(predictions, ground_truth, ks),
+        'errors': errors,
+        'latency': timer.summary(),
+    }
+
+
+def _git_commit():
+    """Current git commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Config.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(ground_truth_path=None, ks=(5, 10), recommender_modes=()):
+    """
+    Benchmark the retriever (and optionally Recommender modes) on the labelled set.
+    
+    Args:
+        ground_truth_path: Query,Assessment_url CSV (defaults to data/test_queries.csv)
+        ks: Cut-offs to report
+        recommender_modes: Recommender modes to benchmark, e.g. ("fast", "llm")
+    
+    Returns:
+        dict: JSON-serializable report
+    """
+    from rag.retriever import Retriever
+    
+    ground_truth = load_ground_truth(ground_truth_path)
+    retriever = Retriever()
+    stats = retriever.vector_store.get_stats()
+    
+    report = {
+        'commit': _git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'queries': len(ground_truth),
+        'ks': list(ks),
+        'config': {
+            'embedding_model': retriever.query_processor.model_name,
+            'index_type': stats.get('index_type'),
+            'metric': stats.get('metric'),
+            'total_vectors': stats.get('total_vectors'),
+            'index_version': stats.get('index_version'),
+            'index_params': retriever.vector_store.index_params,
+            'query_constraints': retriever.apply_query_constraints,
+            'hybrid_search': retriever.fusion if retriever.hybrid_search else None,
+        },
+        'retriever': benchmark_retriever(retriever, ground_truth, ks),
+    }
+    
+    if recommender_modes:
+        from rag.recommender import Recommender
+        
+        recommender = Recommender(retriever=retriever)
+        report['recommender'] = {
+            mode: benchmark_recommender(recommender, ground_truth, mode, ks)
+            for mode in recommender_modes
+        }
+    
+    return report
+
+
+def save_report(report, output_path=None):
+    """
+    Write a benchmark report as JSON.
+    
+    Args:
+        report: Output of run_benchmark()
+        output_path: Destination (defaults to evaluation/reports/benchmark_<commit>.json)
+    
+    Returns:
+        Path: Path to the written report
+    """
+    if output_path is None:
+        output_path = REPORTS_DIR / f"benchmark_{report.get('commit') or 'local'}.json"
+    
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True, default=str)
+    
+    logger.info(f"Saved benchmark report to {output_path}")
+    return output_path
+
+
+def _report_rows(report):
+    """Flatten a report into (section, name, value) rows for printing and diffs."""
+    sections = [('retriever', report['retriever'])]
+    sections += [(f"recommender[{mode}]", result) for mode, result in report.get('recommender', {}).items()]
+    
+    for section, result in sections:
+        for name, value in result['metrics'].items():
+            yield section, name, value
+        for stage, latency in result['latency'].items():
+            for percentile in ('p50_ms', 'p95_ms', 'p99_ms'):
+                yield section, f"{stage}.{percentile}", latency[percentile]
+
+
+def print_report(report, baseline=None):
+    """
+    Print a report, with deltas against a baseline report if given.
+    
+    Args:
+        report: Output of run_benchmark()
+        baseline: Earlier report to compare against (optional)
+    """
+    baseline_values = {}
+    if baseline is not None:
+        baseline_values = {(section, name): value for section, name, value in _report_rows(baseline)}
+    
+    print(f"\nBenchmark @ {report.get('commit')} ({report['queries']} queries)")
+    if baseline is not None:
+        print(f"Baseline  @ {baseline.get('commit')}")
+    print("-" * 72)
+    
+    for section, name, value in _report_rows(report):
+        line = f"{section:<22} {name:<28} {value:>10.4f}"
+        previous = baseline_values.get((section, name))
+        if previous is not None:
+            line += f"   ({value - previous:+.4f})"
+        print(line)
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark retrieval quality and latency")
+    parser.add_argument('--ground-truth', default=None, help="Query,Assessment_url CSV")
+    parser.add_argument('--k', type=int, nargs='+', default=[5, 10], help="Cut-offs to report")
+    parser.add_argument('--recommender', nargs='*', default=[], choices=['fast', 'llm'],
+                        help="Also benchmark these Recommender modes")
+    parser.add_argument('--output', default=None, help="Report path")
+    parser.add_argument('--baseline', default=None, help="Earlier report to diff against")
+    args = parser.parse_args()
+    
+    report = run_benchmark(args.ground_truth, tuple(args.k), tuple(args.recommender))
+    save_report(report, args.output)
+    
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    
+    print_report(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
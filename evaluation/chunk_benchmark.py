@@ -0,0 +1,314 @@
+"""Throughput benchmark for description chunking on large synthetic text.
+
+Run from the repository root:
+
+    python evaluation/chunk_benchmark.py
+    python evaluation/chunk_benchmark.py --sizes 10000 1000000 --output evaluation/reports/chunking.json
+
+Compares chunk_text against the previous character-scanning chunker (with
+its progress guard fixed so it terminates) and times chunk_products over a
+synthetic catalogue. Also checks that every chunk fits the token limit, that
+no chunk is contained in its neighbour, and that chunk budgets leave room for
+the rest of each product's embedding text.
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+
+# Add parent directory to path so this file can run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from config import Config
+from preprocessing.chunk_products import chunk_products, chunk_text
+from embeddings.build_embeddings import DEFAULT_HF_MODEL, count_embedding_tokens_batch, load_tokenizer
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+_WORDS = (
+    "assessment candidate measures ability reasoning numerical verbal inductive deductive "
+    "personality behaviour workplace situational judgement skills knowledge leadership manager "
+    "graduate professional customer service sales team collaboration decision making problem "
+    "solving analytical thinking performance potential role job report insight development"
+).split()
+
+
+def synthetic_description(n_chars, seed=0):
+    """
+    Generate product-description-like text of about n_chars characters.
+    
+    Mostly 5-30 word sentences, with occasional long unpunctuated runs (like
+    scraped bullet lists) that have to be split between words.
+    
+    Args:
+        n_chars: Target length in characters
+        seed: Random seed
+    
+    Returns:
+        str: Synthetic text
+    """
+    rng = np.random.default_rng(seed)
+    sentences = []
+    length = 0
+    while length < n_chars:
+        n_words = int(rng.integers(300, 900)) if rng.random() < 0.02 else int(rng.integers(5, 30))
+        words = rng.choice(_WORDS, size=n_words)
+        sentence = " ".join(words).capitalize() + rng.choice([".", ".", ".", "!", "?"])
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)
+
+
+def legacy_chunk_text(text, max_tokens=512, overlap_tokens=50):
+    """Previous chunk_text: backwards character scan for a sentence end near each cut."""
+    max_chars = max_tokens * 4
+    overlap_chars = overlap_tokens * 4
+    if len(text) <= max_chars:
+        return [text]
+    
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + max_chars
+        if end < len(text):
+            sentence_ends = ['. ', '! ', '? ', '.\n', '!\n', '?\n']
+            best_break = end
+            search_start = max(start, end - 200)
+            for i in range(end, search_start, -1):
+                for ending in sentence_ends:
+                    if text[i:i+len(ending)] == ending:
+                        best_break = i + len(ending)
+                        break
+                if best_break != end:
+                    break
+            end = best_break
+        
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        
+        # The original guard compared start with the last chunk's text
+        next_start = end - overlap_chars
+        start = next_start if next_start > start else end
+    
+    return chunks
+
+
+def _time(fn, *args, repeats=3):
+    """Best wall-clock time in seconds over repeats, and the last result."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark_text(sizes, max_tokens, overlap_tokens):
+    """
+    Time both chunkers on synthetic texts of each size.
+    
+    Args:
+        sizes: Text lengths in characters
+        max_tokens: Maximum tokens per chunk
+        overlap_tokens: Overlap between chunks
+    
+    Returns:
+        list: One result dict per size
+    """
+    results = []
+    for size in sizes:
+        text = synthetic_description(size)
+        
+        seconds, chunks = _time(chunk_text, text, max_tokens, overlap_tokens)
+        legacy_seconds, legacy_chunks = _time(legacy_chunk_text, text, max_tokens, overlap_tokens)
+        chunk_tokens = count_embedding_tokens_batch(chunks)
+        legacy_tokens = count_embedding_tokens_batch(legacy_chunks)
+        
+        results.append({
+            'chars': len(text),
+            'chunks': len(chunks),
+            'mb_per_s': len(text) / seconds / 1e6,
+            'legacy_mb_per_s': len(text) / legacy_seconds / 1e6,
+            'speedup': legacy_seconds / seconds,
+            'max_chunk_tokens': max(chunk_tokens),
+            'legacy_max_chunk_tokens': max(legacy_tokens),
+            'legacy_chunks': len(legacy_chunks),
+        })
+        logger.info(f"Chunked {len(text)} chars into {len(chunks)} chunks in {seconds * 1000:.1f}ms")
+    return results
+
+
+def benchmark_catalogue(n_products, max_tokens, overlap_tokens):
+    """
+    Time chunk_products over a synthetic catalogue of mixed description lengths.
+    
+    Args:
+        n_products: Number of products
+        max_tokens: Maximum tokens per chunk
+        overlap_tokens: Overlap between chunks
+    
+    Returns:
+        dict: Products, chunks, chars and throughput
+    """
+    rng = np.random.default_rng(1)
+    # Mostly short descriptions with a long tail, like scraped catalogue pages
+    lengths = np.minimum(rng.lognormal(mean=6.5, sigma=1.2, size=n_products), 200_000).astype(int)
+    products = [
+        {'id': str(i), 'name': f"Product {i}", 'description': synthetic_description(length, seed=i)}
+        for i, length in enumerate(lengths)
+    ]
+    total_chars = sum(len(product['description']) for product in products)
+    
+    seconds, chunked = _time(chunk_products, products, max_tokens, overlap_tokens, repeats=1)
+    return {
+        'products': n_products,
+        'items': len(chunked),
+        'chars': total_chars,
+        'products_per_s': n_products / seconds,
+        'mb_per_s': total_chars / seconds / 1e6,
+    }
+
+
+def _word_counter(texts):
+    """Count whitespace-separated words, a tokenizer with predictable counts."""
+    return [len(text.split()) for text in texts]
+
+
+def check_no_redundant_chunks(max_tokens=20, overlap_tokens=10):
+    """
+    Assert that no chunk is contained in a neighbouring chunk.
+    
+    Covers a long sentence after short ones, where stepping the overlap back
+    one sentence at a time used to emit chunks that were strict subsets of
+    the next, and synthetic descriptions of mixed sentence lengths.
+    
+    Args:
+        max_tokens: Maximum tokens per chunk
+        overlap_tokens: Overlap between chunks
+    
+    Returns:
+        int: Number of texts checked
+    """
+    long_sentence = " ".join(f"word{i}" for i in range(18)) + "."
+    texts = ["Short one here. " * 6 + long_sentence, long_sentence + " Short one here." * 6]
+    texts += [synthetic_description(2_000, seed=seed) for seed in range(20)]
+    
+    for text in texts:
+        chunks = chunk_text(text, max_tokens, overlap_tokens, token_counter=_word_counter)
+        for previous, chunk in zip(chunks, chunks[1:]):
+            assert previous not in chunk and chunk not in previous, (
+                f"Redundant neighbouring chunks:\n{previous!r}\n{chunk!r}"
+            )
+        assert max(_word_counter(chunks)) <= max_tokens
+    
+    logger.info(f"No chunk is contained in its neighbour across {len(texts)} texts")
+    return len(texts)
+
+
+def check_embedding_text_fits(max_tokens=64, overlap_tokens=10, special_tokens=2):
+    """
+    Assert that every chunk's full embedding text fits the model window.
+    
+    The name, category, roles and skills around the description, plus the
+    model's special tokens, are taken off each product's chunk budget.
+    
+    Args:
+        max_tokens: Model input limit in tokens
+        overlap_tokens: Overlap between chunks
+        special_tokens: Tokens the model adds to every input
+    
+    Returns:
+        int: Number of chunked items checked
+    """
+    from preprocessing.clean_text import create_embedding_text
+    
+    def embedded_tokens(product):
+        return _word_counter([create_embedding_text(product)])[0] + special_tokens
+    
+    def reserved_tokens(product):
+        return embedded_tokens(dict(product, description=''))
+    
+    rng = np.random.default_rng(2)
+    products = [
+        {
+            'id': str(i),
+            'name': f"Product {i} Assessment",
+            'category': 'Cognitive Ability',
+            'description': synthetic_description(int(rng.integers(100, 1_500)), seed=i),
+            'target_roles': list(rng.choice(_WORDS, size=int(rng.integers(0, 8)))),
+            'skills_assessed': list(rng.choice(_WORDS, size=int(rng.integers(0, 12)))),
+        }
+        for i in range(50)
+    ]
+    
+    unbudgeted = chunk_products(products, max_tokens, overlap_tokens, token_counter=_word_counter)
+    assert any(embedded_tokens(item) > max_tokens for item in unbudgeted), "check needs overflowing items"
+    
+    chunked = chunk_products(
+        products, max_tokens, overlap_tokens, token_counter=_word_counter, reserved_tokens=reserved_tokens
+    )
+    for item in chunked:
+        assert embedded_tokens(item) <= max_tokens, (
+            f"Embedding text of {item['id']} has {embedded_tokens(item)} of {max_tokens} tokens"
+        )
+    
+    logger.info(f"All {len(chunked)} embedding texts fit {max_tokens} tokens")
+    return len(chunked)
+
+
+def print_report(report):
+    """Print a chunking benchmark report."""
+    print(f"\nchunk_text (max_tokens={report['max_tokens']}, overlap={report['overlap_tokens']}, "
+          f"token counting: {report['tokenizer']})")
+    print("-" * 78)
+    print(f"{'chars':>10}{'chunks':>8}{'MB/s':>10}{'legacy MB/s':>13}{'speedup':>9}"
+          f"{'max tok':>9}{'legacy max':>12}")
+    for row in report['text']:
+        print(f"{row['chars']:>10}{row['chunks']:>8}{row['mb_per_s']:>10.2f}{row['legacy_mb_per_s']:>13.2f}"
+              f"{row['speedup']:>8.1f}x{row['max_chunk_tokens']:>9}{row['legacy_max_chunk_tokens']:>12}")
+    
+    catalogue = report['catalogue']
+    print(f"\nchunk_products: {catalogue['products']} products ({catalogue['chars'] / 1e6:.1f}M chars) "
+          f"-> {catalogue['items']} items, {catalogue['products_per_s']:.0f} products/s, "
+          f"{catalogue['mb_per_s']:.2f} MB/s")
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark description chunking throughput")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help="Synthetic text lengths in characters")
+    parser.add_argument('--max-tokens', type=int, default=512)
+    parser.add_argument('--overlap-tokens', type=int, default=50)
+    parser.add_argument('--products', type=int, default=2000, help="Synthetic catalogue size")
+    parser.add_argument('--output', default=None, help="Also write the report as JSON")
+    args = parser.parse_args()
+    
+    check_no_redundant_chunks()
+    check_embedding_text_fits()
+    
+    report = {
+        'max_tokens': args.max_tokens,
+        'overlap_tokens': args.overlap_tokens,
+        'tokenizer': DEFAULT_HF_MODEL if load_tokenizer(DEFAULT_HF_MODEL) is not None else 'approximate',
+        'text': benchmark_text(args.sizes, args.max_tokens, args.overlap_tokens),
+        'catalogue': benchmark_catalogue(args.products, args.max_tokens, args.overlap_tokens),
+    }
+    
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Saved chunking benchmark report to {output_path}")
+    
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark the LLM and fast (local reranker) recommendation modes."""
+import sys
+import logging
+import time
+from pathlib import Path
+
+# Add parent directory to path so this file can run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from config import Config
+from evaluation.retrieval_metrics import load_ground_truth, mean_recall_at_k, recommendation_slugs
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+
+def evaluate_mode(recommender, ground_truth, mode, k=10):
+    """
+    Run every labelled query through one recommendation mode.
+    
+    Args:
+        recommender: Recommender instance (its caches should be disabled)
+        ground_truth: dict of query -> relevant slugs
+        mode: "llm" or "fast"
+        k: Number of recommendations per query
+    
+    Returns:
+        dict: Mean Recall@k, latency percentiles (ms), error count and the
+            number of LLM-mode queries answered by the reranker fallback
+    """
+    predictions = {}
+    latencies = []
+    errors = 0
+    fallbacks = 0
+    
+    for query in ground_truth:
+        start = time.perf_counter()
+        result = recommender.recommend(query, top_k=k, mode=mode)
+        latencies.append((time.perf_counter() - start) * 1000)
+        
+        if 'error' in result:
+            errors += 1
+        if result.get('fallback'):
+            fallbacks += 1
+        predictions[query] = recommendation_slugs(result)
+    
+    latencies = np.array(latencies)
+    return {
+        'mode': mode,
+        'queries': len(ground_truth),
+        'errors': errors,
+        'fallbacks': fallbacks,
+        'recall_at_k': mean_recall_at_k(predictions, ground_truth, k),
+        'latency_ms_p50': float(np.percentile(latencies, 50)),
+        'latency_ms_p95': float(np.percentile(latencies, 95)),
+        'latency_ms_mean': float(latencies.mean()),
+    }
+
+
+def compare_modes(recommender, ground_truth, k=10, modes=("fast", "llm")):
+    """
+    Evaluate several recommendation modes on the same queries.
+    
+    Response and semantic caches are disabled for the run so every query pays
+    its full cost in every mode.
+    
+    Args:
+        recommender: Recommender instance
+        ground_truth: dict of query -> relevant slugs
+        k: Number of recommendations per query
+        modes: Modes to evaluate
+    
+    Returns:
+        list: One report dict per mode
+    """
+    recommender.response_cache = None
+    recommender.semantic_cache = None
+    
+    # Load the embedding model before timing anything
+    recommender.retriever.query_processor.generate_query_embedding("warm up")
+    
+    reports = []
+    for mode in modes:
+        logger.info(f"Evaluating {mode} mode on {len(ground_truth)} queries")
+        reports.append(evaluate_mode(recommender, ground_truth, mode, k))
+    
+    return reports
+
+
+def print_report(reports, k=10):
+    """Print a recall/latency table for compare_modes() output."""
+    print(f"\n{'Mode':<6} {f'Recall@{k}':>10} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9} {'Errors':>7} {'Fallbacks':>10}")
+    print("-" * 66)
+    for report in reports:
+        print(
+            f"{report['mode']:<6} {report['recall_at_k']:>10.3f} {report['latency_ms_p50']:>9.1f} "
+            f"{report['latency_ms_p95']:>9.1f} {report['latency_ms_mean']:>9.1f} {report['errors']:>7} "
+            f"{report['fallbacks']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    from rag.recommender import Recommender
+    
+    ground_truth = load_ground_truth()
+    reports = compare_modes(Recommender(), ground_truth, k=10)
+    print_report(reports, k=10)
@@ -0,0 +1,203 @@
+"""Benchmark query constraint extraction and constraint-filtered retrieval.
+
+Run from the repository root:
+
+    python evaluation/constraint_benchmark.py
+    python evaluation/constraint_benchmark.py --output evaluation/reports/constraints.json
+
+Reports extraction latency, the constraints found in each labelled query,
+and retrieval with and without constraint filters: Recall/MAP, search
+latency, the share of the catalogue left after filtering and how many
+returned products respect the query's time limit.
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+
+# Add parent directory to path so this file can run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from config import Config
+from evaluation.retrieval_metrics import load_ground_truth, score_predictions, url_slug
+from preprocessing.clean_text import parse_duration_range
+from vector_store.query_constraints import extract_constraints
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+
+def _latency_summary(samples_ms):
+    """Mean / p50 / p95 of latency samples in milliseconds."""
+    samples = np.array(samples_ms)
+    return {
+        'mean_ms': float(samples.mean()),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+    }
+
+
+def benchmark_extraction(queries, repeats=100):
+    """
+    Time constraint extraction.
+    
+    Args:
+        queries: Query strings
+        repeats: Extractions per query (single calls are too fast to time reliably)
+    
+    Returns:
+        tuple: (latency summary, {query: constraints dict})
+    """
+    samples = []
+    constraints = {}
+    for query in queries:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            extracted = extract_constraints(query)
+        samples.append((time.perf_counter() - start) * 1000 / repeats)
+        constraints[query] = extracted.to_dict()
+    return _latency_summary(samples), constraints
+
+
+def _within_limit(doc, max_duration):
+    """Whether a product's duration is known to fit the time limit."""
+    duration_range = parse_duration_range(doc.get('duration'))
+    return duration_range is not None and duration_range[0] <= max_duration
+
+
+def benchmark_retrieval(retriever, ground_truth, query_embeddings, apply_constraints, ks=(5, 10)):
+    """
+    Retrieve for every labelled query with constraint filtering on or off.
+    
+    Args:
+        retriever: Retriever instance
+        ground_truth: dict of query -> relevant slugs
+        query_embeddings: dict of query -> precomputed embedding
+        apply_constraints: Whether to filter by the query's constraints
+        ks: Cut-offs to report
+    
+    Returns:
+        dict: Quality metrics, search latency, candidate fraction and time
+            limit compliance
+    """
+    k = max(ks)
+    retriever.apply_query_constraints = apply_constraints
+    attribute_index = retriever.vector_store.get_attribute_index()
+    
+    predictions = {}
+    latencies = []
+    candidate_fractions = []
+    within_limit = []
+    
+    for query in ground_truth:
+        start = time.perf_counter()
+        docs = retriever.retrieve(query, k=k, query_embedding=query_embeddings[query])
+        latencies.append((time.perf_counter() - start) * 1000)
+        
+        predictions[query] = [url_slug(doc.get('assessment_url') or doc.get('url')) for doc in docs]
+        
+        query_filter = extract_constraints(query).to_filter()
+        _, candidates = attribute_index.bitmap(query_filter if apply_constraints else None)
+        candidate_fractions.append(candidates / max(attribute_index.size, 1))
+        
+        if query_filter.max_duration is not None and docs:
+            within_limit.append(np.mean([_within_limit(doc, query_filter.max_duration) for doc in docs]))
+    
+    return {
+        'metrics': score_predictions(predictions, ground_truth, ks),
+        'latency': _latency_summary(latencies),
+        'candidate_fraction': float(np.mean(candidate_fractions)),
+        'within_time_limit': float(np.mean(within_limit)) if within_limit else None,
+    }
+
+
+def run_constraint_benchmark(ground_truth_path=None, ks=(5, 10)):
+    """
+    Benchmark extraction and compare retrieval with and without constraints.
+    
+    Args:
+        ground_truth_path: Query,Assessment_url CSV (defaults to data/test_queries.csv)
+        ks: Cut-offs to report
+    
+    Returns:
+        dict: JSON-serializable report
+    """
+    from rag.retriever import Retriever
+    
+    ground_truth = load_ground_truth(ground_truth_path)
+    queries = list(ground_truth)
+    retriever = Retriever()
+    
+    # Embed once up front so both runs time only constraint handling and search
+    embeddings = retriever.query_processor.generate_query_embeddings(queries)
+    query_embeddings = dict(zip(queries, embeddings))
+    
+    extraction_latency, constraints = benchmark_extraction(queries)
+    
+    return {
+        'queries': len(queries),
+        'ks': list(ks),
+        'extraction': {
+            'latency': extraction_latency,
+            'with_time_limit': sum(c['max_duration'] is not None for c in constraints.values()),
+            'with_test_types': sum(bool(c['test_types']) for c in constraints.values()),
+            'constraints': constraints,
+        },
+        'unfiltered': benchmark_retrieval(retriever, ground_truth, query_embeddings, False, ks),
+        'filtered': benchmark_retrieval(retriever, ground_truth, query_embeddings, True, ks),
+    }
+
+
+def print_report(report):
+    """Print a constraint benchmark report."""
+    extraction = report['extraction']
+    print(f"\nConstraint extraction ({report['queries']} queries)")
+    print("-" * 72)
+    print(f"latency mean {extraction['latency']['mean_ms'] * 1000:.1f}us, "
+          f"p95 {extraction['latency']['p95_ms'] * 1000:.1f}us")
+    print(f"time limit found in {extraction['with_time_limit']}, "
+          f"test types in {extraction['with_test_types']}")
+    for query, constraints in extraction['constraints'].items():
+        print(f"  {query[:50]:<50} {constraints}")
+    
+    print(f"\n{'':<28}{'unfiltered':>14}{'filtered':>14}")
+    print("-" * 72)
+    unfiltered, filtered = report['unfiltered'], report['filtered']
+    rows = [(name, unfiltered['metrics'][name], filtered['metrics'][name]) for name in unfiltered['metrics']]
+    rows += [
+        ('search p50 ms', unfiltered['latency']['p50_ms'], filtered['latency']['p50_ms']),
+        ('search p95 ms', unfiltered['latency']['p95_ms'], filtered['latency']['p95_ms']),
+        ('candidate fraction', unfiltered['candidate_fraction'], filtered['candidate_fraction']),
+        ('within time limit', unfiltered['within_time_limit'], filtered['within_time_limit']),
+    ]
+    for name, before, after in rows:
+        before = f"{before:.4f}" if before is not None else "-"
+        after = f"{after:.4f}" if after is not None else "-"
+        print(f"{name:<28}{before:>14}{after:>14}")
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark query constraint extraction and filtering")
+    parser.add_argument('--ground-truth', default=None, help="Query,Assessment_url CSV")
+    parser.add_argument('--k', type=int, nargs='+', default=[5, 10], help="Cut-offs to report")
+    parser.add_argument('--output', default=None, help="Also write the report as JSON")
+    args = parser.parse_args()
+    
+    report = run_constraint_benchmark(args.ground_truth, tuple(args.k))
+    
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Saved constraint benchmark report to {output_path}")
+    
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
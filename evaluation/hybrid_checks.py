@@ -0,0 +1,154 @@
+"""Deterministic checks for hybrid (vector + BM25) retrieval.
+
+Run from the repository root:
+
+    python evaluation/hybrid_checks.py
+
+Builds a small synthetic vector store, so no embedding model or API key is
+needed. Fails with an AssertionError if a check does not hold.
+"""
+import sys
+import logging
+from pathlib import Path
+
+# Add parent directory to path so this file can run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from config import Config
+from vector_store.vector_store import VectorStore
+from rag.retriever import Retriever
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+_WORDS = (
+    "ability reasoning numerical verbal personality behaviour workplace judgement skills "
+    "leadership manager graduate customer service sales team decision analytical"
+).split()
+
+
+def synthetic_store(n_products=300, dimension=32, code_row=137, code="OPQ32r", seed=0):
+    """
+    Build a flat vector store where exactly one product's name holds a product code.
+    
+    Args:
+        n_products: Number of products
+        dimension: Embedding dimension
+        code_row: Row of the product carrying the code
+        code: Product code only that product mentions
+        seed: Random seed
+    
+    Returns:
+        tuple: (VectorStore, embeddings)
+    """
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((n_products, dimension)).astype('float32')
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    
+    metadata = []
+    for row in range(n_products):
+        words = " ".join(rng.choice(_WORDS, size=12))
+        metadata.append({
+            'id': str(row),
+            'name': f"{code} Questionnaire" if row == code_row else f"Assessment {row}",
+            'description': f"Measures {words}.",
+            'category': 'Personality' if row % 2 else 'Cognitive',
+            'test_type': 'P' if row % 2 else 'A',
+        })
+    
+    vector_store = VectorStore(dimension=dimension, index_type='flat')
+    vector_store.add_vectors(embeddings, metadata)
+    return vector_store, embeddings
+
+
+def check_exact_token_retrieval(ks=(5, 10), fusion=None):
+    """
+    Assert that a product found only by its exact code reaches the hybrid top-k.
+    
+    The query embedding points away from the product, so vector search ranks
+    it last and only BM25 can find it.
+    
+    Args:
+        ks: Cut-offs to check
+        fusion: "rrf" or "weighted" (defaults to Config.HYBRID_FUSION)
+    
+    Returns:
+        dict: k -> rank of the product in the hybrid results
+    """
+    code_row, code = 137, "OPQ32r"
+    vector_store, embeddings = synthetic_store(code_row=code_row, code=code)
+    query_embedding = -embeddings[code_row]
+    
+    retriever = Retriever(vector_store=vector_store)
+    retriever.hybrid_search = True
+    retriever.apply_query_constraints = False
+    retriever.fusion = fusion or Config.HYBRID_FUSION
+    
+    ranks = {}
+    for k in ks:
+        dense = vector_store.search(query_embedding, k=k)
+        assert all(result['index'] != code_row for result in dense), "vector search should miss the product"
+        
+        results = retriever.retrieve(code, k=k, query_embedding=query_embedding)
+        ranks[k] = next((doc['rank'] for doc in results if doc['product_id'] == str(code_row)), None)
+        assert ranks[k] is not None, (
+            f"{retriever.fusion}: product matching '{code}' only by keyword missing from hybrid top-{k}"
+        )
+        logger.info(f"{retriever.fusion}: exact-code product ranked {ranks[k]} in hybrid top-{k}")
+    
+    return ranks
+
+
+def check_min_score_filter(k=10, qualifying=25, fusion=None):
+    """
+    Assert that a min_score filter still returns k products under hybrid fusion.
+    
+    Keyword hits ranked high by fusion can have low similarity, so
+    thresholding the fused top-k would return fewer than k products.
+    
+    Args:
+        k: Number of products requested
+        qualifying: Number of products at or above the threshold, which is set
+            to the similarity of the qualifying-th most similar product
+        fusion: "rrf" or "weighted" (defaults to Config.HYBRID_FUSION)
+    
+    Returns:
+        tuple: (products above min_score in the plain fused top-k, products returned)
+    """
+    vector_store, _ = synthetic_store()
+    query = "leadership personality workplace"
+    query_embedding = np.random.default_rng(1).standard_normal(vector_store.dimension).astype('float32')
+    query_embedding /= np.linalg.norm(query_embedding)
+    min_score = vector_store.search(query_embedding, k=qualifying)[-1]['similarity_score']
+    
+    retriever = Retriever(vector_store=vector_store)
+    retriever.hybrid_search = True
+    retriever.apply_query_constraints = False
+    retriever.fusion = fusion or Config.HYBRID_FUSION
+    
+    top_k = retriever.retrieve(query, k=k, query_embedding=query_embedding)
+    thresholded = sum(doc['similarity_score'] >= min_score for doc in top_k)
+    assert thresholded < k, "check needs fused results below min_score"
+    
+    results = retriever.retrieve_with_filter(query, k=k, min_score=min_score, query_embedding=query_embedding)
+    assert len(results) == k, f"{retriever.fusion}: {len(results)}/{k} products above min_score {min_score:.3f}"
+    assert all(doc['similarity_score'] >= min_score for doc in results)
+    assert [doc['rank'] for doc in results] == list(range(1, k + 1))
+    
+    logger.info(f"{retriever.fusion}: {thresholded}/{k} of the fused top-{k} pass min_score, filter returned {k}")
+    return thresholded, len(results)
+
+
+def main():
+    """Command-line entry point."""
+    for fusion in ('rrf', 'weighted'):
+        ranks = check_exact_token_retrieval(fusion=fusion)
+        print(f"{fusion}: exact-code product ranks {ranks}")
+        thresholded, returned = check_min_score_filter(fusion=fusion)
+        print(f"{fusion}: min_score filter returned {returned} products ({thresholded} pass in the fused top-k)")
+    print("All hybrid retrieval checks passed")
+
+
+if __name__ == "__main__":
+    main()
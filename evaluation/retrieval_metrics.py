@@ -0,0 +1,216 @@
+"""Retrieval quality metrics against the labelled test queries."""
+import sys
+import csv
+import logging
+from pathlib import Path
+
+# Add parent directory to path so this file can run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import Config
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+DEFAULT_GROUND_TRUTH = Config.DATA_DIR / "test_queries.csv"
+
+
+def url_slug(url):
+    """
+    Reduce an assessment URL to its last path segment.
+    
+    Catalogue and ground-truth URLs use different path prefixes for the same
+    product (e.g. /solutions/products/<slug>/ vs
+    /solutions/products/product-catalog/view/<slug>/), so products are
+    compared by slug.
+    
+    Args:
+        url: Assessment URL
+    
+    Returns:
+        str: Lowercased slug, or "" for an empty URL
+    """
+    if not url:
+        return ""
+    return str(url).strip().rstrip('/').rsplit('/', 1)[-1].lower()
+
+
+def load_ground_truth(path=None):
+    """
+    Load relevant assessments per query from a Query,Assessment_url CSV.
+    
+    Args:
+        path: CSV path (defaults to data/test_queries.csv)
+    
+    Returns:
+        dict: query -> list of relevant assessment slugs, in file order
+    """
+    path = Path(path or DEFAULT_GROUND_TRUTH)
+    ground_truth = {}
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            slug = url_slug(row['Assessment_url'])
+            relevant = ground_truth.setdefault(row['Query'], [])
+            if slug and slug not in relevant:
+                relevant.append(slug)
+    
+    logger.info(f"Loaded ground truth for {len(ground_truth)} queries from {path}")
+    return ground_truth
+
+
+def recall_at_k(predicted, relevant, k):
+    """
+    Fraction of relevant items found in the top-k predictions.
+    
+    Args:
+        predicted: Ranked list of predicted slugs
+        relevant: Relevant slugs
+        k: Cut-off
+    
+    Returns:
+        float: Recall@k (0.0 when there are no relevant items)
+    """
+    if not relevant:
+        return 0.0
+    return len(set(predicted[:k]) & set(relevant)) / len(relevant)
+
+
+def mean_recall_at_k(predictions, ground_truth, k):
+    """
+    Mean Recall@k over all ground-truth queries.
+    
+    Args:
+        predictions: dict of query -> ranked list of predicted slugs
+        ground_truth: dict of query -> relevant slugs
+        k: Cut-off
+    
+    Returns:
+        float: Mean Recall@k (queries without predictions score 0)
+    """
+    if not ground_truth:
+        return 0.0
+    return sum(
+        recall_at_k(predictions.get(query, []), relevant, k)
+        for query, relevant in ground_truth.items()
+    ) / len(ground_truth)
+
+
+def average_precision_at_k(predicted, relevant, k):
+    """
+    Average precision of the top-k predictions.
+    
+    Args:
+        predicted: Ranked list of predicted slugs
+        relevant: Relevant slugs
+        k: Cut-off
+    
+    Returns:
+        float: AP@k, normalized by min(len(relevant), k)
+    """
+    if not relevant:
+        return 0.0
+    
+    relevant = set(relevant)
+    hits = 0
+    precision_sum = 0.0
+    seen = set()
+    
+    for rank, slug in enumerate(predicted[:k], 1):
+        # A product repeated in the ranking only counts once
+        if slug in relevant and slug not in seen:
+            hits += 1
+            precision_sum += hits / rank
+        seen.add(slug)
+    
+    return precision_sum / min(len(relevant), k)
+
+
+def reciprocal_rank(predicted, relevant):
+    """
+    Reciprocal rank of the first relevant prediction.
+    
+    Args:
+        predicted: Ranked list of predicted slugs
+        relevant: Relevant slugs
+    
+    Returns:
+        float: 1/rank of the first hit, or 0.0 if there is none
+    """
+    relevant = set(relevant)
+    for rank, slug in enumerate(predicted, 1):
+        if slug in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def score_predictions(predictions, ground_truth, ks=(5, 10)):
+    """
+    Compute Recall@k, MAP@k and MRR for ranked predictions.
+    
+    Args:
+        predictions: dict of query -> ranked list of predicted slugs
+        ground_truth: dict of query -> relevant slugs
+        ks: Cut-offs to report
+    
+    Returns:
+        dict: Metric name (e.g. "recall@10", "map@10", "mrr") -> mean value
+    """
+    n = len(ground_truth)
+    if not n:
+        return {}
+    
+    scores = {}
+    for k in ks:
+        scores[f"recall@{k}"] = mean_recall_at_k(predictions, ground_truth, k)
+        scores[f"map@{k}"] = sum(
+            average_precision_at_k(predictions.get(query, []), relevant, k)
+            for query, relevant in ground_truth.items()
+        ) / n
+    
+    scores["mrr"] = sum(
+        reciprocal_rank(predictions.get(query, []), relevant)
+        for query, relevant in ground_truth.items()
+    ) / n
+    
+    return scores
+
+
+def recommendation_slugs(result):
+    """Ranked assessment slugs from a Recommender result dict."""
+    return [
+        url_slug(rec.get('assessment_url') or rec.get('url'))
+        for rec in result.get('recommendations', [])
+    ]
+
+
+def evaluate_retriever(retriever, ground_truth, k=10):
+    """
+    Measure vector-search Recall@k on the labelled queries.
+    
+    Args:
+        retriever: Retriever instance
+        ground_truth: dict of query -> relevant slugs
+        k: Cut-off
+    
+    Returns:
+        float: Mean Recall@k
+    """
+    queries = list(ground_truth)
+    batch_docs = retriever.retrieve_batch(queries, k=k)
+    
+    predictions = {
+        query: [url_slug(doc.get('assessment_url') or doc.get('url')) for doc in docs]
+        for query, docs in zip(queries, batch_docs)
+    }
+    return mean_recall_at_k(predictions, ground_truth, k)
+
+
+if __name__ == "__main__":
+    from rag.retriever import Retriever
+    
+    ground_truth = load_ground_truth()
+    retriever = Retriever()
+    
+    for k in (5, 10):
+        print(f"Retrieval Recall@{k}: {evaluate_retriever(retriever, ground_truth, k):.3f}")
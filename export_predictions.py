@@ -5,19 +5,61 @@ from datetime import datetime
 from pathlib import Path
 from config import Config
 from rag.recommender import Recommender
+from rag.batch_runner import BatchRunner
 
 logging.basicConfig(level=Config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 
-def export_predictions_to_csv(queries, output_filename=None, recommender=None):
+def _extract_query_strings(queries):
+    """
+    Normalize query items to a list of non-empty query strings.
+    
+    Args:
+        queries: List of query strings or dictionaries with 'query' key
+    
+    Returns:
+        list: Query strings, with empty queries skipped
+    """
+    query_strings = []
+    
+    for i, query_item in enumerate(queries, 1):
+        # Extract query string
+        if isinstance(query_item, dict):
+            query = query_item.get('query', '')
+        else:
+            query = str(query_item)
+        
+        if not query.strip():
+            logger.warning(f"Skipping empty query at index {i}")
+            continue
+        
+        query_strings.append(query)
+    
+    return query_strings
+
+
+def _create_runner(recommender, output_path, resume):
+    """Create a batch runner journaling next to an output CSV."""
+    journal_path = output_path.with_suffix('.journal.jsonl')
+    if not resume:
+        journal_path.unlink(missing_ok=True)
+    
+    return BatchRunner(recommender, journal_path, top_k=5)
+
+
+def export_predictions_to_csv(queries, output_filename=None, recommender=None, resume=True):
     """
     Generate predictions and export to CSV.
     
+    Queries run in parallel and rows are written in input order as soon as
+    all earlier queries finish; an interrupted run resumes from its journal.
+    
     Args:
         queries: List of query strings or dictionaries with 'query' key
         output_filename: Output CSV filename (defaults to firstname_lastname.csv)
         recommender: Recommender instance (will create if None)
+        resume: Reuse results from a previous run's journal
     
     Returns:
         Path: Path to exported CSV file
@@ -33,67 +75,42 @@ def export_predictions_to_csv(queries, output_filename=None, recommender=None):
     
     logger.info(f"Generating predictions for {len(queries)} queries")
     
-    predictions = []
+    query_strings = _extract_query_strings(queries)
+    runner = _create_runner(recommender, output_path, resume)
     
-    for i, query_item in enumerate(queries, 1):
-        # Extract query string
-        if isinstance(query_item, dict):
-            query = query_item.get('query', '')
-        else:
-            query = str(query_item)
-        
-        if not query.strip():
-            logger.warning(f"Skipping empty query at index {i}")
-            continue
-        
-        logger.info(f"Processing query {i}/{len(queries)}: {query}")
-        
-        try:
-            # Generate recommendations
-            result = recommender.recommend(query, top_k=5)
-            
-            # Extract recommended assessment names
-            recommended_names = [
-                rec.get('assessment_name', '')
-                for rec in result.get('recommendations', [])
-            ]
-            
-            # Format as comma-separated string
-            recommendations_str = ', '.join(recommended_names) if recommended_names else 'No recommendations'
-            
-            predictions.append({
-                'query': query,
-                'recommendations': recommendations_str,
-                'num_recommendations': len(recommended_names),
-                'processing_time': result.get('processing_time', 0)
-            })
-        
-        except Exception as e:
-            logger.error(f"Error processing query {i}: {e}")
-            predictions.append({
-                'query': query,
-                'recommendations': 'Error',
-                'num_recommendations': 0,
-                'processing_time': 0
-            })
-    
-    # Write to CSV
+    count = 0
+    
+    # Write to CSV in input order as predictions complete
     with open(output_path, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         
         # Write header
         writer.writerow(['Query', 'Recommended Assessments'])
         
-        # Write predictions
-        for pred in predictions:
-            writer.writerow([pred['query'], pred['recommendations']])
+        for query, result in runner.run(query_strings):
+            if 'error' in result:
+                logger.error(f"Error processing query '{query[:60]}': {result['error']}")
+                recommendations_str = 'Error'
+            else:
+                # Extract recommended assessment names
+                recommended_names = [
+                    rec.get('assessment_name', '')
+                    for rec in result.get('recommendations', [])
+                ]
+                
+                # Format as comma-separated string
+                recommendations_str = ', '.join(recommended_names) if recommended_names else 'No recommendations'
+            
+            writer.writerow([query, recommendations_str])
+            f.flush()
+            count += 1
     
-    logger.info(f"Exported {len(predictions)} predictions to {output_path}")
+    logger.info(f"Exported {count} predictions to {output_path}")
     
     return output_path
 
 
-def export_detailed_predictions(queries, output_filename=None, recommender=None):
+def export_detailed_predictions(queries, output_filename=None, recommender=None, resume=True):
     """
     Generate detailed predictions with scores and export to CSV.
     
@@ -101,6 +118,7 @@ def export_detailed_predictions(queries, output_filename=None, recommender=None)
         queries: List of query strings
         output_filename: Output CSV filename
         recommender: Recommender instance
+        resume: Reuse results from a previous run's journal
     
     Returns:
         Path: Path to exported CSV file
@@ -116,43 +134,30 @@ def export_detailed_predictions(queries, output_filename=None, recommender=None)
     
     logger.info(f"Generating detailed predictions for {len(queries)} queries")
     
-    rows = []
+    query_strings = _extract_query_strings(queries)
+    runner = _create_runner(recommender, output_path, resume)
     
-    for i, query_item in enumerate(queries, 1):
-        # Extract query string
-        if isinstance(query_item, dict):
-            query = query_item.get('query', '')
-        else:
-            query = str(query_item)
-        
-        if not query.strip():
-            continue
-        
-        logger.info(f"Processing query {i}/{len(queries)}")
+    fieldnames = ['query', 'assessment_name', 'relevance_score', 'category', 'reasoning']
+    
+    # Write to CSV in input order as predictions complete
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
         
-        try:
-            result = recommender.recommend(query, top_k=5)
+        for query, result in runner.run(query_strings):
+            if 'error' in result:
+                logger.error(f"Error processing query '{query[:60]}': {result['error']}")
+                continue
             
             for rec in result.get('recommendations', []):
-                rows.append({
+                writer.writerow({
                     'query': query,
                     'assessment_name': rec.get('assessment_name', ''),
                     'relevance_score': rec.get('relevance_score', 0),
                     'category': rec.get('category', ''),
                     'reasoning': rec.get('reasoning', '')[:200]  # Truncate reasoning
                 })
-        
-        except Exception as e:
-            logger.error(f"Error processing query {i}: {e}")
-    
-    # Write to CSV
-    with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        if rows:
-            fieldnames = ['query', 'assessment_name', 'relevance_score', 'category', 'reasoning']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            
-            writer.writeheader()
-            writer.writerows(rows)
+            f.flush()
     
     logger.info(f"Exported detailed predictions to {output_path}")
     
@@ -1,21 +1,44 @@
 """Generate predictions for submission."""
+import csv
 import pandas as pd
 import logging
 from pathlib import Path
 from config import Config
 from rag.recommender import Recommender
+from rag.batch_runner import BatchRunner
 
 logging.basicConfig(level=Config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 
-def generate_submission_file(input_file, output_filename):
+def _format_urls(result):
+    """Format a recommendation result as the submission's Assessment_url value."""
+    if 'error' in result:
+        return 'Error'
+    
+    # Extract assessment URLs from recommendations
+    assessment_urls = []
+    for rec in result.get('recommendations', []):
+        url = rec.get('assessment_url', rec.get('url', ''))
+        if url and url != 'N/A':
+            assessment_urls.append(url)
+    
+    return ', '.join(assessment_urls) if assessment_urls else 'No recommendations'
+
+
+def generate_submission_file(input_file, output_filename, recommender=None, resume=True):
     """
     Generate predictions from test queries and create submission CSV.
     
+    Queries run in parallel and each finished query is journaled next to the
+    output, so an interrupted run resumes without repeating LLM calls. Rows are
+    written to the CSV in input order as soon as all earlier queries finish.
+    
     Args:
         input_file: Path to test queries CSV
         output_filename: Output CSV filename
+        recommender: Recommender instance (will create if None)
+        resume: Reuse results from a previous run's journal
     
     Returns:
         Path: Path to exported CSV file
@@ -29,48 +52,31 @@ def generate_submission_file(input_file, output_filename):
     logger.info(f"Found {len(unique_queries)} unique queries")
     
     # Initialize recommender
-    logger.info("Initializing recommender...")
-    recommender = Recommender()
-    logger.info("Recommender initialized successfully")
+    if recommender is None:
+        logger.info("Initializing recommender...")
+        recommender = Recommender()
+        logger.info("Recommender initialized successfully")
     
-    # Generate predictions
-    results = []
+    output_path = Config.PREDICTIONS_DIR / output_filename
+    output_path.parent.mkdir(parents=True, exist_ok=True)
     
-    for i, query in enumerate(unique_queries, 1):
-        logger.info(f"Processing query {i}/{len(unique_queries)}")
-        
-        try:
-            # Get recommendations
-            result = recommender.recommend(query, top_k=10)
-            
-            # Extract assessment URLs from recommendations
-            assessment_urls = []
-            for rec in result.get('recommendations', []):
-                url = rec.get('assessment_url', rec.get('url', ''))
-                if url and url != 'N/A':
-                    assessment_urls.append(url)
-            
-            # Add result
-            results.append({
-                'Query': query,
-                'Assessment_url': ', '.join(assessment_urls) if assessment_urls else 'No recommendations'
-            })
-            
-        except Exception as e:
-            logger.error(f"Error processing query {i}: {e}")
-            results.append({
-                'Query': query,
-                'Assessment_url': 'Error'
-            })
+    journal_path = output_path.with_suffix('.journal.jsonl')
+    if not resume:
+        journal_path.unlink(missing_ok=True)
     
-    # Create DataFrame
-    results_df = pd.DataFrame(results)
+    runner = BatchRunner(recommender, journal_path, top_k=10)
     
-    # Save to CSV
-    output_path = Config.PREDICTIONS_DIR / output_filename
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    # Rebuild the CSV from the journal, then append rows in input order as queries finish
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Query', 'Assessment_url'])
+        
+        for query, result in runner.run(list(unique_queries)):
+            if 'error' in result:
+                logger.error(f"Error processing query '{query[:60]}': {result['error']}")
+            writer.writerow([query, _format_urls(result)])
+            f.flush()
     
-    results_df.to_csv(output_path, index=False)
     logger.info(f"Saved predictions to {output_path}")
     
     return output_path
@@ -0,0 +1,344 @@
+"""In-process metrics with Prometheus text exposition and per-request stage timings."""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from config import Config
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from sub-millisecond FAISS searches to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Prompt size buckets in tokens
+TOKEN_BUCKETS = (64, 128, 256, 512, 768, 1024, 1536, 2048, 3072, 4096, 8192)
+
+# Query embedding micro-batch sizes
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+# Cosine similarity of the nearest semantic cache entry
+SIMILARITY_BUCKETS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.925, 0.95, 0.975, 0.99, 1.0)
+
+# Stage timings (ms) collected for the current request, if something is collecting them
+_stage_timings = ContextVar('stage_timings', default=None)
+
+
+def _escape_label(value):
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_names, label_values, extra=None):
+    """Format a {name="value",...} label set (empty string if there are no labels)."""
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.extend(f'{name}="{_escape_label(value)}"' for name, value in extra.items())
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    """Format a sample value, using Prometheus spellings for infinities."""
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for labelled metrics."""
+    
+    metric_type = None
+    
+    def __init__(self, name, help_text, label_names=()):
+        """
+        Initialize metric.
+        
+        Args:
+            name: Metric name
+            help_text: HELP description
+            label_names: Names of the metric's labels
+        """
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels):
+        """Label values tuple in label_names order."""
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+    
+    def _header(self):
+        """HELP and TYPE lines."""
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+    
+    metric_type = "counter"
+    
+    def inc(self, amount=1, **labels):
+        """Increase the value for a label set."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def render(self):
+        """Exposition lines for this metric."""
+        with self._lock:
+            values = dict(self._values)
+        lines = self._header()
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+    
+    metric_type = "gauge"
+    
+    def set(self, value, **labels):
+        """Set the value for a label set."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+    
+    def inc(self, amount=1, **labels):
+        """Increase the value for a label set."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def dec(self, amount=1, **labels):
+        """Decrease the value for a label set."""
+        self.inc(-amount, **labels)
+    
+    def render(self):
+        """Exposition lines for this metric."""
+        with self._lock:
+            values = dict(self._values) or ({(): 0} if not self.label_names else {})
+        lines = self._header()
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of observed values."""
+    
+    metric_type = "histogram"
+    
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        """
+        Initialize histogram.
+        
+        Args:
+            name: Metric name
+            help_text: HELP description
+            label_names: Names of the metric's labels
+            buckets: Upper bounds of the buckets (+Inf is added)
+        """
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+    
+    def observe(self, value, **labels):
+        """Record one observation for a label set."""
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+    
+    def render(self):
+        """Exposition lines for this metric."""
+        with self._lock:
+            values = {key: {'counts': list(s['counts']), 'sum': s['sum'], 'count': s['count']}
+                      for key, s in self._values.items()}
+        lines = self._header()
+        for key, series in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['counts']):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, {'le': _format_value(bound)})
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+    
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+    
+    def _register(self, metric):
+        """Add a metric to the registry and return it."""
+        self._metrics.append(metric)
+        return metric
+    
+    def counter(self, name, help_text, label_names=()):
+        """Create and register a Counter."""
+        return self._register(Counter(name, help_text, label_names))
+    
+    def gauge(self, name, help_text, label_names=()):
+        """Create and register a Gauge."""
+        return self._register(Gauge(name, help_text, label_names))
+    
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        """Create and register a Histogram."""
+        return self._register(Histogram(name, help_text, label_names, buckets))
+    
+    def register_collector(self, collector):
+        """
+        Register a callable returning exposition lines computed at scrape time.
+        
+        Args:
+            collector: Function with no arguments returning a list of lines
+        """
+        self._collectors.append(collector)
+    
+    def render(self):
+        """
+        Render all metrics.
+        
+        Returns:
+            str: Prometheus text exposition format
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    'shl_stage_duration_seconds', 'Latency of recommendation pipeline stages', ['stage']
+)
+
+PROMPT_TOKENS = REGISTRY.histogram(
+    'shl_llm_prompt_tokens', 'Tokens in LLM prompts and their retrieved-product context', ['part'],
+    buckets=TOKEN_BUCKETS
+)
+
+CONTEXT_TRUNCATIONS = REGISTRY.counter(
+    'shl_context_truncations_total', 'Context builder budget decisions (dropped products, shortened fields)',
+    ['action']
+)
+
+EMBEDDING_BATCH_SIZE = REGISTRY.histogram(
+    'shl_embedding_batch_size', 'Queries per micro-batched embedding encode call', buckets=BATCH_SIZE_BUCKETS
+)
+
+EMBEDDING_QUEUE_DELAY = REGISTRY.histogram(
+    'shl_embedding_queue_delay_seconds', 'Time a query waited for its embedding batch to be dispatched'
+)
+
+SEMANTIC_CACHE_SIMILARITY = REGISTRY.histogram(
+    'shl_semantic_cache_similarity', 'Similarity of the nearest semantic cache entry per lookup', ['outcome'],
+    buckets=SIMILARITY_BUCKETS
+)
+
+
+def record_stage(stage, seconds):
+    """
+    Record a stage duration in the stage histogram and the current request's timings.
+    
+    Args:
+        stage: Stage name (e.g. "embed", "search", "llm")
+        seconds: Elapsed time in seconds
+    """
+    STAGE_DURATION.observe(seconds, stage=stage)
+    
+    timings = _stage_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds * 1000
+
+
+@contextmanager
+def stage_timer(stage):
+    """Time the enclosed block as a pipeline stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def collect_stage_timings():
+    """
+    Collect per-stage timings for everything run in the enclosed block.
+    
+    Work handed to threads must run in a copy of the current context
+    (contextvars.copy_context) for its stages to be included.
+    
+    Yields:
+        dict: stage -> total milliseconds, filled in as stages complete
+    """
+    timings = {}
+    token = _stage_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _stage_timings.reset(token)
+
+
+def render_cache_stats(cache_stats, prefix=""):
+    """
+    Render hit/miss counts, hit rates and evictions from Recommender.get_cache_stats().
+    
+    Args:
+        cache_stats: Nested dict of cache name -> stats dict (or None)
+        prefix: Cache name prefix for nested stats
+    
+    Returns:
+        list: Exposition lines for shl_cache_hits_total, shl_cache_misses_total,
+            shl_cache_hit_ratio, shl_cache_evictions_total and, for the
+            semantic cache, shl_cache_similarity_threshold
+    """
+    samples = []
+    
+    def collect(stats, name):
+        if not isinstance(stats, dict):
+            return
+        if 'hits' in stats and 'misses' in stats:
+            samples.append((name, stats))
+            return
+        for child_name, child in stats.items():
+            collect(child, f"{name}.{child_name}" if name else child_name)
+    
+    collect(cache_stats, prefix)
+    
+    lines = []
+    for metric, metric_type, help_text, field in (
+        ('shl_cache_hits_total', 'counter', 'Cache hits', 'hits'),
+        ('shl_cache_misses_total', 'counter', 'Cache misses', 'misses'),
+        ('shl_cache_hit_ratio', 'gauge', 'Cache hit rate', 'hit_rate'),
+        ('shl_cache_evictions_total', 'counter', 'Entries evicted to stay within the size limit', 'evictions'),
+        ('shl_cache_similarity_threshold', 'gauge', 'Minimum similarity for a semantic cache hit', 'threshold'),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {metric_type}")
+        for name, stats in samples:
+            if field not in stats:
+                continue
+            lines.append(f'{metric}{{cache="{_escape_label(name)}"}} {_format_value(stats.get(field, 0))}')
+    
+    return lines
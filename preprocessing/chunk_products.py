@@ -1,11 +1,27 @@
 """Text chunking utilities for long product descriptions."""
+import re
 import logging
-from typing import List, Dict
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
 from config import Config
 
 logging.basicConfig(level=Config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
+# Whitespace after ".", "!" or "?" ends a sentence
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+_WORD_PATTERN = re.compile(r"\S+\s*")
+
+
+# Smallest description share of a chunk, even when the text around it fills the window
+MIN_CHUNK_TOKENS = 32
+
+
+def _default_token_counter(texts):
+    """Count tokens with the default embedding model's own tokenizer."""
+    from embeddings.build_embeddings import count_embedding_tokens_batch
+    return count_embedding_tokens_batch(texts)
+
 
 def estimate_tokens(text):
     """
@@ -20,70 +36,159 @@ def estimate_tokens(text):
     return len(text) // 4
 
 
-def chunk_text(text, max_tokens=512, overlap_tokens=50):
+def _split_span(text, start, end, max_tokens, token_counter):
     """
-    Split text into overlapping chunks.
+    Split an over-long sentence into word segments.
     
-    Args:
-        text: Text to chunk
-        max_tokens: Maximum tokens per chunk
-        overlap_tokens: Number of tokens to overlap between chunks
+    Words that alone exceed max_tokens (e.g. long unbroken strings) are cut
+    into equal character pieces.
     
     Returns:
-        list: List of text chunks
+        tuple: (spans, counts) as for _segments
     """
-    if not text:
-        return []
+    word_spans = [word.span() for word in _WORD_PATTERN.finditer(text, start, end)]
+    word_counts = token_counter([text[span[0]:span[1]] for span in word_spans])
+    
+    spans, counts = [], []
+    for (word_start, word_end), tokens in zip(word_spans, word_counts):
+        if tokens <= max_tokens:
+            spans.append((word_start, word_end))
+            counts.append(tokens)
+            continue
+        
+        pieces = -(-tokens // max_tokens)
+        piece_length = -(-(word_end - word_start) // pieces)
+        piece_spans = [
+            (piece_start, min(piece_start + piece_length, word_end))
+            for piece_start in range(word_start, word_end, piece_length)
+        ]
+        spans.extend(piece_spans)
+        counts.extend(token_counter([text[span[0]:span[1]] for span in piece_spans]))
+    return spans, counts
+
+
+def _segments(text, max_tokens, token_counter):
+    """
+    Split text into sentence spans with their token counts, in one pass.
     
-    # Convert tokens to approximate character count
-    max_chars = max_tokens * 4
-    overlap_chars = overlap_tokens * 4
+    Each span includes the whitespace after it, so a chunk's token count is
+    at most the sum of its segments' counts. Sentences longer than max_tokens
+    are split into words so every chunk boundary falls on a segment boundary.
     
-    # If text is short enough, return as single chunk
-    if len(text) <= max_chars:
-        return [text]
+    Returns:
+        tuple: (spans, counts) with (start, end) character offsets and the
+            token count of each segment
+    """
+    sentence_spans = []
+    start = len(text) - len(text.lstrip())
+    for match in _SENTENCE_BREAK.finditer(text, start):
+        sentence_spans.append((start, match.end()))
+        start = match.end()
+    if start < len(text):
+        sentence_spans.append((start, len(text)))
+    
+    sentence_counts = token_counter([text[start:end] for start, end in sentence_spans])
+    if max(sentence_counts, default=0) <= max_tokens:
+        return sentence_spans, sentence_counts
+    
+    spans, counts = [], []
+    for (start, end), tokens in zip(sentence_spans, sentence_counts):
+        if tokens <= max_tokens:
+            spans.append((start, end))
+            counts.append(tokens)
+        else:
+            split_spans, split_counts = _split_span(text, start, end, max_tokens, token_counter)
+            spans.extend(split_spans)
+            counts.extend(split_counts)
+    return spans, counts
+
+
+def iter_chunks(text, max_tokens=512, overlap_tokens=50, token_counter=None):
+    """
+    Lazily split text into overlapping chunks at sentence boundaries.
     
-    chunks = []
-    start = 0
+    Sentences are found and tokenized once; each chunk end is then a bisect
+    over the cumulative token counts, so chunking is linear in the text length.
+    Consecutive chunks share up to overlap_tokens of whole trailing sentences.
     
-    while start < len(text):
-        # Calculate end position
-        end = start + max_chars
-        
-        # If this is not the last chunk, try to break at sentence boundary
-        if end < len(text):
-            # Look for sentence endings near the end position
-            sentence_ends = ['. ', '! ', '? ', '.\n', '!\n', '?\n']
-            best_break = end
-            
-            # Search backwards from end position for sentence boundary
-            search_start = max(start, end - 200)  # Search within 200 chars
-            for i in range(end, search_start, -1):
-                for ending in sentence_ends:
-                    if text[i:i+len(ending)] == ending:
-                        best_break = i + len(ending)
-                        break
-                if best_break != end:
-                    break
-            
-            end = best_break
-        
-        # Extract chunk
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
+    Args:
+        text: Text to chunk
+        max_tokens: Maximum tokens per chunk
+        overlap_tokens: Number of tokens to overlap between chunks
+        token_counter: Callable mapping a list of texts to their token counts,
+            normally the embedding model's own tokenizer (defaults to the
+            tokenizer of the default HuggingFace embedding model)
+    
+    Yields:
+        str: Text chunks in order
+    """
+    if not text or not text.strip():
+        return
+    
+    token_counter = token_counter or _default_token_counter
+    spans, counts = _segments(text, max_tokens, token_counter)
+    
+    # cumulative[i] is the token count of segments [0, i)
+    cumulative = [0] + list(accumulate(counts))
+    if cumulative[-1] <= max_tokens:
+        yield text.strip()
+        return
+    
+    first = 0
+    while first < len(spans):
+        # Furthest segment end keeping the chunk within max_tokens (at least one segment)
+        last = max(bisect_right(cumulative, cumulative[first] + max_tokens) - 1, first + 1)
+        yield text[spans[first][0]:spans[last - 1][1]].rstrip()
         
-        # Move start position with overlap
-        start = end - overlap_chars
+        if last == len(spans):
+            return
         
-        # Ensure we make progress
-        if start <= chunks[-1] if chunks else 0:
-            start = end
+        # Start the next chunk at the earliest segment within the overlap, but late
+        # enough that it still fits segment last; otherwise it would be a strict
+        # subset of the chunk after it
+        first = max(
+            bisect_left(cumulative, cumulative[last] - overlap_tokens),
+            bisect_left(cumulative, cumulative[last + 1] - max_tokens),
+            first + 1,
+        )
+
+
+def chunk_text(text, max_tokens=512, overlap_tokens=50, token_counter=None):
+    """
+    Split text into overlapping chunks.
+    
+    Args:
+        text: Text to chunk
+        max_tokens: Maximum tokens per chunk
+        overlap_tokens: Number of tokens to overlap between chunks
+        token_counter: Callable mapping a list of texts to their token counts,
+            normally the embedding model's own tokenizer (defaults to the
+            tokenizer of the default HuggingFace embedding model)
     
-    return chunks
+    Returns:
+        list: List of text chunks
+    """
+    return list(iter_chunks(text, max_tokens, overlap_tokens, token_counter))
 
 
-def chunk_product(product, max_tokens=512, overlap_tokens=50):
+def _description_budget(product, max_tokens, overlap_tokens, reserved):
+    """
+    Shrink the chunk budget by the tokens the embedding text spends elsewhere.
+    
+    Returns:
+        tuple: (max_tokens, overlap_tokens) for the description
+    """
+    budget = max_tokens - reserved
+    if budget < MIN_CHUNK_TOKENS:
+        logger.warning(
+            f"Embedding text of product {product.get('id')} leaves {budget} of {max_tokens} tokens "
+            f"for the description, so its chunks will be truncated"
+        )
+        budget = MIN_CHUNK_TOKENS
+    return budget, min(overlap_tokens, budget // 2)
+
+
+def iter_product_chunks(product, max_tokens=512, overlap_tokens=50, token_counter=None, reserved_tokens=None):
     """
     Chunk a product's description if it's too long.
     
@@ -91,40 +196,75 @@ def chunk_product(product, max_tokens=512, overlap_tokens=50):
         product: Product dictionary
         max_tokens: Maximum tokens per chunk
         overlap_tokens: Overlap between chunks
+        token_counter: Token counting callable, as for iter_chunks
+        reserved_tokens: Callable mapping a product to the tokens its embedding
+            text spends outside the description (name, skills, special
+            tokens), taken off max_tokens
     
-    Returns:
-        list: List of product dictionaries (original or chunked)
+    Yields:
+        dict: The product itself, or one product dictionary per chunk
     """
-    description = product.get('description', '')
-    
-    # Check if chunking is needed
-    estimated_tokens = estimate_tokens(description)
-    
-    if estimated_tokens <= max_tokens:
+    if reserved_tokens is not None:
+        max_tokens, overlap_tokens = _description_budget(
+            product, max_tokens, overlap_tokens, reserved_tokens(product)
+        )
+    
+    # Every chunk record carries total_chunks, so one description is chunked eagerly
+    chunk_texts = chunk_text(product.get('description', ''), max_tokens, overlap_tokens, token_counter)
+    if len(chunk_texts) <= 1:
         # No chunking needed
-        return [product]
+        yield product
+        return
     
-    # Chunk the description
-    chunks = chunk_text(description, max_tokens, overlap_tokens)
+    logger.debug(f"Chunked product {product.get('id')} into {len(chunk_texts)} parts")
     
-    logger.debug(f"Chunked product {product.get('id')} into {len(chunks)} parts")
-    
-    # Create a product dict for each chunk
-    chunked_products = []
-    for i, chunk in enumerate(chunks):
+    for i, chunk in enumerate(chunk_texts):
         chunked_product = product.copy()
         chunked_product['description'] = chunk
         chunked_product['chunk_id'] = i
-        chunked_product['total_chunks'] = len(chunks)
+        chunked_product['total_chunks'] = len(chunk_texts)
         chunked_product['original_id'] = product.get('id')
         chunked_product['id'] = f"{product.get('id')}_chunk_{i}"
         
-        chunked_products.append(chunked_product)
+        yield chunked_product
+
+
+def chunk_product(product, max_tokens=512, overlap_tokens=50, token_counter=None, reserved_tokens=None):
+    """
+    Chunk a product's description if it's too long.
     
-    return chunked_products
+    Args:
+        product: Product dictionary
+        max_tokens: Maximum tokens per chunk
+        overlap_tokens: Overlap between chunks
+        token_counter: Token counting callable, as for iter_chunks
+        reserved_tokens: Per-product tokens taken off max_tokens, as for iter_product_chunks
+    
+    Returns:
+        list: List of product dictionaries (original or chunked)
+    """
+    return list(iter_product_chunks(product, max_tokens, overlap_tokens, token_counter, reserved_tokens))
+
+
+def iter_chunked_products(products, max_tokens=512, overlap_tokens=50, token_counter=None, reserved_tokens=None):
+    """
+    Chunk a catalogue lazily, one product at a time.
+    
+    Args:
+        products: Iterable of product dictionaries
+        max_tokens: Maximum tokens per chunk
+        overlap_tokens: Overlap between chunks
+        token_counter: Token counting callable, as for iter_chunks
+        reserved_tokens: Per-product tokens taken off max_tokens, as for iter_product_chunks
+    
+    Yields:
+        dict: Products, with long ones replaced by their chunks
+    """
+    for product in products:
+        yield from iter_product_chunks(product, max_tokens, overlap_tokens, token_counter, reserved_tokens)
 
 
-def chunk_products(products, max_tokens=512, overlap_tokens=50):
+def chunk_products(products, max_tokens=512, overlap_tokens=50, token_counter=None, reserved_tokens=None):
     """
     Chunk all products that exceed max token length.
     
@@ -132,27 +272,40 @@ def chunk_products(products, max_tokens=512, overlap_tokens=50):
         products: List of product dictionaries
         max_tokens: Maximum tokens per chunk
         overlap_tokens: Overlap between chunks
+        token_counter: Token counting callable, as for iter_chunks
+        reserved_tokens: Per-product tokens taken off max_tokens, as for iter_product_chunks
     
     Returns:
         list: List of products (some may be chunked)
     """
     logger.info(f"Chunking {len(products)} products (max_tokens={max_tokens})")
     
-    chunked_products = []
-    total_chunks = 0
-    
-    for product in products:
-        product_chunks = chunk_product(product, max_tokens, overlap_tokens)
-        chunked_products.extend(product_chunks)
-        
-        if len(product_chunks) > 1:
-            total_chunks += len(product_chunks)
+    chunked_products = list(
+        iter_chunked_products(products, max_tokens, overlap_tokens, token_counter, reserved_tokens)
+    )
+    total_chunks = sum(1 for product in chunked_products if 'original_id' in product)
     
     logger.info(f"Created {len(chunked_products)} total items ({total_chunks} chunks from long descriptions)")
     
     return chunked_products
 
 
+def product_key(product, id_field='id'):
+    """
+    Get the id of the catalogue product a record belongs to.
+    
+    Args:
+        product: Product or chunk dictionary
+        id_field: Key holding the record id (e.g. "product_id" for retrieved documents)
+    
+    Returns:
+        str: original_id for chunks ("<id>_chunk_<i>"), otherwise the id
+    """
+    if product.get('original_id') is not None:
+        return str(product['original_id'])
+    return str(product.get(id_field, '')).split('_chunk_')[0]
+
+
 def merge_chunked_results(results):
     """
     Merge results from chunked products back together.
@@ -167,13 +320,7 @@ def merge_chunked_results(results):
     grouped = {}
     
     for result in results:
-        product_id = result.get('id', '')
-        
-        # Check if this is a chunked product
-        if '_chunk_' in product_id:
-            original_id = result.get('original_id', product_id.split('_chunk_')[0])
-        else:
-            original_id = product_id
+        original_id = product_key(result)
         
         if original_id not in grouped:
             grouped[original_id] = {
@@ -225,7 +372,7 @@ if __name__ == "__main__":
     chunks = chunk_text(long_text, max_tokens=100, overlap_tokens=20)
     print(f"Created {len(chunks)} chunks")
     for i, chunk in enumerate(chunks):
-        print(f"\nChunk {i+1} ({estimate_tokens(chunk)} tokens):")
+        print(f"\nChunk {i+1} ({_default_token_counter([chunk])[0]} tokens):")
         print(chunk[:100] + "..." if len(chunk) > 100 else chunk)
     
     # Test product chunking
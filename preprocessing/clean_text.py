@@ -7,6 +7,8 @@ from config import Config
 logging.basicConfig(level=Config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
+_MINUTES_PATTERN = re.compile(r"(\d+)\s*(?:-\s*(\d+)\s*)?(min|minute|minutes|mins|hour|hours|hr|hrs)\b")
+
 
 def clean_text(text):
     """
@@ -135,12 +137,54 @@ def normalize_text_for_embedding(text):
     return text
 
 
-def create_embedding_text(product):
+def parse_duration_limit(query):
+    """
+    Extract a time limit in minutes from a query (e.g. "within 40 minutes", "1 hour").
+    
+    Args:
+        query: Query text
+    
+    Returns:
+        int: Limit in minutes, or None if the query doesn't mention one
+    """
+    match = _MINUTES_PATTERN.search(query.lower())
+    if not match:
+        return None
+    
+    value = int(match.group(2) or match.group(1))
+    if match.group(3).startswith('h'):
+        value *= 60
+    return value
+
+
+def parse_duration_range(duration):
+    """
+    Parse a product duration such as "20-45 minutes" into (min, max) minutes.
+    
+    Returns:
+        tuple: (min, max) minutes, or None if unparseable
+    """
+    if not duration:
+        return None
+    
+    match = _MINUTES_PATTERN.search(str(duration).lower())
+    if not match:
+        return None
+    
+    scale = 60 if match.group(3).startswith('h') else 1
+    low = int(match.group(1)) * scale
+    high = int(match.group(2) or match.group(1)) * scale
+    return low, high
+
+
+def create_embedding_text(product, normalize=True):
     """
     Create a combined text representation of a product for embedding.
     
     Args:
         product: Product dictionary
+        normalize: Lowercase and strip punctuation for the embedding model. Pass
+            False to keep tokens such as "C#" or "G+" intact (e.g. for keyword search)
     
     Returns:
         str: Combined text for embedding
@@ -172,6 +216,9 @@ def create_embedding_text(product):
     # Combine all parts
     combined_text = ' '.join(parts)
     
+    if not normalize:
+        return ' '.join(combined_text.split())
+    
     # Normalize for embedding
     normalized_text = normalize_text_for_embedding(combined_text)
     
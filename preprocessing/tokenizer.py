@@ -0,0 +1,303 @@
+"""Token counting and token-budgeted LLM context building."""
+import logging
+import math
+from functools import lru_cache
+from config import Config
+from monitoring.metrics import CONTEXT_TRUNCATIONS, PROMPT_TOKENS
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+# Fallback ratio when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+# Descriptions shorter than this are left out rather than cut to a stub
+MIN_DESCRIPTION_TOKENS = 8
+
+ELLIPSIS = "…"
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model=None):
+    """
+    Get the tiktoken encoding for an LLM model.
+    
+    Args:
+        model: Model name (defaults to Config.LLM_MODEL)
+    
+    Returns:
+        tiktoken.Encoding, or None if tiktoken is unavailable
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning(
+            "tiktoken not installed, approximating token counts. Install with: pip install tiktoken"
+        )
+        return None
+    
+    model = model or Config.LLM_MODEL
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use
+        logger.warning(f"Failed to load tiktoken encoding for {model}, approximating token counts: {e}")
+        return None
+
+
+def count_tokens(text, model=None):
+    """
+    Count tokens in text with the model's tokenizer.
+    
+    Args:
+        text: Text string
+        model: Model name (defaults to Config.LLM_MODEL)
+    
+    Returns:
+        int: Token count (approximated from length if tiktoken is unavailable)
+    """
+    if not text:
+        return 0
+    
+    encoding = get_encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens_batch(texts, model=None):
+    """
+    Count tokens in many texts with one tokenizer call.
+    
+    Args:
+        texts: List of text strings
+        model: Model name (defaults to Config.LLM_MODEL)
+    
+    Returns:
+        list: Token count per text (approximated from length if tiktoken is unavailable)
+    """
+    encoding = get_encoding(model)
+    if encoding is None:
+        return [-(-len(text) // CHARS_PER_TOKEN) for text in texts]
+    return [len(tokens) for tokens in encoding.encode_batch(texts, disallowed_special=())]
+
+
+def truncate_to_tokens(text, max_tokens, model=None):
+    """
+    Shorten text to at most max_tokens tokens, cutting at a word boundary.
+    
+    Args:
+        text: Text string
+        max_tokens: Token limit, including the appended ellipsis
+        model: Model name (defaults to Config.LLM_MODEL)
+    
+    Returns:
+        tuple: (text, truncated) where truncated is True if text was shortened
+    """
+    if not text or max_tokens <= 0:
+        return "", bool(text)
+    
+    encoding = get_encoding(model)
+    if encoding is None:
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text, False
+        prefix = text[:max_chars - len(ELLIPSIS)]
+    else:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text, False
+        prefix = encoding.decode(tokens[:max_tokens - 1])
+    
+    # Drop the partial last word
+    if " " in prefix:
+        prefix = prefix.rsplit(" ", 1)[0]
+    return prefix.rstrip(" ,;:.-") + ELLIPSIS, True
+
+
+def _cell(value):
+    """Make a value safe for a single table cell."""
+    return " ".join(str(value).replace("|", "/").split())
+
+
+class ContextBuilder:
+    """
+    Build the retrieved-products context for the LLM within a token budget.
+    
+    Products are listed one per row in a compact pipe-separated table, in
+    retrieval order. Chunks of the same product are collapsed into the best
+    ranked one. When the table doesn't fit, the lowest ranked products are
+    dropped first; descriptions are then shortened so higher ranked products
+    keep the most detail.
+    """
+    
+    HEADER = "id | name | type | category | duration | match | target roles | skills | description"
+    
+    def __init__(self, max_tokens=None, description_tokens=None, list_items=None, model=None):
+        """
+        Initialize context builder.
+        
+        Args:
+            max_tokens: Token budget for the whole context (defaults to Config.CONTEXT_MAX_TOKENS)
+            description_tokens: Max tokens per description (defaults to
+                Config.CONTEXT_DESCRIPTION_TOKENS)
+            list_items: Max target roles / skills listed per product (defaults to
+                Config.CONTEXT_LIST_ITEMS)
+            model: Model whose tokenizer counts tokens (defaults to Config.LLM_MODEL)
+        """
+        self.max_tokens = max_tokens or Config.CONTEXT_MAX_TOKENS
+        self.description_tokens = description_tokens or Config.CONTEXT_DESCRIPTION_TOKENS
+        self.list_items = list_items or Config.CONTEXT_LIST_ITEMS
+        self.model = model
+    
+    def _join_list(self, values):
+        """Join the first list_items values; returns (text, truncated)."""
+        values = [_cell(value) for value in values or [] if value]
+        return ", ".join(values[:self.list_items]), len(values) > self.list_items
+    
+    def _row(self, doc, description):
+        """Format one table row."""
+        roles, _ = self._join_list(doc.get('target_roles'))
+        skills, _ = self._join_list(doc.get('skills_assessed'))
+        score = doc.get('similarity_score')
+        cells = [
+            doc.get('product_id') if doc.get('product_id') is not None else '',
+            doc.get('product_name') or '',
+            doc.get('test_type') or '',
+            doc.get('category') or '',
+            doc.get('duration') or '',
+            f"{score:.2f}" if score is not None else '',
+            roles,
+            skills,
+            description,
+        ]
+        return " | ".join(_cell(cell) for cell in cells)
+    
+    def build(self, retrieved_docs):
+        """
+        Build the context table.
+        
+        Args:
+            retrieved_docs: Retrieved product dictionaries, best first
+        
+        Returns:
+            tuple: (context, report) where report holds the context's token
+                count and the dedupe / drop / truncation decisions taken
+        """
+        report = {
+            'budget': self.max_tokens,
+            'retrieved': len(retrieved_docs),
+            'deduplicated': 0,
+            'dropped': 0,
+            'descriptions_truncated': 0,
+            'descriptions_omitted': 0,
+            'lists_truncated': 0,
+        }
+        
+        # chunk_products imports this module, so import product_key lazily
+        from preprocessing.chunk_products import product_key
+        
+        docs, seen = [], set()
+        for doc in retrieved_docs:
+            if doc.get('original_id') is None and doc.get('product_id') is None:
+                key = doc.get('product_name')
+            else:
+                key = product_key(doc, id_field='product_id')
+            if key in seen:
+                report['deduplicated'] += 1
+                continue
+            seen.add(key)
+            docs.append(doc)
+        
+        if not docs:
+            context = "No relevant assessments found."
+            report.update(included=0, tokens=count_tokens(context, self.model))
+            return context, report
+        
+        # Rows without descriptions are what every included product costs at minimum
+        remaining = self.max_tokens - count_tokens(self.HEADER, self.model) - 1
+        included = []
+        for doc in docs:
+            cost = count_tokens(self._row(doc, ''), self.model) + 1
+            if cost > remaining and included:
+                break
+            remaining -= cost
+            included.append(doc)
+        report['dropped'] = len(docs) - len(included)
+        
+        # Spend what's left on descriptions, best ranked first
+        rows = []
+        for doc in included:
+            for field in ('target_roles', 'skills_assessed'):
+                if self._join_list(doc.get(field))[1]:
+                    report['lists_truncated'] += 1
+            
+            description = _cell(doc.get('description') or '')
+            allowance = min(self.description_tokens, max(remaining, 0))
+            if description and allowance < MIN_DESCRIPTION_TOKENS:
+                description = ''
+                report['descriptions_omitted'] += 1
+            elif description:
+                description, truncated = truncate_to_tokens(description, allowance, self.model)
+                report['descriptions_truncated'] += int(truncated)
+                remaining -= count_tokens(description, self.model)
+            
+            rows.append(self._row(doc, description))
+        
+        context = "\n".join([self.HEADER] + rows)
+        report['included'] = len(included)
+        report['tokens'] = count_tokens(context, self.model)
+        
+        self._record(report)
+        return context, report
+    
+    def _record(self, report):
+        """Export the build report to metrics and the debug log."""
+        PROMPT_TOKENS.observe(report['tokens'], part='context')
+        for action in ('deduplicated', 'dropped', 'descriptions_truncated', 'descriptions_omitted',
+                       'lists_truncated'):
+            if report[action]:
+                CONTEXT_TRUNCATIONS.inc(report[action], action=action)
+        
+        logger.debug(
+            f"Built LLM context: {report['tokens']}/{report['budget']} tokens, "
+            f"{report['included']}/{report['retrieved']} products "
+            f"(deduplicated={report['deduplicated']}, dropped={report['dropped']}, "
+            f"descriptions truncated={report['descriptions_truncated']}, "
+            f"omitted={report['descriptions_omitted']})"
+        )
+
+
+if __name__ == "__main__":
+    sample_docs = [
+        {
+            'product_id': '1',
+            'product_name': 'Verify G+ (General Ability)',
+            'test_type': 'K',
+            'category': 'Cognitive Ability',
+            'duration': '36 minutes',
+            'similarity_score': 0.85,
+            'target_roles': ['Graduate', 'Professional', 'Manager', 'Executive', 'Technician'],
+            'skills_assessed': ['problem-solving', 'analytical'],
+            'description': 'Measures general cognitive ability including numerical, verbal and '
+                           'inductive reasoning. ' * 5
+        },
+        {
+            'product_id': '2',
+            'product_name': 'Coding Skills Assessment - Python',
+            'test_type': 'K',
+            'category': 'Technical Skills',
+            'duration': '45 minutes',
+            'similarity_score': 0.80,
+            'target_roles': ['Software Engineer'],
+            'skills_assessed': ['Python'],
+            'description': 'Practical coding test for Python programming.'
+        },
+    ]
+    
+    for budget in (400, 120, 60):
+        context, report = ContextBuilder(max_tokens=budget).build(sample_docs + sample_docs[:1])
+        print(f"\nBudget {budget}: {report}")
+        print(context)
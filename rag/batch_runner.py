@@ -0,0 +1,207 @@
+"""Parallel, resumable offline recommendation runner."""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from config import Config
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls to at most `rate` per second."""
+    
+    def __init__(self, rate):
+        """
+        Initialize rate limiter.
+        
+        Args:
+            rate: Max calls per second (0 or None disables limiting)
+        """
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until the next call is allowed."""
+        if not self.interval:
+            return
+        
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        
+        if wait > 0:
+            time.sleep(wait)
+
+
+class BatchRunner:
+    """
+    Run recommendations for many queries on a worker pool.
+    
+    Every finished query is appended to a JSONL journal, so a crashed or
+    interrupted run picks up where it stopped: journaled queries are replayed
+    from disk instead of calling the LLM again. Entries are only replayed for
+    the same index version, LLM model, mode and request options, and failed
+    or fallback (LLM unavailable) results are retried. Results are yielded in
+    input order as soon as all earlier queries have finished, letting callers
+    write output incrementally.
+    """
+    
+    def __init__(self, recommender, journal_path, max_workers=None, requests_per_second=None,
+                 top_k=None, template_type="default", mode=None):
+        """
+        Initialize batch runner.
+        
+        Args:
+            recommender: Recommender instance
+            journal_path: JSONL file recording finished queries
+            max_workers: Worker threads (defaults to Config.BATCH_RUNNER_WORKERS)
+            requests_per_second: LLM request rate limit (defaults to
+                Config.LLM_REQUESTS_PER_SECOND, 0 disables)
+            top_k: Number of recommendations per query
+            template_type: Prompt template type
+            mode: "llm" or "fast" (defaults to Config.RECOMMENDER_MODE)
+        """
+        self.recommender = recommender
+        self.journal_path = Path(journal_path)
+        self.max_workers = max_workers or Config.BATCH_RUNNER_WORKERS
+        if requests_per_second is None:
+            requests_per_second = Config.LLM_REQUESTS_PER_SECOND
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.top_k = top_k
+        self.template_type = template_type
+        self.mode = mode or Config.RECOMMENDER_MODE
+        self._journal_lock = threading.Lock()
+    
+    def _settings(self):
+        """Run settings a journaled result depends on."""
+        return {
+            'index_version': self.recommender.retriever.vector_store.index_version,
+            'model': Config.LLM_MODEL,
+            'mode': self.mode,
+            'top_k': self.top_k,
+            'template_type': self.template_type,
+        }
+    
+    @staticmethod
+    def _is_retryable(result):
+        """Check whether a result should be recomputed on the next run."""
+        return 'error' in result or bool(result.get('fallback'))
+    
+    def _matches(self, entry, settings):
+        """Check whether a journal entry was produced with this run's settings."""
+        return all(entry.get(name) == value for name, value in settings.items())
+    
+    def _iter_journal(self):
+        """Yield usable entries from the journal, skipping torn lines and retryable results."""
+        settings = self._settings()
+        if not self.journal_path.exists():
+            return
+        
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-write can leave a partial last line
+                    continue
+                if self._matches(entry, settings) and not entry.get('retryable', True):
+                    yield entry
+    
+    def _append_journal(self, query, result):
+        """Append one finished query to the journal."""
+        entry = {
+            'query': query,
+            **self._settings(),
+            'retryable': self._is_retryable(result),
+            'result': result
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        
+        with self._journal_lock:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+    
+    def _prewarm(self, queries):
+        """Fill the query embedding cache with one batched encode call."""
+        try:
+            self.recommender.retriever.query_processor.generate_query_embeddings(queries)
+        except Exception as e:
+            # Workers fall back to embedding queries one at a time
+            logger.warning(f"Failed to pre-warm query embeddings: {e}")
+    
+    def _process(self, query):
+        """Generate recommendations for one query, rate limiting only its LLM call."""
+        try:
+            return self.recommender.recommend(
+                query, top_k=self.top_k, template_type=self.template_type, mode=self.mode,
+                rate_limiter=self.rate_limiter
+            )
+        except Exception as e:
+            logger.error(f"Recommendation failed for query '{query}': {e}")
+            return {
+                'query': query,
+                'error': str(e),
+                'recommendations': [],
+                'processing_time': 0
+            }
+    
+    def run(self, queries):
+        """
+        Generate recommendations for queries, resuming from the journal.
+        
+        Args:
+            queries: List of query strings (duplicates are processed once)
+        
+        Yields:
+            tuple: (query, result) for each distinct query, in input order
+        """
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        queries = list(dict.fromkeys(queries))
+        wanted = set(queries)
+        
+        results = {}
+        for entry in self._iter_journal():
+            if entry['query'] in wanted:
+                results.setdefault(entry['query'], entry['result'])
+        
+        pending = [query for query in queries if query not in results]
+        if results:
+            logger.info(f"Resumed {len(results)} queries from {self.journal_path}")
+        
+        # Results wait here until every earlier query has been yielded
+        position = 0
+        while position < len(queries) and queries[position] in results:
+            yield queries[position], results.pop(queries[position])
+            position += 1
+        
+        if not pending:
+            return
+        
+        logger.info(f"Processing {len(pending)} queries with {self.max_workers} workers")
+        start_time = time.time()
+        self._prewarm(pending)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._process, query): query for query in pending}
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    query = futures[future]
+                    results[query] = future.result()
+                    self._append_journal(query, results[query])
+                    logger.info(f"[{done}/{len(pending)}] Finished query: '{query[:60]}'")
+                    
+                    while position < len(queries) and queries[position] in results:
+                        yield queries[position], results.pop(queries[position])
+                        position += 1
+            finally:
+                # Don't start queued queries if the caller stops early
+                for future in futures:
+                    future.cancel()
+        
+        logger.info(f"Processed {len(pending)} queries in {time.time() - start_time:.2f}s")
@@ -0,0 +1,141 @@
+"""Resolve assessment names written by the LLM to catalogue products."""
+import logging
+import re
+from collections import Counter
+from config import Config
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+_NON_NAME_CHARS = re.compile(r"[^a-z0-9+#]+")
+_PARENTHETICAL = re.compile(r"\([^)]*\)")
+
+
+def normalize_name(name):
+    """
+    Normalize a product name for matching.
+    
+    Lowercases, turns punctuation and separators into single spaces and keeps
+    "+" and "#" (e.g. "Verify G+", "C#").
+    
+    Args:
+        name: Product or assessment name
+    
+    Returns:
+        str: Normalized name
+    """
+    return _NON_NAME_CHARS.sub(" ", str(name or "").lower()).strip()
+
+
+def _trigrams(normalized):
+    """Character trigrams of a normalized name, padded so short names still index."""
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameResolver:
+    """
+    Index over catalogue product names.
+    
+    Products referenced by id resolve directly through resolve_id. Name
+    lookups first try an exact match on the normalized name, then fall back to
+    trigram similarity (Dice coefficient) found through an inverted index, so
+    only names sharing at least one trigram with the query are scored.
+    """
+    
+    def __init__(self, products, min_similarity=None):
+        """
+        Build the index.
+        
+        Args:
+            products: Sequence of catalogue metadata dicts (e.g. VectorStore.metadata);
+                row positions are used as keys
+            min_similarity: Minimum Dice similarity for a fuzzy match (defaults to
+                Config.NAME_MATCH_MIN_SIMILARITY)
+        """
+        self.min_similarity = min_similarity if min_similarity is not None else Config.NAME_MATCH_MIN_SIMILARITY
+        
+        # Normalized name -> rows carrying it (catalogues can list a name more than once)
+        self.rows_by_name = {}
+        self.row_by_id = {}
+        for row, product in enumerate(products):
+            if product.get('id') is not None:
+                self.row_by_id.setdefault(str(product['id']), row)
+            normalized = normalize_name(product.get('name'))
+            if normalized:
+                self.rows_by_name.setdefault(normalized, []).append(row)
+        
+        self.names = list(self.rows_by_name)
+        self.name_trigrams = [_trigrams(name) for name in self.names]
+        
+        self.postings = {}
+        for name_id, trigrams in enumerate(self.name_trigrams):
+            for trigram in trigrams:
+                self.postings.setdefault(trigram, []).append(name_id)
+        
+        logger.info(f"Built name resolver over {len(self.names)} distinct product names")
+    
+    def _pick_row(self, rows, preferred_rows):
+        """Choose among rows sharing a name, favouring retrieved ones."""
+        if preferred_rows:
+            for row in rows:
+                if row in preferred_rows:
+                    return row
+        return rows[0]
+    
+    def resolve_id(self, product_id):
+        """
+        Resolve a catalogue product id to its row.
+        
+        Args:
+            product_id: Product id as referenced by the LLM
+        
+        Returns:
+            int: Row, or None for unknown ids
+        """
+        if product_id is None:
+            return None
+        return self.row_by_id.get(str(product_id).strip())
+    
+    def resolve(self, name, preferred_rows=None):
+        """
+        Resolve a name to a catalogue row.
+        
+        Args:
+            name: Assessment name as written by the LLM
+            preferred_rows: Rows to favour when several products match equally
+                well, typically the retrieved documents
+        
+        Returns:
+            tuple: (row, similarity) with similarity 1.0 for exact matches, or
+                (None, best similarity) if nothing clears min_similarity
+        """
+        # LLMs often append a gloss, e.g. "Verify G+ (General Ability)"
+        variants = [normalize_name(name), normalize_name(_PARENTHETICAL.sub(" ", str(name or "")))]
+        variants = [variant for variant in dict.fromkeys(variants) if variant]
+        
+        for variant in variants:
+            rows = self.rows_by_name.get(variant)
+            if rows is not None:
+                return self._pick_row(rows, preferred_rows), 1.0
+        
+        best_id, best_score, best_preferred = None, 0.0, False
+        for variant in variants:
+            query_trigrams = _trigrams(variant)
+            shared = Counter()
+            for trigram in query_trigrams:
+                shared.update(self.postings.get(trigram, ()))
+            
+            for name_id, count in shared.items():
+                score = 2.0 * count / (len(query_trigrams) + len(self.name_trigrams[name_id]))
+                preferred = bool(preferred_rows) and any(
+                    row in preferred_rows for row in self.rows_by_name[self.names[name_id]]
+                )
+                # Higher similarity wins; on ties, retrieved products win
+                if (score, preferred) > (best_score, best_preferred):
+                    best_id, best_score, best_preferred = name_id, score, preferred
+        
+        if best_id is None or best_score < self.min_similarity:
+            return None, best_score
+        
+        return self._pick_row(self.rows_by_name[self.names[best_id]], preferred_rows), best_score
@@ -1,4 +1,15 @@
 """Prompt templates for LLM-based recommendations."""
+import json
+import hashlib
+import logging
+import re
+from functools import lru_cache
+from config import Config
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+_SCORE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(?:/\s*10)?')
 
 
 RECOMMENDATION_PROMPT_TEMPLATE = """You are an expert HR assessment consultant with deep knowledge of SHL assessment products. Your role is to recommend the most suitable assessments based on hiring requirements.
@@ -73,28 +84,162 @@ Recommend the top 3-5 most suitable assessments. For each recommendation, provid
 Be specific and reference details from both the hiring requirement and assessment descriptions."""
 
 
-def create_recommendation_prompt(query, context, template_type="default"):
+# JSON Schema of the model's output in JSON mode; items mirror api/schemas.Recommendation
+# but reference products by id, so no name matching is needed
+RECOMMENDATION_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "recommendations": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "product_id": {"type": "string", "description": "Product ID from the assessment list"},
+                    "assessment_name": {"type": "string", "description": "Name of the recommended assessment"},
+                    "relevance_score": {"type": "number", "minimum": 0, "maximum": 10},
+                    "reasoning": {"type": "string", "description": "Why it fits the hiring requirement"}
+                },
+                "required": ["product_id", "assessment_name", "relevance_score", "reasoning"]
+            }
+        }
+    },
+    "required": ["recommendations"]
+}
+
+
+JSON_RECOMMENDATION_TEMPLATE = """You are an expert HR assessment consultant with deep knowledge of SHL assessment products. Recommend the most suitable assessments for this hiring requirement.
+
+Hiring Requirement:
+{query}
+
+Available SHL Assessments:
+{context}
+
+Instructions:
+1. Recommend 3-5 assessments from the list above, ranked by relevance
+2. Reference each assessment by its exact Product ID and name from the list
+3. Rate relevance from 0-10 and give a one or two sentence reasoning tied to the requirement
+
+Respond with a single JSON object (no other text) matching this JSON Schema:
+{schema}"""
+
+
+def create_recommendation_prompt(query, context, template_type="default", output_format="text"):
     """
     Create a recommendation prompt from query and context.
     
     Args:
         query: User's hiring requirement query
         context: Formatted context from retrieved documents
-        template_type: Type of template to use ("default", "simple", "structured")
+        template_type: Type of template to use ("default", "simple", "structured");
+            only applies to text output
+        output_format: "text" or "json" (JSON object matching RECOMMENDATION_JSON_SCHEMA)
     
     Returns:
         str: Formatted prompt
     """
+    if output_format == "json":
+        return JSON_RECOMMENDATION_TEMPLATE.format(
+            query=query, context=context, schema=json.dumps(RECOMMENDATION_JSON_SCHEMA)
+        )
+    
+    template = _text_template(template_type)
+    
+    prompt = template.format(query=query, context=context)
+    return prompt
+
+
+def _text_template(template_type):
+    """Text-output template for a template type (unknown types use the default)."""
     templates = {
         "default": RECOMMENDATION_PROMPT_TEMPLATE,
         "simple": SIMPLE_RECOMMENDATION_TEMPLATE,
         "structured": STRUCTURED_RECOMMENDATION_TEMPLATE
     }
+    return templates.get(template_type, RECOMMENDATION_PROMPT_TEMPLATE)
+
+
+@lru_cache(maxsize=None)
+def prompt_version(template_type="default", output_format="text"):
+    """
+    Fingerprint the prompt template a request is sent with.
     
-    template = templates.get(template_type, RECOMMENDATION_PROMPT_TEMPLATE)
+    Args:
+        template_type: Type of template, as for create_recommendation_prompt
+        output_format: "text" or "json"
     
-    prompt = template.format(query=query, context=context)
-    return prompt
+    Returns:
+        str: Short hex digest that changes whenever the template text (or the
+            JSON schema) is edited
+    """
+    if output_format == "json":
+        text = JSON_RECOMMENDATION_TEMPLATE + json.dumps(RECOMMENDATION_JSON_SCHEMA, sort_keys=True)
+    else:
+        text = _text_template(template_type)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def parse_json_recommendations(response_text):
+    """
+    Parse a JSON-mode LLM response into recommendation dictionaries.
+    
+    Args:
+        response_text: Raw LLM response, a JSON object matching RECOMMENDATION_JSON_SCHEMA
+    
+    Returns:
+        list: Recommendation dictionaries with product_id, assessment_name,
+            relevance_score (clamped to 0-10) and reasoning; empty if the
+            response isn't valid JSON
+    """
+    try:
+        payload = json.loads(response_text)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"LLM returned invalid JSON: {e}")
+        return []
+    
+    items = payload.get('recommendations') if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        logger.warning("LLM JSON response has no recommendations list")
+        return []
+    
+    recommendations = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        
+        rec = {}
+        if item.get('product_id') is not None:
+            rec['product_id'] = str(item['product_id']).strip()
+        if item.get('assessment_name'):
+            rec['assessment_name'] = str(item['assessment_name']).strip()
+        if not rec:
+            continue
+        
+        try:
+            rec['relevance_score'] = min(max(float(item.get('relevance_score', 0)), 0.0), 10.0)
+        except (TypeError, ValueError):
+            rec['relevance_score'] = 0.0
+        rec['reasoning'] = str(item.get('reasoning') or '')
+        
+        recommendations.append(rec)
+    
+    return recommendations
+
+
+def extract_recommendations(response_text, output_format="text"):
+    """
+    Parse an LLM response produced with the given output format.
+    
+    Args:
+        response_text: Raw LLM response
+        output_format: "text" or "json"
+    
+    Returns:
+        list: List of recommendation dictionaries
+    """
+    if output_format == "json":
+        return parse_json_recommendations(response_text)
+    return extract_recommendations_from_response(response_text)
 
 
 def extract_recommendations_from_response(response_text):
@@ -134,8 +279,7 @@ def extract_recommendations_from_response(response_text):
         # Look for relevance score
         elif 'relevance score' in line.lower() or 'score:' in line.lower():
             # Extract score
-            import re
-            score_match = re.search(r'(\d+(?:\.\d+)?)\s*(?:/\s*10)?', line)
+            score_match = _SCORE_PATTERN.search(line)
             if score_match:
                 score = float(score_match.group(1))
                 # Normalize to 0-10 scale
@@ -173,7 +317,7 @@ if __name__ == "__main__":
    Description: Practical coding test for Python programming
    Target Roles: Software Engineer, Developer
    Relevance Score: 0.920"""
-    
+   
     print("Testing Prompt Templates\n")
     print("=" * 80)
     
@@ -203,3 +347,16 @@ if __name__ == "__main__":
         print(f"\nParsed Recommendation {i}:")
         for key, value in rec.items():
             print(f"  {key}: {value}")
+    
+    sample_json_response = """{"recommendations": [
+        {"product_id": "2", "assessment_name": "Coding Skills Assessment - Python", "relevance_score": 9, "reasoning": "Directly evaluates Python programming."},
+        {"product_id": "1", "assessment_name": "Verify G+ (General Ability)", "relevance_score": 8, "reasoning": "Measures problem-solving ability."}
+    ]}"""
+    
+    print("\n" + "=" * 80)
+    print("Testing JSON Response Parsing:")
+    print("-" * 80)
+    for i, rec in enumerate(parse_json_recommendations(sample_json_response), 1):
+        print(f"\nParsed Recommendation {i}:")
+        for key, value in rec.items():
+            print(f"  {key}: {value}")
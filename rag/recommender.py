@@ -1,9 +1,19 @@
 """LLM-based recommendation engine using RAG."""
+import asyncio
+import contextvars
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from config import Config
+from cache.response_cache import create_response_cache
+from cache.semantic_cache import create_semantic_cache
 from rag.retriever import Retriever
-from rag.prompt import create_recommendation_prompt, extract_recommendations_from_response
+from rag.reranker import create_reranker
+from rag.name_resolver import NameResolver
+from monitoring.metrics import PROMPT_TOKENS, record_stage, stage_timer
+from preprocessing.tokenizer import count_tokens
+from rag.prompt import create_recommendation_prompt, extract_recommendations, prompt_version
 
 logging.basicConfig(level=Config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
@@ -12,14 +22,28 @@ logger = logging.getLogger(__name__)
 class Recommender:
     """Generate assessment recommendations using LLM and RAG."""
     
-    def __init__(self, retriever=None):
+    def __init__(self, retriever=None, response_cache=None, semantic_cache=None, reranker=None):
         """
         Initialize recommender.
         
         Args:
             retriever: Retriever instance (will create new if None)
+            response_cache: ResponseCache instance (defaults to the one configured
+                by Config.RESPONSE_CACHE_BACKEND; None if that is "none")
+            semantic_cache: SemanticCache instance (defaults to the one configured
+                by Config.SEMANTIC_CACHE_ENABLED)
+            reranker: Local reranker for fast mode and LLM fallbacks (defaults
+                to the one configured by Config.RERANKER)
         """
         self.retriever = retriever or Retriever()
+        self.response_cache = response_cache if response_cache is not None else create_response_cache()
+        self.semantic_cache = semantic_cache if semantic_cache is not None else create_semantic_cache()
+        self._executor = None
+        self._llm_semaphore = None
+        self.reranker = reranker or create_reranker()
+        self._name_resolver = None
+        self._name_resolver_version = None
+        self._name_resolver_lock = threading.Lock()
         self.llm = None
         self._initialize_llm()
     
@@ -38,13 +62,21 @@ class Recommender:
                 api_key=Config.OPENAI_API_KEY
             )
             
-            logger.info(f"Initialized LLM: {Config.LLM_MODEL}")
+            if Config.LLM_OUTPUT_FORMAT == "json":
+                # JSON mode: the model is constrained to emit a single valid JSON object
+                self.llm = self.llm.bind(response_format={"type": "json_object"})
+            
+            logger.info(f"Initialized LLM: {Config.LLM_MODEL} ({Config.LLM_OUTPUT_FORMAT} output)")
         
         except Exception as e:
+            if Config.RECOMMENDER_MODE == "fast":
+                # Fast mode doesn't need the LLM; LLM-mode requests fall back to reranking
+                logger.warning(f"LLM unavailable, serving reranked retrieval results only: {e}")
+                return
             logger.error(f"Failed to initialize LLM: {e}")
             raise
     
-    def recommend(self, query, top_k=None, template_type="default"):
+    def recommend(self, query, top_k=None, template_type="default", mode=None, rate_limiter=None):
         """
         Generate recommendations for a query.
         
@@ -52,6 +84,10 @@ class Recommender:
             query: User's hiring requirement query
             top_k: Number of products to retrieve (defaults to Config.TOP_K_RESULTS)
             template_type: Prompt template type
+            mode: "llm" to rank with the LLM or "fast" to rank retrieval results
+                with the local reranker (defaults to Config.RECOMMENDER_MODE)
+            rate_limiter: Limiter acquired right before the LLM call, so fast mode
+                and cache hits are not throttled (optional)
         
         Returns:
             dict: Recommendation results
@@ -60,37 +96,483 @@ class Recommender:
         
         logger.info(f"Generating recommendations for query: '{query}'")
         
-        # Retrieve relevant products
+        if (mode or Config.RECOMMENDER_MODE) == "fast":
+            return self._recommend_fast(query, top_k, start_time)
+        
+        # Serve byte-identical repeat requests without calling the LLM
+        cached = self._get_cached_response(query, top_k, template_type, start_time)
+        if cached is not None:
+            return cached
+        
+        # Retrieve relevant products (the embedding is reused for the semantic cache)
         try:
-            retrieved_docs = self.retriever.retrieve(query, k=top_k)
+            query_embedding, retrieved_docs = self._retrieve(query, top_k)
         except Exception as e:
-            logger.error(f"Retrieval failed: {e}")
-            return {
-                'query': query,
-                'error': f"Retrieval failed: {str(e)}",
-                'recommendations': [],
-                'processing_time': time.time() - start_time
-            }
+            return self._create_retrieval_error_response(query, e, start_time)
         
-        # Check if any documents were retrieved
-        if not retrieved_docs:
-            logger.warning("No relevant documents found")
-            return {
-                'query': query,
-                'message': 'No suitable assessments found for this query',
-                'recommendations': [],
-                'processing_time': time.time() - start_time
-            }
+        return self._generate_from_docs(
+            query, retrieved_docs, top_k, template_type, start_time, query_embedding, rate_limiter
+        )
+    
+    async def arecommend(self, query, top_k=None, template_type="default", mode=None):
+        """
+        Generate recommendations for a query without blocking the event loop.
         
-        # Format context for LLM
-        context = self.retriever.format_context_for_llm(retrieved_docs)
+        Embedding, FAISS search, prompt building, response parsing and cache
+        I/O run on a bounded thread pool; the LLM call is awaited natively
+        with ainvoke.
         
-        # Create prompt
-        prompt = create_recommendation_prompt(query, context, template_type)
+        Args:
+            query: User's hiring requirement query
+            top_k: Number of products to retrieve (defaults to Config.TOP_K_RESULTS)
+            template_type: Prompt template type
+            mode: "llm" or "fast" (defaults to Config.RECOMMENDER_MODE)
+        
+        Returns:
+            dict: Recommendation results
+        """
+        start_time = time.time()
+        
+        logger.info(f"Generating recommendations for query: '{query}'")
+        
+        if (mode or Config.RECOMMENDER_MODE) == "fast":
+            return await self._run_in_executor(self._recommend_fast, query, top_k, start_time)
+        
+        cached = await self._run_in_executor(
+            self._get_cached_response, query, top_k, template_type, start_time
+        )
+        if cached is not None:
+            return cached
+        
+        try:
+            query_embedding, retrieved_docs = await self._aretrieve(query, top_k)
+        except Exception as e:
+            return self._create_retrieval_error_response(query, e, start_time)
+        
+        return await self._agenerate_from_docs(
+            query, retrieved_docs, top_k, template_type, start_time, query_embedding
+        )
+    
+    async def astream_recommend(self, query, top_k=None, template_type="default", mode=None):
+        """
+        Generate recommendations as a stream of pipeline events.
+        
+        Yields ('retrieval', docs) as soon as the vector search finishes, then
+        ('token', text) for each LLM output chunk, then ('final', result) with
+        the same result dict arecommend() would return. Cache hits and
+        failures skip straight to 'final'.
+        
+        Args:
+            query: User's hiring requirement query
+            top_k: Number of products to retrieve (defaults to Config.TOP_K_RESULTS)
+            template_type: Prompt template type
+            mode: "llm" or "fast" (defaults to Config.RECOMMENDER_MODE); fast
+                mode has no LLM stage and yields only 'final'
+        
+        Yields:
+            tuple: (event type, payload)
+        """
+        start_time = time.time()
+        
+        logger.info(f"Streaming recommendations for query: '{query}'")
+        
+        if (mode or Config.RECOMMENDER_MODE) == "fast":
+            yield 'final', await self._run_in_executor(self._recommend_fast, query, top_k, start_time)
+            return
+        
+        cached = await self._run_in_executor(
+            self._get_cached_response, query, top_k, template_type, start_time
+        )
+        if cached is not None:
+            yield 'final', cached
+            return
+        
+        try:
+            query_embedding, retrieved_docs = await self._aretrieve(query, top_k)
+        except Exception as e:
+            yield 'final', self._create_retrieval_error_response(query, e, start_time)
+            return
+        
+        yield 'retrieval', retrieved_docs
+        
+        early_result, prompt = await self._run_in_executor(
+            self._prepare_generation, query, retrieved_docs, top_k, template_type, start_time, query_embedding
+        )
+        if early_result is not None:
+            yield 'final', early_result
+            return
+        
+        # Forward LLM tokens as they arrive, keeping the full text for parsing
+        chunks = []
+        llm_start = time.perf_counter()
+        try:
+            async for chunk in self.llm.astream(prompt):
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    yield 'token', chunk.content
+        
+        except Exception as e:
+            logger.error(f"LLM generation failed: {e}")
+            yield 'final', await self._run_in_executor(
+                self._create_fallback_response, query, retrieved_docs, start_time
+            )
+            return
+        
+        finally:
+            record_stage('llm', time.perf_counter() - llm_start)
+        
+        response_text = "".join(chunks)
+        logger.debug(f"LLM response: {response_text[:200]}...")
+        
+        yield 'final', await self._run_in_executor(
+            self._finalize_response,
+            query, retrieved_docs, response_text, top_k, template_type, start_time, query_embedding
+        )
+    
+    def _recommend_fast(self, query, top_k, start_time):
+        """
+        Rank retrieval results with the local reranker instead of the LLM.
+        
+        Args:
+            query: User's hiring requirement query
+            top_k: Number of recommendations to return
+            start_time: Timestamp the request started at
+        
+        Returns:
+            dict: Recommendation results
+        """
+        try:
+            retrieved_docs = self.retriever.retrieve(query, k=self._rerank_candidates(top_k))
+        except Exception as e:
+            return self._create_retrieval_error_response(query, e, start_time)
+        
+        return self._create_reranked_response(query, retrieved_docs, top_k, start_time)
+    
+    def _rerank_candidates(self, top_k):
+        """Number of documents to retrieve so the reranker has candidates to reorder."""
+        return max(top_k or Config.TOP_K_RESULTS, Config.RERANK_CANDIDATES)
+    
+    def _run_in_executor(self, fn, *args):
+        """
+        Run fn on the recommender thread pool in a copy of the current context.
+        
+        Copying the context keeps per-request stage timings collected across threads.
+        
+        Returns:
+            asyncio.Future: Resolves to fn's return value
+        """
+        context = contextvars.copy_context()
+        return asyncio.get_running_loop().run_in_executor(self._get_executor(), context.run, fn, *args)
+    
+    def _get_executor(self):
+        """Get the bounded thread pool used for CPU-bound work in async paths."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=Config.RECOMMENDER_THREAD_WORKERS,
+                thread_name_prefix="recommender"
+            )
+        return self._executor
+    
+    def _retrieve(self, query, top_k):
+        """
+        Embed a query and retrieve relevant products.
+        
+        Args:
+            query: User's hiring requirement query
+            top_k: Number of products to retrieve
+        
+        Returns:
+            tuple: (query embedding, retrieved product documents)
+        """
+        query_embedding = self.retriever.query_processor.generate_query_embedding(query)
+        retrieved_docs = self.retriever.retrieve(query, k=top_k, query_embedding=query_embedding)
+        return query_embedding, retrieved_docs
+    
+    async def _aretrieve(self, query, top_k):
+        """
+        Async counterpart of _retrieve.
+        
+        The query embedding goes through the query processor's micro-batcher so
+        concurrent requests share encode calls; the FAISS search runs on the
+        thread pool.
+        
+        Returns:
+            tuple: (query embedding, retrieved product documents)
+        """
+        executor = self._get_executor()
+        
+        query_embedding = await self.retriever.query_processor.agenerate_query_embedding(
+            query, executor=executor
+        )
+        retrieved_docs = await self._run_in_executor(
+            lambda: self.retriever.retrieve(query, k=top_k, query_embedding=query_embedding)
+        )
+        return query_embedding, retrieved_docs
+    
+    def _create_retrieval_error_response(self, query, error, start_time):
+        """Build the error result returned when retrieval fails."""
+        logger.error(f"Retrieval failed: {error}")
+        return {
+            'query': query,
+            'error': f"Retrieval failed: {str(error)}",
+            'recommendations': [],
+            'processing_time': time.time() - start_time
+        }
+    
+    def recommend_batch(self, queries, top_k=None, template_type="default", mode=None):
+        """
+        Generate recommendations for several queries.
+        
+        Retrieval for all queries runs as one batched embedding + search call;
+        the LLM is then invoked once per query.
+        
+        Args:
+            queries: List of hiring requirement queries
+            top_k: Number of products to retrieve per query (defaults to Config.TOP_K_RESULTS)
+            template_type: Prompt template type
+            mode: "llm" or "fast" (defaults to Config.RECOMMENDER_MODE)
+        
+        Returns:
+            list: One recommendation result dict per query, in input order
+        """
+        if not queries:
+            return []
+        
+        batch_start = time.time()
+        
+        logger.info(f"Generating recommendations for {len(queries)} queries")
+        
+        if (mode or Config.RECOMMENDER_MODE) == "fast":
+            try:
+                batch_docs = self.retriever.retrieve_batch(queries, k=self._rerank_candidates(top_k))
+            except Exception as e:
+                return [self._create_retrieval_error_response(query, e, batch_start) for query in queries]
+            return [
+                self._create_reranked_response(query, retrieved_docs, top_k, batch_start)
+                for query, retrieved_docs in zip(queries, batch_docs)
+            ]
+        
+        results = [
+            self._get_cached_response(query, top_k, template_type, batch_start)
+            for query in queries
+        ]
+        pending = [i for i, result in enumerate(results) if result is None]
+        
+        if not pending:
+            return results
+        
+        pending_queries = [queries[i] for i in pending]
+        
+        # Retrieve relevant products for all uncached queries at once
+        try:
+            query_embeddings, batch_docs = self._retrieve_batch(pending_queries, top_k)
+        except Exception as e:
+            logger.error(f"Batch retrieval failed: {e}")
+            for i in pending:
+                results[i] = {
+                    'query': queries[i],
+                    'error': f"Retrieval failed: {str(e)}",
+                    'recommendations': [],
+                    'processing_time': time.time() - batch_start
+                }
+            return results
+        
+        # Attribute an equal share of the batched retrieval time to each query
+        retrieval_share = (time.time() - batch_start) / len(pending)
+        
+        for i, retrieved_docs, query_embedding in zip(pending, batch_docs, query_embeddings):
+            start_time = time.time() - retrieval_share
+            results[i] = self._generate_from_docs(
+                queries[i], retrieved_docs, top_k, template_type, start_time, query_embedding
+            )
+        
+        logger.info(f"Generated recommendations for {len(queries)} queries in {time.time() - batch_start:.2f}s")
+        
+        return results
+    
+    async def arecommend_batch(self, requests, template_type="default"):
+        """
+        Generate recommendations for several queries concurrently.
+        
+        Args:
+            requests: List of (query, top_k) tuples
+            template_type: Prompt template type
+        
+        Returns:
+            list: One recommendation result dict per request, in input order
+        """
+        results = [None] * len(requests)
+        async for i, result in self.aiter_recommend_batch(requests, template_type):
+            results[i] = result
+        return results
+    
+    async def aiter_recommend_batch(self, requests, template_type="default"):
+        """
+        Generate recommendations for several queries, yielding each as it finishes.
+        
+        Cached results are yielded first. The remaining queries are embedded and
+        searched as one matrix, then their LLM calls run concurrently, limited
+        by Config.LLM_MAX_CONCURRENCY, so one slow item doesn't hold up the rest.
+        Fast-mode items are reranked locally on the thread pool alongside them.
+        A failure in one item becomes that item's error result, and outstanding
+        work is cancelled if the consumer stops iterating.
+        
+        Args:
+            requests: List of (query, top_k) or (query, top_k, mode) tuples
+            template_type: Prompt template type
+        
+        Yields:
+            tuple: (request index, recommendation result dict)
+        """
+        if not requests:
+            return
+        
+        batch_start = time.time()
+        
+        logger.info(f"Generating recommendations for {len(requests)} queries concurrently")
+        
+        requests = [
+            (request[0], request[1], (request[2] if len(request) > 2 else None) or Config.RECOMMENDER_MODE)
+            for request in requests
+        ]
+        
+        tasks = []
+        try:
+            cached = await self._run_in_executor(lambda: [
+                self._get_cached_response(query, top_k, template_type, batch_start) if mode != "fast" else None
+                for query, top_k, mode in requests
+            ])
+            pending = []
+            for i, result in enumerate(cached):
+                if result is not None:
+                    yield i, result
+                else:
+                    pending.append(i)
+            
+            if not pending:
+                return
+            
+            # Retrieve once at the largest requested k; each item keeps its own top-k prefix
+            k_max = max(self._batch_retrieval_k(requests[i][1], requests[i][2]) for i in pending)
+            try:
+                query_embeddings, batch_docs = await self._run_in_executor(
+                    self._retrieve_batch, [requests[i][0] for i in pending], k_max
+                )
+            except Exception as e:
+                for i in pending:
+                    yield i, self._create_retrieval_error_response(requests[i][0], e, batch_start)
+                return
+            
+            # Attribute an equal share of the batched retrieval time to each query
+            retrieval_share = (time.time() - batch_start) / len(pending)
+            
+            for i, retrieved_docs, query_embedding in zip(pending, batch_docs, query_embeddings):
+                query, top_k, mode = requests[i]
+                retrieved_docs = retrieved_docs[:self._batch_retrieval_k(top_k, mode)]
+                start_time = time.time() - retrieval_share
+                
+                if mode == "fast":
+                    task = self._arerank(i, query, retrieved_docs, top_k, start_time)
+                else:
+                    task = self._agenerate_limited(
+                        i, query, retrieved_docs, top_k, template_type, start_time, query_embedding
+                    )
+                tasks.append(asyncio.ensure_future(task))
+            
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+            
+            logger.info(f"Generated recommendations for {len(requests)} queries in {time.time() - batch_start:.2f}s")
+        finally:
+            # Stop outstanding work if the consumer goes away early
+            for task in tasks:
+                task.cancel()
+    
+    async def _arerank(self, index, query, retrieved_docs, top_k, start_time):
+        """Rerank a fast-mode batch item on the thread pool, isolating failures."""
+        try:
+            result = await self._run_in_executor(
+                self._create_reranked_response, query, retrieved_docs, top_k, start_time
+            )
+        except Exception as e:
+            result = self._create_item_error_response(query, e, start_time)
+        return index, result
+    
+    async def _agenerate_limited(self, index, query, retrieved_docs, top_k, template_type,
+                                 start_time, query_embedding):
+        """Run _agenerate_from_docs under the LLM concurrency limit, isolating failures."""
+        async with self._get_llm_semaphore():
+            try:
+                result = await self._agenerate_from_docs(
+                    query, retrieved_docs, top_k, template_type, start_time, query_embedding
+                )
+            except Exception as e:
+                result = self._create_item_error_response(query, e, start_time)
+        return index, result
+    
+    def _create_item_error_response(self, query, error, start_time):
+        """Build the result for a batch item that failed after retrieval."""
+        logger.error(f"Recommendation failed for query '{query}': {error}")
+        return {
+            'query': query,
+            'error': f"Recommendation failed: {str(error)}",
+            'recommendations': [],
+            'processing_time': time.time() - start_time
+        }
+    
+    def _batch_retrieval_k(self, top_k, mode):
+        """Number of documents a batch item needs from retrieval."""
+        if mode == "fast":
+            return self._rerank_candidates(top_k)
+        return top_k or Config.TOP_K_RESULTS
+    
+    def _get_llm_semaphore(self):
+        """Get the semaphore bounding concurrent LLM calls from batch requests."""
+        if self._llm_semaphore is None:
+            self._llm_semaphore = asyncio.Semaphore(Config.LLM_MAX_CONCURRENCY)
+        return self._llm_semaphore
+    
+    def _retrieve_batch(self, queries, top_k):
+        """
+        Embed several queries with one encode call and search them as one matrix.
+        
+        Returns:
+            tuple: (query embedding matrix, list of retrieved documents per query)
+        """
+        query_embeddings = self.retriever.query_processor.generate_query_embeddings(queries)
+        batch_docs = self.retriever.retrieve_batch(queries, k=top_k, query_embeddings=query_embeddings)
+        return query_embeddings, batch_docs
+    
+    def _generate_from_docs(self, query, retrieved_docs, top_k, template_type, start_time,
+                            query_embedding=None, rate_limiter=None):
+        """
+        Run the LLM stage of the pipeline over already-retrieved documents.
+        
+        Args:
+            query: User's hiring requirement query
+            retrieved_docs: Retrieved product documents for the query
+            top_k: Number of recommendations to keep
+            template_type: Prompt template type
+            start_time: Timestamp the request started at
+            query_embedding: Query embedding, used for the semantic answer cache
+            rate_limiter: Limiter acquired right before the LLM call (optional)
+        
+        Returns:
+            dict: Recommendation results
+        """
+        early_result, prompt = self._prepare_generation(
+            query, retrieved_docs, top_k, template_type, start_time, query_embedding
+        )
+        if early_result is not None:
+            return early_result
+        
+        if rate_limiter is not None:
+            rate_limiter.acquire()
         
         # Generate recommendations using LLM
         try:
-            response = self.llm.invoke(prompt)
+            with stage_timer('llm'):
+                response = self.llm.invoke(prompt)
             response_text = response.content
             logger.debug(f"LLM response: {response_text[:200]}...")
         
@@ -99,11 +581,103 @@ class Recommender:
             # Fallback to retrieval-only results
             return self._create_fallback_response(query, retrieved_docs, start_time)
         
+        return self._finalize_response(
+            query, retrieved_docs, response_text, top_k, template_type, start_time, query_embedding
+        )
+    
+    async def _agenerate_from_docs(self, query, retrieved_docs, top_k, template_type, start_time,
+                                   query_embedding=None):
+        """
+        Async counterpart of _generate_from_docs using llm.ainvoke.
+        
+        Prompt building (token counting) and response finalization (name
+        resolution, cache writes) run on the thread pool.
+        """
+        early_result, prompt = await self._run_in_executor(
+            self._prepare_generation, query, retrieved_docs, top_k, template_type, start_time, query_embedding
+        )
+        if early_result is not None:
+            return early_result
+        
+        # Generate recommendations using LLM without blocking the event loop
+        try:
+            with stage_timer('llm'):
+                response = await self.llm.ainvoke(prompt)
+            response_text = response.content
+            logger.debug(f"LLM response: {response_text[:200]}...")
+        
+        except Exception as e:
+            logger.error(f"LLM generation failed: {e}")
+            # Fallback to retrieval-only results
+            return await self._run_in_executor(self._create_fallback_response, query, retrieved_docs, start_time)
+        
+        return await self._run_in_executor(
+            self._finalize_response,
+            query, retrieved_docs, response_text, top_k, template_type, start_time, query_embedding
+        )
+    
+    def _prepare_generation(self, query, retrieved_docs, top_k, template_type, start_time,
+                            query_embedding):
+        """
+        Build the LLM prompt, or a final result if no LLM call is needed.
+        
+        Returns:
+            tuple: (result, None) when no documents were found or the semantic
+                cache hit, otherwise (None, prompt)
+        """
+        # Check if any documents were retrieved
+        if not retrieved_docs:
+            logger.warning("No relevant documents found")
+            return {
+                'query': query,
+                'message': 'No suitable assessments found for this query',
+                'recommendations': [],
+                'processing_time': time.time() - start_time
+            }, None
+        
+        # Reuse the answer to a near-duplicate query over the same documents
+        cached = self._get_semantic_cached_response(
+            query, query_embedding, retrieved_docs, top_k, template_type, start_time
+        )
+        if cached is not None:
+            return cached, None
+        
+        with stage_timer('format_context'):
+            # Format context for LLM
+            context = self.retriever.format_context_for_llm(retrieved_docs)
+            
+            # Create prompt
+            prompt = create_recommendation_prompt(
+                query, context, template_type, output_format=Config.LLM_OUTPUT_FORMAT
+            )
+            PROMPT_TOKENS.observe(count_tokens(prompt), part='prompt')
+        
+        return None, prompt
+    
+    def _finalize_response(self, query, retrieved_docs, response_text, top_k, template_type,
+                           start_time, query_embedding):
+        """
+        Parse and enrich an LLM response, then cache the result.
+        
+        Returns:
+            dict: Recommendation results
+        """
         # Parse response
-        recommendations = extract_recommendations_from_response(response_text)
+        with stage_timer('parse'):
+            recommendations = extract_recommendations(response_text, Config.LLM_OUTPUT_FORMAT)
+        
+        if not recommendations:
+            # Serve reranked retrieval results rather than re-querying the LLM
+            logger.warning("No recommendations could be parsed from the LLM response")
+            return self._create_reranked_response(
+                query, retrieved_docs, top_k or Config.TOP_K_RESULTS, start_time,
+                message='Recommendations based on similarity search (LLM output could not be parsed)',
+                fallback=True
+            )
         
         # Enrich recommendations with retrieved data
-        recommendations = self._enrich_recommendations(recommendations, retrieved_docs)
+        with stage_timer('enrich'):
+            recommendations = self._enrich_recommendations(recommendations, retrieved_docs)
         
         # Limit to requested count
         if top_k:
@@ -116,17 +690,182 @@ class Recommender:
             'recommendations': recommendations,
             'raw_response': response_text,
             'retrieved_count': len(retrieved_docs),
-            'processing_time': processing_time
+            'processing_time': processing_time,
+            'mode': 'llm'
         }
         
         logger.info(f"Generated {len(recommendations)} balanced recommendations in {processing_time:.2f}s")
         
+        self._cache_response(query, top_k, template_type, result)
+        self._semantic_cache_response(query_embedding, retrieved_docs, top_k, template_type, result)
+        
         return result
     
+    @staticmethod
+    def _prompt_variant(template_type):
+        """
+        Prompt variant a cached answer depends on.
+        
+        JSON output uses a single prompt whatever the template type, so JSON
+        answers are cached once rather than once per template type.
+        """
+        if Config.LLM_OUTPUT_FORMAT == "json":
+            return "json"
+        return template_type
+    
+    def _response_cache_key(self, query, top_k, template_type):
+        """Build the response cache key for a request against the current index and LLM settings."""
+        index_version = self.retriever.vector_store.index_version
+        self.response_cache.check_index_version(index_version)
+        return self.response_cache.make_key(
+            query, top_k or Config.TOP_K_RESULTS, self._prompt_variant(template_type), index_version,
+            model=Config.LLM_MODEL,
+            temperature=Config.LLM_TEMPERATURE,
+            prompt_version=prompt_version(template_type, Config.LLM_OUTPUT_FORMAT)
+        )
+    
+    def _get_cached_response(self, query, top_k, template_type, start_time):
+        """
+        Look up a previously generated response for an identical request.
+        
+        Args:
+            query: User's hiring requirement query
+            top_k: Number of recommendations requested
+            template_type: Prompt template type
+            start_time: Timestamp the request started at
+        
+        Returns:
+            dict: Cached result with refreshed processing_time, or None on a miss
+        """
+        if self.response_cache is None:
+            return None
+        
+        try:
+            with stage_timer('response_cache'):
+                result = self.response_cache.get(self._response_cache_key(query, top_k, template_type))
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            return None
+        
+        if result is None:
+            return None
+        
+        logger.info("Serving recommendations from response cache")
+        result['query'] = query
+        result['cached'] = True
+        result['processing_time'] = time.time() - start_time
+        return result
+    
+    def _cache_response(self, query, top_k, template_type, result):
+        """Store a successful LLM-generated result in the response cache."""
+        if self.response_cache is None:
+            return
+        
+        try:
+            self.response_cache.set(self._response_cache_key(query, top_k, template_type), result)
+        except Exception as e:
+            logger.warning(f"Failed to cache response: {e}")
+    
+    def _get_semantic_cached_response(self, query, query_embedding, retrieved_docs, top_k,
+                                      template_type, start_time):
+        """
+        Look up an answer to a near-duplicate query that retrieved the same documents.
+        
+        Args:
+            query: User's hiring requirement query
+            query_embedding: Query embedding
+            retrieved_docs: Retrieved product documents for the query
+            top_k: Number of recommendations requested
+            template_type: Prompt template type
+            start_time: Timestamp the request started at
+        
+        Returns:
+            dict: Cached result with refreshed processing_time, or None on a miss
+        """
+        if self.semantic_cache is None or query_embedding is None:
+            return None
+        
+        result, similarity = self.semantic_cache.lookup(
+            query_embedding,
+            [doc['product_id'] for doc in retrieved_docs],
+            top_k or Config.TOP_K_RESULTS,
+            self._prompt_variant(template_type),
+            self.retriever.vector_store.index_version
+        )
+        
+        if result is None:
+            return None
+        
+        logger.info(f"Serving recommendations from semantic cache (similarity {similarity:.3f})")
+        result['query'] = query
+        result['cached'] = True
+        result['cache_similarity'] = similarity
+        result['processing_time'] = time.time() - start_time
+        
+        # Promote to the exact-match cache for this wording
+        self._cache_response(query, top_k, template_type, result)
+        return result
+    
+    def _semantic_cache_response(self, query_embedding, retrieved_docs, top_k, template_type, result):
+        """Store a successful LLM-generated result in the semantic cache."""
+        if self.semantic_cache is None or query_embedding is None:
+            return
+        
+        try:
+            self.semantic_cache.add(
+                query_embedding,
+                [doc['product_id'] for doc in retrieved_docs],
+                top_k or Config.TOP_K_RESULTS,
+                self._prompt_variant(template_type),
+                self.retriever.vector_store.index_version,
+                result
+            )
+        except Exception as e:
+            logger.warning(f"Failed to add response to semantic cache: {e}")
+    
+    def get_cache_stats(self):
+        """
+        Get metrics for all caches in the recommendation path.
+        
+        Returns:
+            dict: Stats for the query embedding, response and semantic caches
+        """
+        return {
+            'query_embedding': self.retriever.query_processor.get_cache_stats(),
+            'embedding_batches': self.retriever.query_processor.get_batch_stats(),
+            'response': self.response_cache.stats() if self.response_cache is not None else None,
+            'semantic': self.semantic_cache.stats() if self.semantic_cache is not None else None,
+        }
+    
+    def _get_name_resolver(self):
+        """Get the catalogue name resolver, rebuilding it if the index has changed."""
+        vector_store = self.retriever.vector_store
+        with self._name_resolver_lock:
+            if self._name_resolver is None or self._name_resolver_version != vector_store.index_version:
+                self._name_resolver = NameResolver(vector_store.metadata)
+                self._name_resolver_version = vector_store.index_version
+            return self._name_resolver
+    
+    def _catalogue_doc(self, row):
+        """Build a retrieved-document dict for a catalogue row that wasn't retrieved."""
+        return self.retriever._format_results([{
+            'rank': None,
+            'index': row,
+            'distance': None,
+            'similarity_score': None,
+            'metadata': self.retriever.vector_store.metadata[row]
+        }])[0]
+    
     def _enrich_recommendations(self, recommendations, retrieved_docs):
         """
         Enrich parsed recommendations with full product data.
         
+        Products are looked up by the product_id the LLM referenced, falling
+        back to the name. Names are resolved against the whole catalogue, so
+        products the LLM names that weren't retrieved are still enriched;
+        retrieved documents are preferred when several products match equally
+        well.
+        
         Args:
             recommendations: Parsed recommendations from LLM
             retrieved_docs: Retrieved product documents
@@ -134,23 +873,25 @@ class Recommender:
         Returns:
             list: Enriched recommendations
         """
-        # Create lookup by product name
-        product_lookup = {
-            doc['product_name'].lower(): doc
-            for doc in retrieved_docs
-        }
+        resolver = self._get_name_resolver()
+        docs_by_row = {doc['index']: doc for doc in retrieved_docs if doc.get('index') is not None}
         
         enriched = []
         
         for rec in recommendations:
             assessment_name = rec.get('assessment_name', '')
             
-            # Find matching product
+            # Find matching product, by id when the LLM referenced one
+            row = resolver.resolve_id(rec.get('product_id'))
+            matched_by_id = row is not None
+            if not matched_by_id:
+                row, _ = resolver.resolve(assessment_name, docs_by_row)
             product_data = None
-            for name, data in product_lookup.items():
-                if name in assessment_name.lower() or assessment_name.lower() in name:
-                    product_data = data
-                    break
+            if row is not None:
+                product_data = docs_by_row.get(row) or self._catalogue_doc(row)
+                if matched_by_id:
+                    # The id is authoritative; use the catalogue name over the LLM's wording
+                    assessment_name = product_data.get('product_name') or assessment_name
             
             # Enrich recommendation
             enriched_rec = {
@@ -163,6 +904,9 @@ class Recommender:
             if product_data:
                 enriched_rec.update({
                     'product_id': product_data.get('product_id'),
+                    'assessment_url': product_data.get('assessment_url') or product_data.get('url', ''),
+                    'url': product_data.get('url') or product_data.get('assessment_url', ''),
+                    'test_type': product_data.get('test_type', ''),
                     'category': product_data.get('category'),
                     'description': product_data.get('description'),
                     'target_roles': product_data.get('target_roles', []),
@@ -185,19 +929,45 @@ class Recommender:
             start_time: Start timestamp
         
         Returns:
-            dict: Fallback response
+            dict: Fallback response, marked with 'fallback': True
         """
         logger.info("Creating fallback response from retrieval results")
         
+        return self._create_reranked_response(
+            query, retrieved_docs, 5, start_time,
+            message='Recommendations based on similarity search (LLM unavailable)',
+            fallback=True
+        )
+    
+    def _create_reranked_response(self, query, retrieved_docs, top_k, start_time, message=None,
+                                  fallback=False):
+        """
+        Build recommendations from retrieved documents ordered by the local reranker.
+        
+        Args:
+            query: Original query
+            retrieved_docs: Retrieved documents
+            top_k: Number of recommendations to return (defaults to Config.TOP_K_RESULTS)
+            start_time: Start timestamp
+            message: Optional message to include in the result
+            fallback: Whether this stands in for a failed LLM-mode request
+        
+        Returns:
+            dict: Recommendation results with the mode the request ran in, and
+                'fallback': True for LLM-mode fallbacks
+        """
+        with stage_timer('rerank'):
+            ranked_docs = self.reranker.rerank(query, retrieved_docs, top_k or Config.TOP_K_RESULTS)
+        
         recommendations = []
         
-        for i, doc in enumerate(retrieved_docs[:5], 1):
+        for doc in ranked_docs:
             rec = {
                 'assessment_name': doc['product_name'],
                 'assessment_url': doc.get('assessment_url', doc.get('url', '')),
                 'url': doc.get('url', doc.get('assessment_url', '')),
                 'test_type': doc.get('test_type', ''),
-                'relevance_score': doc['similarity_score'] * 10,  # Scale to 0-10
+                'relevance_score': max(doc['similarity_score'], 0.0) * 10,  # Scale to 0-10
                 'reasoning': f"This assessment matches your requirements based on semantic similarity. "
                             f"Category: {doc['category']}. "
                             f"Suitable for: {', '.join(doc.get('target_roles', []))}.",
@@ -207,18 +977,29 @@ class Recommender:
                 'target_roles': doc.get('target_roles', []),
                 'skills_assessed': doc.get('skills_assessed', []),
                 'duration': doc.get('duration'),
-                'similarity_score': doc.get('similarity_score')
+                'similarity_score': doc.get('similarity_score'),
+                'rerank_score': doc.get('rerank_score')
             }
             recommendations.append(rec)
         
-        return {
+        processing_time = time.time() - start_time
+        
+        result = {
             'query': query,
             'recommendations': recommendations,
-            'message': 'Recommendations based on similarity search (LLM unavailable)',
             'retrieved_count': len(retrieved_docs),
-            'processing_time': time.time() - start_time
+            'processing_time': processing_time,
+            'mode': 'llm' if fallback else 'fast'
         }
-
+        if message:
+            result['message'] = message
+        if fallback:
+            # Lets offline runs retry the query once the LLM is back
+            result['fallback'] = True
+        
+        logger.info(f"Reranked {len(recommendations)} recommendations with {self.reranker.name} reranker in {processing_time:.3f}s")
+        
+        return result
 
 def test_recommender():
     """Test recommender functionality."""
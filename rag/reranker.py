@@ -0,0 +1,212 @@
+"""Local rerankers for the retrieval-only (fast) recommendation mode."""
+import logging
+import re
+from config import Config
+from preprocessing.clean_text import parse_duration_limit, parse_duration_range
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+# Query keywords that signal a preferred assessment category
+CATEGORY_KEYWORDS = {
+    'Cognitive Ability': ['cognitive', 'aptitude', 'reasoning', 'numerical', 'verbal', 'logical',
+                          'analytical', 'problem solving', 'problem-solving'],
+    'Technical Skills': ['technical', 'coding', 'programming', 'developer', 'engineer', 'java',
+                         'python', 'sql', 'javascript', 'software', 'data'],
+    'Personality  Behavior': ['personality', 'behavior', 'behaviour', 'collaborat', 'teamwork',
+                              'culture', 'communication', 'interpersonal', 'leadership'],
+    'Situational Judgment': ['situational', 'judgment', 'judgement', 'scenario', 'decision'],
+    'Job-Focused Assessment': ['sales', 'customer service', 'retail', 'call center', 'contact center',
+                               'administrative', 'clerical', 'bank'],
+}
+
+# Query keywords that signal a preferred test type
+TEST_TYPE_KEYWORDS = {
+    'K': ['knowledge', 'skill', 'technical', 'coding', 'programming', 'ability', 'aptitude'],
+    'P': ['personality', 'behavior', 'behaviour', 'culture', 'motivation', 'collaborat'],
+    'S': ['simulation', 'situational', 'scenario', 'judgment', 'judgement'],
+}
+
+DEFAULT_WEIGHTS = {
+    'similarity': 1.0,
+    'keyword_overlap': 0.6,
+    'category': 0.3,
+    'test_type': 0.2,
+    'duration': 0.3,
+}
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'for', 'from', 'i', 'in', 'is', 'it',
+    'looking', 'my', 'of', 'on', 'or', 'that', 'the', 'their', 'this', 'to', 'we', 'who', 'with',
+    'am', 'hiring', 'need', 'want', 'assessment', 'assessments', 'test', 'tests', 'also', 'our',
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9+#]+")
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords removed."""
+    return {token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS}
+
+
+def _matched_labels(query_lower, keyword_map):
+    """Labels whose keywords appear in the lowercased query."""
+    return {
+        label for label, keywords in keyword_map.items()
+        if any(keyword in query_lower for keyword in keywords)
+    }
+
+
+class FeatureReranker:
+    """
+    Deterministic reranker over catalogue features.
+    
+    Scores each retrieved product with a weighted sum of its vector similarity,
+    query keyword overlap, category and test type hints from the query, and
+    whether its duration fits a time limit stated in the query.
+    """
+    
+    name = "feature"
+    
+    def __init__(self, weights=None):
+        """
+        Initialize reranker.
+        
+        Args:
+            weights: Feature weight overrides (see DEFAULT_WEIGHTS)
+        """
+        self.weights = dict(DEFAULT_WEIGHTS)
+        if weights:
+            self.weights.update(weights)
+    
+    def _features(self, query_tokens, categories, test_types, duration_limit, doc):
+        """Compute feature values in [0, 1] for one document."""
+        doc_text = " ".join([
+            doc.get('product_name') or '',
+            doc.get('description') or '',
+            " ".join(doc.get('skills_assessed') or []),
+            " ".join(doc.get('target_roles') or []),
+        ])
+        doc_tokens = tokenize(doc_text)
+        
+        features = {
+            'similarity': max(float(doc.get('similarity_score') or 0.0), 0.0),
+            'keyword_overlap': len(query_tokens & doc_tokens) / len(query_tokens) if query_tokens else 0.0,
+            'category': 1.0 if doc.get('category') in categories else 0.0,
+            'test_type': 1.0 if doc.get('test_type') in test_types else 0.0,
+            'duration': 0.0,
+        }
+        
+        if duration_limit is not None:
+            duration_range = parse_duration_range(doc.get('duration'))
+            if duration_range is not None:
+                low, high = duration_range
+                if high <= duration_limit:
+                    features['duration'] = 1.0
+                elif low <= duration_limit:
+                    features['duration'] = 0.5
+        
+        return features
+    
+    def rerank(self, query, docs, top_k=None):
+        """
+        Rerank retrieved documents for a query.
+        
+        Args:
+            query: Query text
+            docs: Retrieved product documents (from Retriever)
+            top_k: Number of documents to keep (None keeps all)
+        
+        Returns:
+            list: Copies of docs ordered by rerank_score, with 'rerank_score'
+                and 'rerank_features' added
+        """
+        query_lower = query.lower()
+        query_tokens = tokenize(query)
+        categories = _matched_labels(query_lower, CATEGORY_KEYWORDS)
+        test_types = _matched_labels(query_lower, TEST_TYPE_KEYWORDS)
+        duration_limit = parse_duration_limit(query)
+        
+        reranked = []
+        for doc in docs:
+            features = self._features(query_tokens, categories, test_types, duration_limit, doc)
+            score = sum(self.weights[name] * value for name, value in features.items())
+            reranked.append(dict(doc, rerank_score=score, rerank_features=features))
+        
+        # Ties keep retrieval order (sorted is stable)
+        reranked.sort(key=lambda doc: doc['rerank_score'], reverse=True)
+        return reranked[:top_k] if top_k else reranked
+
+
+class CrossEncoderReranker:
+    """Rerank with a sentence-transformers cross-encoder run locally on CPU."""
+    
+    name = "cross_encoder"
+    
+    def __init__(self, model_name=None):
+        """
+        Initialize reranker.
+        
+        Args:
+            model_name: Cross-encoder model (defaults to Config.CROSS_ENCODER_MODEL)
+        """
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError:
+            raise ImportError(
+                "sentence-transformers is required for the cross-encoder reranker. "
+                "Install with: pip install sentence-transformers"
+            )
+        
+        self.model_name = model_name or Config.CROSS_ENCODER_MODEL
+        self.model = CrossEncoder(self.model_name)
+        logger.info(f"Initialized cross-encoder reranker: {self.model_name}")
+    
+    def rerank(self, query, docs, top_k=None):
+        """
+        Rerank retrieved documents for a query.
+        
+        Args:
+            query: Query text
+            docs: Retrieved product documents (from Retriever)
+            top_k: Number of documents to keep (None keeps all)
+        
+        Returns:
+            list: Copies of docs ordered by rerank_score
+        """
+        if not docs:
+            return []
+        
+        pairs = [
+            (query, f"{doc.get('product_name') or ''}. {doc.get('description') or ''}")
+            for doc in docs
+        ]
+        scores = self.model.predict(pairs)
+        
+        reranked = [dict(doc, rerank_score=float(score)) for doc, score in zip(docs, scores)]
+        reranked.sort(key=lambda doc: doc['rerank_score'], reverse=True)
+        return reranked[:top_k] if top_k else reranked
+
+
+def create_reranker(kind=None):
+    """
+    Create the configured reranker.
+    
+    Args:
+        kind: "feature" or "cross_encoder" (defaults to Config.RERANKER)
+    
+    Returns:
+        FeatureReranker or CrossEncoderReranker; falls back to the feature
+        reranker if the cross-encoder can't be loaded
+    """
+    kind = (kind or Config.RERANKER).lower()
+    
+    if kind == "cross_encoder":
+        try:
+            return CrossEncoderReranker()
+        except Exception as e:
+            logger.warning(f"Cross-encoder reranker unavailable, using feature reranker: {e}")
+    elif kind != "feature":
+        logger.warning(f"Unknown reranker '{kind}', using feature reranker")
+    
+    return FeatureReranker()
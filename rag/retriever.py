@@ -1,15 +1,22 @@
 """Retriever for RAG-based recommendation system."""
 import logging
+import math
+import numpy as np
 from config import Config
 from vector_store.vector_store import VectorStore
 from vector_store.query_processor import QueryProcessor
+from vector_store.attribute_index import AttributeFilter
+from vector_store.query_constraints import extract_constraints
+from vector_store.sparse_index import reciprocal_rank_fusion, weighted_score_fusion
+from preprocessing.tokenizer import ContextBuilder
+from monitoring.metrics import stage_timer
 
 logging.basicConfig(level=Config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 
 class Retriever:
-    """Retrieve relevant products using vector similarity search."""
+    """Retrieve relevant products using vector similarity search, fused with BM25 keyword search."""
     
     def __init__(self, vector_store=None):
         """
@@ -20,6 +27,10 @@ class Retriever:
         """
         self.vector_store = vector_store
         self.query_processor = QueryProcessor()
+        self.context_builder = ContextBuilder()
+        self.apply_query_constraints = Config.QUERY_CONSTRAINTS_ENABLED
+        self.hybrid_search = Config.HYBRID_SEARCH_ENABLED
+        self.fusion = Config.HYBRID_FUSION
         
         if self.vector_store is None:
             self._load_vector_store()
@@ -36,32 +47,51 @@ class Retriever:
                 "Vector store not found. Please run build_embeddings.py first."
             )
     
-    def retrieve(self, query, k=None):
+    def retrieve(self, query, k=None, query_embedding=None, filters=None, min_score=None):
         """
         Retrieve top-k relevant products for a query.
         
         Args:
             query: Query string
             k: Number of results to return (defaults to Config.TOP_K_RESULTS)
+            query_embedding: Precomputed query embedding (generated if None)
+            filters: AttributeFilter applied inside the vector search. If None,
+                constraints stated in the query are applied instead (when
+                apply_query_constraints is set), topped up with unfiltered
+                results if fewer than k products satisfy them
+            min_score: Only return products with at least this similarity_score;
+                the search goes deeper until k such products are found (optional)
         
         Returns:
-            list: List of retrieved product dictionaries with scores
+            list: Retrieved product dictionaries with scores, one per product
+                (chunks of a product are collapsed into its best ranked chunk)
         """
         if k is None:
             k = Config.TOP_K_RESULTS
         
         logger.info(f"Retrieving top-{k} results for query: '{query}'")
         
+        top_up = False
+        if filters is None:
+            filters = self._query_filter(query)
+            top_up = filters is not None
+        
         # Generate query embedding
-        try:
-            query_embedding = self.query_processor.generate_query_embedding(query)
-        except Exception as e:
-            logger.error(f"Failed to generate query embedding: {e}")
-            raise
+        if query_embedding is None:
+            try:
+                query_embedding = self.query_processor.generate_query_embedding(query)
+            except Exception as e:
+                logger.error(f"Failed to generate query embedding: {e}")
+                raise
         
         # Search vector store
         try:
-            results = self.vector_store.search(query_embedding, k=k)
+            with stage_timer('search'):
+                results = self._search_products(query, query_embedding, k, filters, min_score=min_score)
+                if top_up and len(results) < self._wanted(k):
+                    results = self._top_up(
+                        results, self._search_products(query, query_embedding, k, min_score=min_score), k
+                    )
         except Exception as e:
             logger.error(f"Failed to search vector store: {e}")
             raise
@@ -71,11 +101,375 @@ class Retriever:
             logger.warning("No results found for query")
             return []
         
-        # Format results
+        retrieved_docs = self._format_results(results)
+        
+        logger.info(f"Retrieved {len(retrieved_docs)} documents")
+        return retrieved_docs
+    
+    def retrieve_batch(self, queries, k=None, query_embeddings=None, filters=None):
+        """
+        Retrieve top-k relevant products for several queries at once.
+        
+        All queries are embedded with a single encode call and searched with a
+        single FAISS call over the (n, dimension) query matrix.
+        
+        Args:
+            queries: List of query strings
+            k: Number of results per query (defaults to Config.TOP_K_RESULTS)
+            query_embeddings: Precomputed (n, dimension) query embeddings (generated if None)
+            filters: AttributeFilter applied to every query. If None, each
+                query's own constraints are applied as in retrieve()
+        
+        Returns:
+            list: One list of retrieved product dictionaries per query, one per product
+        """
+        if k is None:
+            k = Config.TOP_K_RESULTS
+        
+        if not queries:
+            return []
+        
+        logger.info(f"Retrieving top-{k} results for {len(queries)} queries")
+        
+        # Generate all query embeddings in one batch
+        if query_embeddings is None:
+            try:
+                query_embeddings = self.query_processor.generate_query_embeddings(queries)
+            except Exception as e:
+                logger.error(f"Failed to generate query embeddings: {e}")
+                raise
+        
+        if filters is not None:
+            query_filters, top_up = [filters] * len(queries), False
+        else:
+            query_filters, top_up = [self._query_filter(query) for query in queries], True
+        
+        # Search vector store with the whole query matrix
+        try:
+            with stage_timer('search'):
+                batch_results = self._search_constrained(query_embeddings, k, query_filters, queries, top_up)
+        except Exception as e:
+            logger.error(f"Failed to search vector store: {e}")
+            raise
+        
+        return [self._format_results(results) for results in batch_results]
+    
+    def _query_filter(self, query):
+        """
+        Build a search filter from the hard constraints stated in a query.
+        
+        Returns:
+            AttributeFilter: Filter for the query, or None if constraints are
+                disabled or the query states none
+        """
+        if not self.apply_query_constraints:
+            return None
+        
+        with stage_timer('constraints'):
+            attribute_filter = extract_constraints(query).to_filter()
+        
+        if attribute_filter.is_empty():
+            return None
+        
+        logger.info(f"Applying query constraints: {attribute_filter.to_dict()}")
+        return attribute_filter
+    
+    def _wanted(self, k):
+        """Number of distinct products a search for k can return."""
+        return min(k, self.vector_store.get_row_products()[1])
+    
+    def _fetch_count(self, k):
+        """Rows to fetch for k products: k times the average number of chunks per product."""
+        row_products, product_count = self.vector_store.get_row_products()
+        if product_count == 0:
+            return k
+        return math.ceil(k * len(row_products) / product_count)
+    
+    def _available_rows(self, filters):
+        """Number of rows a search with filters can return."""
+        if filters is None or filters.is_empty():
+            return self.vector_store.index.ntotal
+        return self.vector_store.get_attribute_index().bitmap(filters)[1]
+    
+    def _collapse_products(self, results, k):
+        """
+        Collapse chunk hits into one result per product.
+        
+        Each product is represented by its best ranked row and scored by
+        Config.CHUNK_AGGREGATION: "max" keeps the best row's score, "sum" adds
+        the scores of its best Config.CHUNK_SUM_TOP_N rows.
+        
+        Args:
+            results: Vector store result dicts, best first
+            k: Number of products to return (None for all)
+        
+        Returns:
+            list: Up to k result dicts with distinct products, re-ranked from 1,
+                each with chunk_hits (rows of that product in results)
+        """
+        if not results:
+            return []
+        
+        row_products, product_count = self.vector_store.get_row_products()
+        rows = np.fromiter((result['index'] for result in results), dtype='int64', count=len(results))
+        products = row_products[rows]
+        _, first, inverse, hits = np.unique(
+            products, return_index=True, return_inverse=True, return_counts=True
+        )
+        
+        if Config.CHUNK_AGGREGATION == 'sum' and len(first) < len(rows):
+            scores = np.array([self._ranking_score(result) for result in results], dtype='float64')
+            # Results are best first, so a row's position among its product's rows is its chunk rank
+            order = np.argsort(inverse, kind='stable')
+            starts = np.searchsorted(inverse[order], np.arange(len(first)))
+            chunk_rank = np.empty(len(rows), dtype='int64')
+            chunk_rank[order] = np.arange(len(rows)) - starts[inverse[order]]
+            keep = chunk_rank < Config.CHUNK_SUM_TOP_N
+            product_scores = np.bincount(inverse[keep], weights=scores[keep], minlength=len(first))
+            # Ties keep retrieval order
+            groups = np.lexsort((first, -product_scores))
+        else:
+            groups = np.argsort(first)
+        
+        return [
+            dict(results[first[group]], rank=rank, chunk_hits=int(hits[group]))
+            for rank, group in enumerate(groups[:k], 1)
+        ]
+    
+    @staticmethod
+    def _ranking_score(result):
+        """Score results are ordered by: fusion_score after hybrid fusion, else similarity."""
+        score = result.get('fusion_score')
+        return result['similarity_score'] if score is None else score
+    
+    def _search_products(self, query, query_embedding, k, filters=None, fetch=None, min_score=None):
+        """
+        Search for k distinct products.
+        
+        Fetches k times the average chunks per product and collapses chunks;
+        if chunk-heavy products (or products below min_score) still leave
+        fewer than k products, the fetch is doubled until k products are found
+        or every row was considered.
+        
+        Args:
+            query: Query string (None for vector search only)
+            query_embedding: Query embedding
+            k: Number of products
+            filters: AttributeFilter (optional)
+            fetch: Rows to fetch first (defaults to _fetch_count(k))
+            min_score: Drop products whose similarity_score is below this (optional)
+        
+        Returns:
+            list: Up to k result dicts with distinct products
+        """
+        available = self._available_rows(filters)
+        fetch = min(fetch or self._fetch_count(k), max(available, 1))
+        # Without fusion, results are ordered by similarity, so none past a failing row can pass
+        fused = self.hybrid_search and query is not None
+        
+        while True:
+            rows = self._search(query, query_embedding, fetch, filters)
+            if min_score is None:
+                results = self._collapse_products(rows, k)
+            else:
+                qualifying = [
+                    result for result in self._collapse_products(rows, None)
+                    if result['similarity_score'] >= min_score
+                ]
+                results = [dict(result, rank=rank) for rank, result in enumerate(qualifying[:k], 1)]
+                if not fused and rows and rows[-1]['similarity_score'] < min_score:
+                    return results
+            if len(results) >= k or fetch >= available:
+                return results
+            fetch = min(fetch * 2, available)
+            logger.debug(f"Found {len(results)}/{k} products, fetching {fetch} rows")
+    
+    def _candidate_count(self, k):
+        """Results fetched from each retriever before fusion."""
+        return max(k, Config.HYBRID_CANDIDATES) if self.hybrid_search else k
+    
+    def _search(self, query, query_embedding, k, filters=None):
+        """
+        Search one query, fusing vector and BM25 results when hybrid search is on.
+        
+        Args:
+            query: Query string
+            query_embedding: Query embedding
+            k: Number of results
+            filters: AttributeFilter applied to both searches (optional)
+        
+        Returns:
+            list: Vector store result dicts, best first
+        """
+        dense = self.vector_store.search(query_embedding, k=self._candidate_count(k), filters=filters)
+        if not self.hybrid_search or query is None:
+            return dense
+        return self._fuse(query, query_embedding, dense, k, filters)
+    
+    def _fuse(self, query, query_embedding, dense, k, filters=None):
+        """
+        Fuse vector results with BM25 results for the same query.
+        
+        Keyword hits the vector search didn't return are scored against the
+        query embedding, so every result keeps a comparable similarity_score.
+        
+        Args:
+            query: Query string
+            query_embedding: Query embedding
+            dense: Vector store results, best first
+            k: Number of results
+            filters: AttributeFilter applied to the BM25 search (optional)
+        
+        Returns:
+            list: Top-k fused result dicts with rank, bm25_score and fusion_score
+        """
+        with stage_timer('sparse'):
+            sparse = self.vector_store.sparse_search(query, k=self._candidate_count(k), filters=filters)
+        
+        if not sparse:
+            return dense[:k]
+        
+        weights = [1.0, Config.HYBRID_SPARSE_WEIGHT]
+        if self.fusion == 'weighted':
+            fused = weighted_score_fusion([
+                [(result['index'], result['similarity_score']) for result in dense],
+                [(result['index'], result['bm25_score']) for result in sparse],
+            ], weights)
+        else:
+            fused = reciprocal_rank_fusion([
+                [result['index'] for result in dense],
+                [result['index'] for result in sparse],
+            ], weights)
+        fused = fused[:k]
+        
+        by_row = {result['index']: result for result in dense}
+        bm25_scores = {result['index']: result['bm25_score'] for result in sparse}
+        
+        missing = [row for row, _ in fused if row not in by_row]
+        if missing:
+            distances, similarities = self.vector_store.score_rows(query_embedding, missing)
+            for row, distance, similarity_score in zip(missing, distances, similarities):
+                by_row[row] = {
+                    'index': row,
+                    'distance': float(distance),
+                    'similarity_score': float(similarity_score),
+                    'metadata': self.vector_store.metadata[row]
+                }
+        
+        return [
+            dict(by_row[row], rank=rank, bm25_score=bm25_scores.get(row, 0.0), fusion_score=score)
+            for rank, (row, score) in enumerate(fused, 1)
+        ]
+    
+    def _search_constrained(self, query_embeddings, k, query_filters, queries=None, top_up=True):
+        """
+        Search several queries, each with its own filter.
+        
+        Queries sharing a filter are searched as one matrix and chunk hits are
+        collapsed to distinct products; queries whose filter matched fewer than
+        k products are topped up with one unfiltered batch search.
+        
+        Args:
+            query_embeddings: (n, dimension) query embeddings
+            k: Number of results per query
+            query_filters: AttributeFilter or None per query
+            queries: Query strings, needed for hybrid search (vector search only if None)
+            top_up: Fill filtered results up to k with unfiltered ones
+        
+        Returns:
+            list: One vector store result list per query, with distinct products
+        """
+        query_embeddings = np.asarray(query_embeddings, dtype='float32')
+        hybrid = self.hybrid_search and queries is not None
+        fetch = self._fetch_count(k)
+        candidates = self._candidate_count(fetch) if hybrid else fetch
+        
+        groups = {}
+        for position, attribute_filter in enumerate(query_filters):
+            key = attribute_filter.key() if attribute_filter is not None else None
+            groups.setdefault(key, (attribute_filter, []))[1].append(position)
+        
+        batch_results = [None] * len(query_filters)
+        for attribute_filter, positions in groups.values():
+            group_results = self.vector_store.search_batch(
+                query_embeddings[positions], k=candidates, filters=attribute_filter
+            )
+            for position, results in zip(positions, group_results):
+                batch_results[position] = self._collapse_query(
+                    queries, query_embeddings, position, results, k, fetch, attribute_filter
+                )
+        
+        if not top_up:
+            return batch_results
+        
+        wanted = self._wanted(k)
+        short = [
+            position for position, attribute_filter in enumerate(query_filters)
+            if attribute_filter is not None and len(batch_results[position]) < wanted
+        ]
+        if short:
+            fallback_results = self.vector_store.search_batch(query_embeddings[short], k=candidates)
+            for position, fallback in zip(short, fallback_results):
+                fallback = self._collapse_query(queries, query_embeddings, position, fallback, k, fetch)
+                batch_results[position] = self._top_up(batch_results[position], fallback, k)
+        
+        return batch_results
+    
+    def _collapse_query(self, queries, query_embeddings, position, results, k, fetch, filters=None):
+        """
+        Fuse and collapse one query's batch search results, searching again
+        with a larger fetch if chunks left fewer than k products.
+        """
+        query = queries[position] if queries is not None else None
+        if self.hybrid_search and query is not None:
+            results = self._fuse(query, query_embeddings[position], results, fetch, filters)
+        
+        products = self._collapse_products(results, k)
+        if len(products) < k and fetch < self._available_rows(filters):
+            products = self._search_products(query, query_embeddings[position], k, filters, fetch=fetch * 2)
+        return products
+    
+    def _top_up(self, results, fallback, k):
+        """
+        Fill filtered results up to k with unfiltered ones, keeping matches first.
+        
+        Args:
+            results: Filtered vector store results
+            fallback: Unfiltered vector store results for the same query
+            k: Number of results wanted
+        
+        Returns:
+            list: Combined results with distinct products, re-ranked from 1
+        """
+        row_products, _ = self.vector_store.get_row_products()
+        seen = {row_products[result['index']] for result in results}
+        combined = list(results)
+        for result in fallback:
+            if len(combined) >= k:
+                break
+            if row_products[result['index']] not in seen:
+                seen.add(row_products[result['index']])
+                combined.append(result)
+        
+        for rank, result in enumerate(combined, 1):
+            result['rank'] = rank
+        return combined
+    
+    def _format_results(self, results):
+        """
+        Convert raw vector store results into retrieved product dictionaries.
+        
+        Args:
+            results: List of result dicts from VectorStore.search
+        
+        Returns:
+            list: Retrieved product dictionaries with scores
+        """
         retrieved_docs = []
         for result in results:
             doc = {
                 'rank': result['rank'],
+                'index': result['index'],
                 'product_id': result['metadata'].get('id'),
                 'product_name': result['metadata'].get('name'),
                 'description': result['metadata'].get('description'),
@@ -87,44 +481,41 @@ class Retriever:
                 'skills_assessed': result['metadata'].get('skills_assessed', []),
                 'duration': result['metadata'].get('duration'),
                 'similarity_score': result['similarity_score'],
-                'distance': result['distance']
+                'distance': result['distance'],
+                'bm25_score': result.get('bm25_score'),
+                'fusion_score': result.get('fusion_score'),
+                'chunk_hits': result.get('chunk_hits', 1)
             }
             retrieved_docs.append(doc)
         
-        logger.info(f"Retrieved {len(retrieved_docs)} documents")
         return retrieved_docs
     
-    def retrieve_with_filter(self, query, k=None, category=None, min_score=0.0):
+    def retrieve_with_filter(self, query, k=None, category=None, min_score=0.0, test_type=None,
+                             max_duration=None, query_embedding=None):
         """
         Retrieve products with optional filtering.
         
+        Attribute filters are applied inside the vector search and min_score
+        before the top-k cut, so up to k matching products are returned however
+        selective the filter or threshold is.
+        
         Args:
             query: Query string
-            k: Number of results
-            category: Filter by category (optional)
-            min_score: Minimum similarity score threshold
+            k: Number of results (defaults to Config.TOP_K_RESULTS)
+            category: Filter by category, or list of categories (optional)
+            min_score: Minimum similarity score threshold (cosine similarity when
+                the vector store uses the "cosine" metric)
+            test_type: Filter by test type code, or list of codes (optional)
+            max_duration: Keep products that can be completed within this many minutes (optional)
+            query_embedding: Precomputed query embedding (generated if None)
         
         Returns:
             list: Filtered retrieved products
         """
-        # Get initial results
-        results = self.retrieve(query, k=k*2 if category or min_score > 0 else k)
-        
-        # Apply filters
-        filtered_results = []
-        for doc in results:
-            # Category filter
-            if category and doc.get('category', '').lower() != category.lower():
-                continue
-            
-            # Score filter
-            if doc.get('similarity_score', 0) < min_score:
-                continue
-            
-            filtered_results.append(doc)
-        
-        # Limit to k results
-        filtered_results = filtered_results[:k or Config.TOP_K_RESULTS]
+        filters = AttributeFilter(categories=category, test_types=test_type, max_duration=max_duration)
+        filtered_results = self.retrieve(
+            query, k=k, query_embedding=query_embedding, filters=filters, min_score=min_score
+        )
         
         logger.info(f"Filtered to {len(filtered_results)} results")
         return filtered_results
@@ -137,35 +528,10 @@ class Retriever:
             retrieved_docs: List of retrieved product dictionaries
         
         Returns:
-            str: Formatted context string
+            str: Compact product table fitted to Config.CONTEXT_MAX_TOKENS
         """
-        if not retrieved_docs:
-            return "No relevant assessments found."
-        
-        context_parts = []
-        
-        for i, doc in enumerate(retrieved_docs, 1):
-            context = f"{i}. {doc['product_name']}\n"
-            context += f"   Category: {doc['category']}\n"
-            context += f"   Description: {doc['description']}\n"
-            
-            if doc.get('target_roles'):
-                roles = ', '.join(doc['target_roles'])
-                context += f"   Target Roles: {roles}\n"
-            
-            if doc.get('skills_assessed'):
-                skills = ', '.join(doc['skills_assessed'])
-                context += f"   Skills Assessed: {skills}\n"
-            
-            if doc.get('duration'):
-                context += f"   Duration: {doc['duration']}\n"
-            
-            context += f"   Relevance Score: {doc['similarity_score']:.3f}\n"
-            
-            context_parts.append(context)
-        
-        return "\n".join(context_parts)
-
+        context, _ = self.context_builder.build(retrieved_docs)
+        return context
 
 def test_retriever():
     """Test retriever functionality."""
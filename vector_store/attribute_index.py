@@ -0,0 +1,224 @@
+"""Bitset index over product attributes for pre-filtered vector search."""
+import logging
+import re
+import numpy as np
+from config import Config
+from preprocessing.clean_text import parse_duration_range
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+# Combined bitmaps kept per distinct filter
+BITMAP_CACHE_SIZE = 256
+
+# Upper edges (minutes) of the duration buckets; products longer than the last
+# edge share an overflow bucket
+DURATION_BUCKET_EDGES = (10, 15, 20, 25, 30, 40, 45, 60, 90, 120, 180)
+
+_NON_KEY_CHARS = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_attribute(value):
+    """Normalize an attribute value for matching (e.g. "Personality & Behavior" -> "personality behavior")."""
+    return _NON_KEY_CHARS.sub(" ", str(value).lower()).strip()
+
+
+def _as_set(values):
+    """Normalize a value or iterable of values to a set of attribute keys."""
+    if values is None:
+        return set()
+    if isinstance(values, str):
+        values = [values]
+    return {normalize_attribute(value) for value in values if value}
+
+
+class AttributeFilter:
+    """
+    Hard constraints on product attributes.
+    
+    Values within an attribute are alternatives (OR); attributes are combined
+    with AND. Attributes left as None don't constrain the search.
+    """
+    
+    def __init__(self, categories=None, test_types=None, max_duration=None, include_unknown_duration=True):
+        """
+        Initialize filter.
+        
+        Args:
+            categories: Category or list of categories
+            test_types: Test type code or list of codes (e.g. "K", ["P", "S"])
+            max_duration: Keep products that can be completed within this many
+                minutes (the lower end of a duration range is compared)
+            include_unknown_duration: Keep products without a parseable duration
+                when max_duration is set
+        """
+        self.categories = _as_set(categories)
+        self.test_types = _as_set(test_types)
+        self.max_duration = max_duration
+        self.include_unknown_duration = include_unknown_duration
+    
+    def is_empty(self):
+        """Whether the filter constrains nothing."""
+        return not self.categories and not self.test_types and self.max_duration is None
+    
+    def key(self):
+        """Hashable identity of the filter."""
+        return (
+            frozenset(self.categories),
+            frozenset(self.test_types),
+            self.max_duration,
+            self.include_unknown_duration,
+        )
+    
+    def to_dict(self):
+        """Serializable form, e.g. for logs and API responses."""
+        return {
+            'categories': sorted(self.categories),
+            'test_types': sorted(self.test_types),
+            'max_duration': self.max_duration,
+            'include_unknown_duration': self.include_unknown_duration,
+        }
+    
+    def __repr__(self):
+        return f"AttributeFilter({self.to_dict()})"
+
+
+class AttributeIndex:
+    """
+    Per-value bitsets over catalogue rows.
+    
+    Holds one bitset per category, per test type and per duration bucket, in
+    the packed little-endian layout faiss.IDSelectorBitmap reads, so combining
+    a filter is a few vectorized AND/OR operations over n/8 bytes.
+    """
+    
+    def __init__(self, products):
+        """
+        Build the index.
+        
+        Args:
+            products: Sequence of catalogue metadata dicts; row positions match
+                the FAISS ids
+        """
+        self.size = len(products)
+        
+        categories = {}
+        test_types = {}
+        min_durations = np.full(self.size, np.nan, dtype='float32')
+        
+        for row, product in enumerate(products):
+            if product.get('category'):
+                categories.setdefault(normalize_attribute(product['category']), []).append(row)
+            if product.get('test_type'):
+                test_types.setdefault(normalize_attribute(product['test_type']), []).append(row)
+            duration_range = parse_duration_range(product.get('duration'))
+            if duration_range is not None:
+                # A range like "45-90 minutes" fits any limit its shortest run fits
+                min_durations[row] = duration_range[0]
+        
+        self.categories = {value: self._bitset(rows) for value, rows in categories.items()}
+        self.test_types = {value: self._bitset(rows) for value, rows in test_types.items()}
+        
+        # Bucket b holds products whose shortest duration is in (edge[b-1], edge[b]]
+        self.min_durations = min_durations
+        known = ~np.isnan(min_durations)
+        buckets = np.searchsorted(DURATION_BUCKET_EDGES, min_durations[known], side='left')
+        known_rows = np.flatnonzero(known)
+        self.duration_buckets = [
+            self._bitset(known_rows[buckets == bucket]) for bucket in range(len(DURATION_BUCKET_EDGES) + 1)
+        ]
+        self.unknown_duration = self._bitset(np.flatnonzero(~known))
+        
+        self._bitmap_cache = {}
+        
+        logger.info(
+            f"Built attribute index over {self.size} products "
+            f"({len(self.categories)} categories, {len(self.test_types)} test types)"
+        )
+    
+    def _bitset(self, rows):
+        """Packed bitset with the given rows set."""
+        mask = np.zeros(self.size, dtype=bool)
+        mask[np.asarray(rows, dtype='int64')] = True
+        return np.packbits(mask, bitorder='little')
+    
+    def _empty(self):
+        """Packed bitset with no rows set."""
+        return np.zeros((self.size + 7) // 8, dtype='uint8')
+    
+    def _any_of(self, bitsets, values):
+        """OR of the bitsets for the given values (unknown values match nothing)."""
+        result = self._empty()
+        for value in values:
+            bitset = bitsets.get(value)
+            if bitset is not None:
+                np.bitwise_or(result, bitset, out=result)
+            else:
+                logger.debug(f"No products with attribute value '{value}'")
+        return result
+    
+    def _duration_at_most(self, limit, include_unknown):
+        """Bitset of products that can be completed within limit minutes."""
+        result = self._empty()
+        bucket = int(np.searchsorted(DURATION_BUCKET_EDGES, limit, side='left'))
+        
+        # Buckets entirely within the limit are taken whole
+        full_buckets = bucket
+        if bucket < len(DURATION_BUCKET_EDGES) and DURATION_BUCKET_EDGES[bucket] == limit:
+            full_buckets += 1
+        for bitset in self.duration_buckets[:full_buckets]:
+            np.bitwise_or(result, bitset, out=result)
+        
+        # The bucket the limit falls inside is checked product by product
+        if full_buckets == bucket:
+            with np.errstate(invalid='ignore'):
+                partial = np.packbits(self.min_durations <= limit, bitorder='little')
+            np.bitwise_or(result, partial & self.duration_buckets[bucket], out=result)
+        
+        if include_unknown:
+            np.bitwise_or(result, self.unknown_duration, out=result)
+        return result
+    
+    def bitmap(self, attribute_filter):
+        """
+        Combine a filter into a single bitset.
+        
+        Args:
+            attribute_filter: AttributeFilter
+        
+        Returns:
+            tuple: (bitmap, count) with the packed uint8 bitmap of matching rows
+                and the number of matching rows (shared, must not be modified), or
+                (None, size) for an empty filter
+        """
+        if attribute_filter is None or attribute_filter.is_empty():
+            return None, self.size
+        
+        key = attribute_filter.key()
+        cached = self._bitmap_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        result = np.full((self.size + 7) // 8, 0xFF, dtype='uint8')
+        if attribute_filter.categories:
+            np.bitwise_and(result, self._any_of(self.categories, attribute_filter.categories), out=result)
+        if attribute_filter.test_types:
+            np.bitwise_and(result, self._any_of(self.test_types, attribute_filter.test_types), out=result)
+        if attribute_filter.max_duration is not None:
+            np.bitwise_and(
+                result,
+                self._duration_at_most(attribute_filter.max_duration, attribute_filter.include_unknown_duration),
+                out=result
+            )
+        
+        # Clear padding bits past the last row
+        if self.size % 8:
+            result[-1] &= (1 << (self.size % 8)) - 1
+        
+        count = int(np.unpackbits(result, bitorder='little').sum())
+        
+        # The index is immutable, so cached bitmaps never go stale
+        if len(self._bitmap_cache) >= BITMAP_CACHE_SIZE:
+            self._bitmap_cache.clear()
+        self._bitmap_cache[key] = (result, count)
+        return result, count
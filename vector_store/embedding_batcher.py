@@ -0,0 +1,154 @@
+"""Request-coalescing micro-batcher for query embeddings."""
+import asyncio
+import logging
+import threading
+import time
+import numpy as np
+from config import Config
+from monitoring.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_QUEUE_DELAY
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Coalesce concurrent single-query embedding requests into batched encodes.
+    
+    Callers await embed(text). Pending texts are flushed as one encode call
+    once max_batch_size texts are queued or the oldest has waited max_wait_ms,
+    whichever comes first. The encode runs on an executor so the event loop
+    keeps accepting requests while the model is busy.
+    """
+    
+    def __init__(self, encode_fn, max_batch_size=None, max_wait_ms=None, executor=None):
+        """
+        Initialize the batcher.
+        
+        Args:
+            encode_fn: Function mapping a list of texts to an embedding matrix
+            max_batch_size: Max texts per encode call (defaults to Config.EMBEDDING_BATCH_MAX_SIZE)
+            max_wait_ms: Max time a text waits for a batch to fill (defaults to
+                Config.EMBEDDING_BATCH_MAX_WAIT_MS)
+            executor: concurrent.futures executor for encode calls (None uses the loop default)
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, max_batch_size if max_batch_size is not None else Config.EMBEDDING_BATCH_MAX_SIZE)
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else Config.EMBEDDING_BATCH_MAX_WAIT_MS) / 1000.0
+        self.executor = executor
+        
+        self._pending = []
+        self._timer = None
+        # Strong references so in-flight batch tasks are not garbage collected
+        self._tasks = set()
+        
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._max_batch_seen = 0
+        self._batch_sizes = {}
+        self._queue_delay_total = 0.0
+        self._queue_delay_max = 0.0
+        self._encode_time_total = 0.0
+    
+    async def embed(self, text):
+        """
+        Embed a single text, sharing an encode call with concurrent callers.
+        
+        Args:
+            text: Text to embed
+        
+        Returns:
+            np.ndarray: Embedding vector
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        """Hand all pending texts to a background encode task."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        if not self._pending:
+            return
+        
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run_batch(self, batch):
+        """Encode a batch and resolve each caller's future."""
+        loop = asyncio.get_running_loop()
+        dispatch_time = time.perf_counter()
+        
+        # Identical queries in one batch are encoded once
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+        
+        try:
+            embeddings = await loop.run_in_executor(self.executor, self.encode_fn, texts)
+            embeddings = np.asarray(embeddings, dtype='float32')
+        except Exception as e:
+            logger.error(f"Batched embedding of {len(texts)} queries failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        encode_time = time.perf_counter() - dispatch_time
+        by_text = dict(zip(texts, embeddings))
+        for text, future, _ in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+        
+        self._record_batch(batch, dispatch_time, encode_time)
+        logger.debug(f"Encoded batch of {len(batch)} queries ({len(texts)} distinct) in {encode_time * 1000:.1f}ms")
+    
+    def _record_batch(self, batch, dispatch_time, encode_time):
+        """Update batch size and queueing delay metrics."""
+        delays = [dispatch_time - enqueued for _, _, enqueued in batch]
+        
+        EMBEDDING_BATCH_SIZE.observe(len(batch))
+        for delay in delays:
+            EMBEDDING_QUEUE_DELAY.observe(delay)
+        
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._max_batch_seen = max(self._max_batch_seen, len(batch))
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+            self._queue_delay_total += sum(delays)
+            self._queue_delay_max = max(self._queue_delay_max, max(delays))
+            self._encode_time_total += encode_time
+    
+    def stats(self):
+        """
+        Get batching metrics.
+        
+        Returns:
+            dict: Batch count, batch size distribution, and queueing delay /
+                encode time in milliseconds
+        """
+        with self._stats_lock:
+            batches = self._batches
+            return {
+                'batches': batches,
+                'items': self._items,
+                'mean_batch_size': self._items / batches if batches else 0.0,
+                'max_batch_size': self._max_batch_seen,
+                'batch_size_counts': dict(sorted(self._batch_sizes.items())),
+                'mean_queue_delay_ms': self._queue_delay_total / self._items * 1000 if self._items else 0.0,
+                'max_queue_delay_ms': self._queue_delay_max * 1000,
+                'mean_encode_ms': self._encode_time_total / batches * 1000 if batches else 0.0,
+                'max_batch_size_limit': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+            }
@@ -0,0 +1,237 @@
+"""Recall-vs-latency report for approximate FAISS index types.
+
+Run from the repository root:
+
+    python vector_store/index_benchmark.py
+    python -m vector_store.index_benchmark
+"""
+import sys
+import logging
+import time
+from pathlib import Path
+
+# Put the repository root first so this file can run as a script; the
+# script's own directory would otherwise shadow the vector_store package
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from config import Config
+from vector_store.vector_store import VectorStore, INDEX_TYPES
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+
+def recall_at_k(approx_indices, exact_indices, k):
+    """
+    Compute mean recall@k of approximate results against exact results.
+    
+    Args:
+        approx_indices: numpy array of shape (n_queries, k) from the ANN index
+        exact_indices: numpy array of shape (n_queries, k) from the Flat index
+        k: Cut-off
+    
+    Returns:
+        float: Fraction of exact top-k neighbours found by the ANN index
+    """
+    hits = 0
+    for approx_row, exact_row in zip(approx_indices[:, :k], exact_indices[:, :k]):
+        hits += len(set(approx_row[approx_row >= 0]) & set(exact_row))
+    return hits / float(len(exact_indices) * k)
+
+
+def _timed_search(vector_store, queries, k):
+    """Search queries one at a time, returning indices and per-query latency (ms)."""
+    all_indices = np.full((len(queries), k), -1, dtype='int64')
+    latencies = []
+    
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, indices = vector_store.index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        all_indices[i] = indices[0]
+    
+    return all_indices, np.array(latencies)
+
+
+def _exact_search(embeddings, queries, k, metric):
+    """Exact top-k neighbour ids from a Flat index with the same metric."""
+    exact_store = VectorStore(dimension=embeddings.shape[1], index_type='flat', metric=metric)
+    exact_store.index.add(exact_store._prepare_vectors(embeddings))
+    _, exact_indices = exact_store.index.search(exact_store._prepare_vectors(queries), k)
+    return exact_indices
+
+
+def evaluate_index(embeddings, queries, k=10, index_type='flat', index_params=None,
+                   exact_indices=None, metric=None):
+    """
+    Build an index of the given type and measure its recall@k and latency.
+    
+    Args:
+        embeddings: numpy array of catalogue vectors (n, dimension)
+        queries: numpy array of query vectors (n_queries, dimension)
+        k: Number of neighbours to retrieve
+        index_type: One of INDEX_TYPES
+        index_params: Build/search parameter overrides
+        exact_indices: Precomputed exact top-k (computed with a Flat index if None)
+        metric: Similarity metric (defaults to Config.VECTOR_METRIC)
+    
+    Returns:
+        dict: Recall and latency report
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    k = min(k, len(embeddings))
+    
+    if exact_indices is None:
+        exact_indices = _exact_search(embeddings, queries, k, metric)
+    
+    build_start = time.perf_counter()
+    vector_store = VectorStore(
+        dimension=embeddings.shape[1],
+        index_type=index_type,
+        index_params=index_params,
+        metric=metric
+    )
+    vectors = vector_store._prepare_vectors(embeddings)
+    vector_store._train_index(vectors)
+    vector_store.index.add(vectors)
+    build_time = time.perf_counter() - build_start
+    
+    indices, latencies = _timed_search(vector_store, vector_store._prepare_vectors(queries), k)
+    
+    return {
+        'index_type': index_type,
+        'metric': vector_store.metric,
+        'params': {
+            key: vector_store.index_params[key]
+            for key in ('nlist', 'nprobe', 'ef_search', 'hnsw_m', 'pq_m', 'pq_nbits')
+        },
+        'k': k,
+        'recall_at_k': recall_at_k(indices, exact_indices, k),
+        'build_time_s': build_time,
+        'latency_ms_p50': float(np.percentile(latencies, 50)),
+        'latency_ms_p95': float(np.percentile(latencies, 95)),
+    }
+
+
+def compare_index_types(embeddings, queries, k=10, index_types=INDEX_TYPES,
+                        nprobe_values=(1, 4, 16, 64), ef_search_values=(16, 32, 64, 128),
+                        metric=None):
+    """
+    Sweep index types and their query-time parameters against the exact Flat index.
+    
+    Args:
+        embeddings: numpy array of catalogue vectors
+        queries: numpy array of query vectors
+        k: Number of neighbours to retrieve
+        index_types: Index types to evaluate
+        nprobe_values: nprobe settings to try for IVF indexes
+        ef_search_values: efSearch settings to try for HNSW
+        metric: Similarity metric (defaults to Config.VECTOR_METRIC)
+    
+    Returns:
+        list: One report dict per (index type, parameter) combination
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    k = min(k, len(embeddings))
+    
+    exact_indices = _exact_search(embeddings, queries, k, metric)
+    
+    reports = []
+    for index_type in index_types:
+        if index_type == 'hnsw':
+            param_grid = [{'ef_search': ef} for ef in ef_search_values]
+        elif index_type in ('ivf_flat', 'ivf_pq'):
+            param_grid = [{'nprobe': nprobe} for nprobe in nprobe_values]
+        else:
+            param_grid = [{}]
+        
+        for params in param_grid:
+            try:
+                report = evaluate_index(
+                    embeddings, queries, k, index_type, params,
+                    exact_indices=exact_indices, metric=metric
+                )
+                reports.append(report)
+            except Exception as e:
+                logger.error(f"Failed to evaluate {index_type} with {params}: {e}")
+    
+    return reports
+
+
+def check_filtered_search(embeddings, metadata, queries, attribute_filter, k=5,
+                          index_types=('hnsw', 'ivf_flat', 'ivf_pq'), metric=None):
+    """
+    Assert that filtered search returns min(k, matching rows) results on each index type.
+    
+    The ID selector only applies to the IVF lists / HNSW nodes a search visits,
+    so a selective filter is the case most likely to come back short.
+    
+    Args:
+        embeddings: numpy array of catalogue vectors
+        metadata: Catalogue metadata dicts aligned with embeddings
+        queries: numpy array of query vectors
+        attribute_filter: AttributeFilter to search with (ideally selective)
+        k: Number of results to request
+        index_types: Index types to check
+        metric: Similarity metric (defaults to Config.VECTOR_METRIC)
+    
+    Returns:
+        dict: index type -> number of rows matching the filter
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    counts = {}
+    
+    for index_type in index_types:
+        vector_store = VectorStore(dimension=embeddings.shape[1], index_type=index_type, metric=metric)
+        vector_store.add_vectors(embeddings, list(metadata))
+        _, count = vector_store.get_attribute_index().bitmap(attribute_filter)
+        
+        for results in vector_store.search_batch(queries, k=k, filters=attribute_filter):
+            assert len(results) == min(k, count), (
+                f"{index_type}: filtered search returned {len(results)} of {min(k, count)} results"
+            )
+        counts[index_type] = count
+        logger.info(f"{index_type}: filtered search returned min(k, {count}) results for every query")
+    
+    return counts
+
+
+def print_report(reports):
+    """Print a recall/latency table for compare_index_types() output."""
+    print(f"\n{'Index':<10} {'Params':<18} {'Recall@k':>9} {'p50 ms':>8} {'p95 ms':>8} {'Build s':>8}")
+    print("-" * 66)
+    for report in reports:
+        if report['index_type'] == 'hnsw':
+            params = f"efSearch={report['params']['ef_search']}"
+        elif report['index_type'].startswith('ivf'):
+            params = f"nprobe={report['params']['nprobe']}"
+        else:
+            params = "exact"
+        print(
+            f"{report['index_type']:<10} {params:<18} {report['recall_at_k']:>9.3f} "
+            f"{report['latency_ms_p50']:>8.3f} {report['latency_ms_p95']:>8.3f} "
+            f"{report['build_time_s']:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    from embeddings.load_embeddings import embeddings_exist, load_embeddings
+    
+    if embeddings_exist():
+        embeddings, metadata = load_embeddings()
+        
+        # Use perturbed catalogue vectors as stand-in queries
+        rng = np.random.default_rng(42)
+        sample = rng.choice(len(embeddings), size=min(100, len(embeddings)), replace=False)
+        queries = embeddings[sample] + rng.normal(0, 0.01, size=(len(sample), embeddings.shape[1]))
+        
+        reports = compare_index_types(embeddings, queries, k=10)
+        print_report(reports)
+        
+        from vector_store.attribute_index import AttributeFilter
+        check_filtered_search(embeddings, metadata, queries, AttributeFilter(test_types='P'))
+    else:
+        logger.info("No embeddings found. Run build_embeddings.py first.")
@@ -0,0 +1,233 @@
+"""Rule-based extraction of hard constraints (duration, seniority, languages, test types) from queries."""
+import logging
+import re
+from config import Config
+from vector_store.attribute_index import AttributeFilter
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+_NUMBER_WORDS = {'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'half': 0.5}
+_NUMBER = r"\d+(?:\.\d+)?|an?|one|two|three|four|half"
+
+_DURATION_PATTERN = re.compile(
+    rf"\b(?P<low>{_NUMBER})(?:\s*(?:-|–|to)\s*(?P<high>{_NUMBER}))?\s*"
+    r"(?P<unit>hours?|hrs?|minutes?|mins?)\b"
+)
+_HALF_HOUR_PATTERN = re.compile(r"\bhalf an? hour\b")
+_HOUR_AND_HALF_PATTERN = re.compile(r"\b(?:an?|one) hour and a half\b")
+
+# Words just before a duration that tie it to the assessment rather than e.g. working hours
+_DURATION_CUES = re.compile(
+    r"(complet|long|within|budget|under|max|no more than|not be more than|not more than|"
+    r"less than|up ?to|duration|test|assessment|assesment|about|around|approximately|take)"
+)
+_DURATION_CUE_WINDOW = 60
+
+# Phrases that make a duration a lower bound, not a cap
+_MIN_DURATION_CUES = re.compile(r"(at least|minimum|min\.? of|(?<!no )(?<!not )(?<!not be )more than)\s*$")
+
+_SENIORITY_PATTERNS = (
+    ('executive', re.compile(r"\b(ceo|coo|cfo|cto|cio|chief|vp|vice president|director|head of|executive|c-suite)\b")),
+    ('entry', re.compile(
+        r"\b((?:new|fresh|recent) grad(?:uate)?s?|graduates|graduate (?:roles?|programm?e?s?|schemes?|hires?|trainees?)"
+        r"|freshers?|entry[- ]level|junior|interns?|internship|trainees?|campus)\b"
+    )),
+    ('senior', re.compile(
+        r"\b(senior|sr(?=\.)|principal|staff engineer|architect|team lead|tech lead"
+        r"|lead (?:engineer|developer|analyst|designer|consultant))\b"
+    )),
+    ('mid', re.compile(r"\b(mid[- ]level|intermediate|experienced)\b")),
+)
+_YEARS_PATTERN = re.compile(r"\b(\d+)\s*(?:-\s*(\d+)\s*)?\+?\s*(?:years?|yrs?)\b")
+
+LANGUAGE_PATTERNS = {
+    'java': r"\bjava\b",
+    'javascript': r"\b(?:javascript|js)\b",
+    'typescript': r"\btypescript\b",
+    'python': r"\bpython\b",
+    'sql': r"\b(?:sql|mysql|postgres(?:ql)?)\b",
+    'c#': r"(?<![a-z0-9])c#",
+    'c++': r"(?<![a-z0-9])c\+\+",
+    '.net': r"(?<![a-z0-9])\.net\b",
+    'php': r"\bphp\b",
+    'ruby': r"\bruby\b",
+    'scala': r"\bscala\b",
+    'kotlin': r"\bkotlin\b",
+    'swift': r"\bswift\b",
+    'html': r"\bhtml5?\b",
+    'css': r"\bcss3?\b",
+    'excel': r"\bexcel\b",
+    'selenium': r"\bselenium\b",
+    'english': r"\benglish\b",
+    'spanish': r"\bspanish\b",
+    'french': r"\bfrench\b",
+    'german': r"\bgerman\b",
+    'mandarin': r"\b(?:mandarin|chinese language)\b",
+}
+_LANGUAGE_PATTERNS = {name: re.compile(pattern) for name, pattern in LANGUAGE_PATTERNS.items()}
+
+# Explicit requests for a kind of test; these become hard test type filters
+_TEST_TYPE_PATTERNS = {
+    'P': re.compile(r"\b(personality|behaviou?ral) (?:tests?|assessments?|questionnaires?|profil\w*)\b"),
+    'S': re.compile(r"\b(situational judge?ment|sjt|simulations?)\b"),
+    'K': re.compile(r"\b(coding|programming|knowledge|technical skills?) (?:tests?|assessments?)\b"),
+}
+
+
+def _to_number(token):
+    """Parse a numeric token or number word."""
+    return _NUMBER_WORDS[token] if token in _NUMBER_WORDS else float(token)
+
+
+class QueryConstraints:
+    """
+    Constraints stated in a query.
+    
+    max_duration and test_types are hard constraints and become an
+    AttributeFilter for the vector search. seniority and languages are
+    descriptive hints; the catalogue has no attributes to filter them on.
+    """
+    
+    def __init__(self, max_duration=None, test_types=None, seniority=None, languages=None):
+        """
+        Initialize constraints.
+        
+        Args:
+            max_duration: Time available for the assessment, in minutes
+            test_types: Test type codes explicitly asked for (e.g. {"P"})
+            seniority: "entry", "mid", "senior" or "executive"
+            languages: Programming or spoken languages mentioned
+        """
+        self.max_duration = max_duration
+        self.test_types = set(test_types or ())
+        self.seniority = seniority
+        self.languages = list(languages or [])
+    
+    def is_empty(self):
+        """Whether nothing was extracted."""
+        return (self.max_duration is None and not self.test_types
+                and self.seniority is None and not self.languages)
+    
+    def to_filter(self):
+        """
+        Get the hard constraints as a vector search filter.
+        
+        Returns:
+            AttributeFilter: Filter on duration and test type (empty if neither was stated)
+        """
+        return AttributeFilter(test_types=sorted(self.test_types) or None, max_duration=self.max_duration)
+    
+    def to_dict(self):
+        """Serializable form, e.g. for logs and benchmark reports."""
+        return {
+            'max_duration': self.max_duration,
+            'test_types': sorted(self.test_types),
+            'seniority': self.seniority,
+            'languages': self.languages,
+        }
+    
+    def __repr__(self):
+        return f"QueryConstraints({self.to_dict()})"
+
+
+def extract_max_duration(text):
+    """
+    Extract the assessment time limit from lowercased query text.
+    
+    Handles "completed in 40 minutes", "about an hour", "30-40 mins long",
+    "not be more than 90 mins" and "1-2 hour long" (the upper end of a range
+    is the cap). In long texts only durations preceded by a cue word such as
+    "complete", "long" or "test" count, so e.g. working hours in a job
+    description are ignored.
+    
+    Args:
+        text: Lowercased query text
+    
+    Returns:
+        int: Limit in minutes, or None if the query doesn't state one
+    """
+    if _HOUR_AND_HALF_PATTERN.search(text):
+        return 90
+    if _HALF_HOUR_PATTERN.search(text):
+        return 30
+    
+    candidates = []
+    for match in _DURATION_PATTERN.finditer(text):
+        before = text[max(0, match.start() - _DURATION_CUE_WINDOW):match.start()]
+        if _MIN_DURATION_CUES.search(before):
+            continue
+        
+        value = _to_number(match.group('high') or match.group('low'))
+        minutes = value * 60 if match.group('unit').startswith('h') else value
+        candidates.append((bool(_DURATION_CUES.search(before)), int(round(minutes))))
+    
+    cued = [minutes for has_cue, minutes in candidates if has_cue]
+    if cued:
+        return cued[0]
+    if len(candidates) == 1:
+        return candidates[0][1]
+    return None
+
+
+def extract_seniority(text):
+    """
+    Extract the seniority level of the role from lowercased query text.
+    
+    Returns:
+        str: "executive", "entry", "senior" or "mid", or None
+    """
+    for level, pattern in _SENIORITY_PATTERNS:
+        if pattern.search(text):
+            return level
+    
+    # Fall back to required experience, e.g. "5 years of experience", "0-2 years"
+    for match in _YEARS_PATTERN.finditer(text):
+        window = text[match.start():match.end() + 30] + text[max(0, match.start() - 30):match.start()]
+        if 'experience' not in window:
+            continue
+        years = int(match.group(2) or match.group(1))
+        if years <= 2:
+            return 'entry'
+        return 'mid' if years < 5 else 'senior'
+    
+    return None
+
+
+def extract_constraints(query):
+    """
+    Extract constraints from a query or job description without an LLM call.
+    
+    Args:
+        query: Query text
+    
+    Returns:
+        QueryConstraints: Extracted constraints (empty if none were found)
+    """
+    text = " ".join(str(query or "").lower().split())
+    
+    constraints = QueryConstraints(
+        max_duration=extract_max_duration(text),
+        test_types={code for code, pattern in _TEST_TYPE_PATTERNS.items() if pattern.search(text)},
+        seniority=extract_seniority(text),
+        languages=[name for name, pattern in _LANGUAGE_PATTERNS.items() if pattern.search(text)],
+    )
+    
+    if not constraints.is_empty():
+        logger.debug(f"Extracted {constraints} from query '{text[:60]}'")
+    return constraints
+
+
+if __name__ == "__main__":
+    sample_queries = [
+        "I am hiring for Java developers who can also collaborate effectively with my business teams. "
+        "Looking for an assessment(s) that can be completed in 40 minutes.",
+        "I want to hire new graduates for a sales role, the budget is for about an hour for each test.",
+        "ICICI Bank Assistant Admin, Experience required 0-2 years, test should be 30-40 mins long",
+        "I want to hire a Senior Data Analyst with 5 years of experience and expertise in SQL, Excel "
+        "and Python. The assessment can be 1-2 hour long",
+        "Need a personality questionnaire for a COO, no more than half an hour",
+    ]
+    
+    for query in sample_queries:
+        print(f"{query[:70]}...\n  {extract_constraints(query).to_dict()}")
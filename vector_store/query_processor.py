@@ -1,8 +1,13 @@
 """Query processing and embedding generation."""
+import asyncio
 import logging
+import threading
 import numpy as np
 from config import Config
+from cache.lru_cache import LRUCache
 from embeddings.build_embeddings import EmbeddingGenerator
+from vector_store.embedding_batcher import EmbeddingBatcher
+from monitoring.metrics import stage_timer
 from preprocessing.clean_text import normalize_text_for_embedding
 
 logging.basicConfig(level=Config.LOG_LEVEL)
@@ -12,27 +17,52 @@ logger = logging.getLogger(__name__)
 class QueryProcessor:
     """Process queries and generate embeddings."""
     
-    def __init__(self, model_name=None):
+    def __init__(self, model_name=None, cache_size=None, cache_ttl=None, cache_path=None):
         """
         Initialize query processor.
         
         Args:
             model_name: Embedding model name (defaults to HuggingFace)
+            cache_size: Max in-memory cached query embeddings (defaults to
+                Config.QUERY_EMBEDDING_CACHE_SIZE, 0 disables)
+            cache_ttl: Cache entry lifetime in seconds (defaults to Config.QUERY_EMBEDDING_CACHE_TTL)
+            cache_path: SQLite file for a persistent cache tier (defaults to
+                Config.QUERY_EMBEDDING_CACHE_PATH, empty disables)
         """
         # Use HuggingFace by default due to API quota issues
         self.model_name = model_name or "sentence-transformers/all-MiniLM-L6-v2"
         self.generator = None
         # Lazy initialization - only create generator when needed
+        self._generator_lock = threading.Lock()
+        self.batcher = None
+        
+        if cache_size is None:
+            cache_size = Config.QUERY_EMBEDDING_CACHE_SIZE
+        if cache_ttl is None:
+            cache_ttl = Config.QUERY_EMBEDDING_CACHE_TTL
+        if cache_path is None:
+            cache_path = Config.QUERY_EMBEDDING_CACHE_PATH
+        
+        self.embedding_cache = LRUCache(max_size=cache_size, ttl=cache_ttl) if cache_size > 0 else None
+        self.disk_cache = None
+        if cache_path:
+            from cache.sqlite_cache import SQLiteCache
+            self.disk_cache = SQLiteCache(Config.BASE_DIR / cache_path, max_size=max(cache_size, 1) * 10, ttl=cache_ttl)
     
     def _initialize_generator(self):
         """Initialize embedding generator (lazy initialization)."""
-        if self.generator is None:
-            try:
-                self.generator = EmbeddingGenerator(self.model_name)
-                logger.info(f"Initialized query processor with model: {self.model_name}")
-            except Exception as e:
-                logger.error(f"Failed to initialize embedding generator: {e}")
-                raise
+        if self.generator is not None:
+            return
+        
+        # Concurrent API requests must not load the model twice
+        with self._generator_lock:
+            if self.generator is None:
+                try:
+                    self.generator = EmbeddingGenerator(self.model_name)
+                    logger.info(f"Initialized query processor with model: {self.model_name}")
+                except Exception as e:
+                    logger.error(f"Failed to initialize embedding generator: {e}")
+                    raise
     
     def process_query(self, query_text):
         """
@@ -63,22 +93,170 @@ class QueryProcessor:
         Returns:
             np.ndarray: Query embedding vector
         """
+        # Process query
+        with stage_timer('normalize'):
+            processed_query = self.process_query(query_text)
+        
+        # Cached embeddings skip model initialization entirely
+        embedding = self._get_cached_embedding(processed_query)
+        if embedding is not None:
+            return embedding
+        
         # Initialize generator if not already done (lazy initialization)
         self._initialize_generator()
         
-        # Process query
-        processed_query = self.process_query(query_text)
-        
         # Generate embedding
         try:
-            embedding = self.generator.generate_embedding(processed_query)
+            with stage_timer('embed'):
+                embedding = self.generator.generate_embedding(processed_query)
             logger.debug(f"Generated query embedding with shape: {embedding.shape}")
+            return self._cache_embedding(processed_query, embedding)
+        
+        except Exception as e:
+            logger.error(f"Failed to generate query embedding: {e}")
+            raise
+    
+    async def agenerate_query_embedding(self, query_text, executor=None):
+        """
+        Generate embedding for a query, coalescing concurrent callers into batches.
+        
+        Args:
+            query_text: Query string
+            executor: Executor for model loading and encode calls (None uses the loop default)
+        
+        Returns:
+            np.ndarray: Query embedding vector
+        """
+        with stage_timer('normalize'):
+            processed_query = self.process_query(query_text)
+        
+        embedding = self._get_cached_embedding(processed_query)
+        if embedding is not None:
             return embedding
         
+        if self.generator is None:
+            # Model loading is slow; keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(executor, self._initialize_generator)
+        
+        if self.batcher is None:
+            self.batcher = EmbeddingBatcher(self.generator.generate_embeddings, executor=executor)
+        
+        try:
+            with stage_timer('embed'):
+                embedding = await self.batcher.embed(processed_query)
+            return self._cache_embedding(processed_query, embedding)
+        
         except Exception as e:
             logger.error(f"Failed to generate query embedding: {e}")
             raise
     
+    def generate_query_embeddings(self, queries):
+        """
+        Generate embeddings for multiple queries with one encode call.
+        
+        Args:
+            queries: List of query strings
+        
+        Returns:
+            np.ndarray: Query embedding matrix of shape (len(queries), dimension)
+        """
+        with stage_timer('normalize'):
+            processed_queries = [self.process_query(query) for query in queries]
+        
+        # Look up every query first; only cache misses go to the model
+        cached = [self._get_cached_embedding(query) for query in processed_queries]
+        misses = [i for i, embedding in enumerate(cached) if embedding is None]
+        
+        if not misses:
+            return np.stack(cached)
+        
+        self._initialize_generator()
+        
+        try:
+            # Encode each distinct missing query once
+            missing_queries = list(dict.fromkeys(processed_queries[i] for i in misses))
+            with stage_timer('embed'):
+                new_embeddings = self.generator.generate_embeddings(missing_queries)
+            logger.debug(f"Generated {len(missing_queries)} query embeddings with shape: {new_embeddings.shape}")
+            
+            encoded = {
+                query: self._cache_embedding(query, embedding)
+                for query, embedding in zip(missing_queries, new_embeddings)
+            }
+            for i in misses:
+                cached[i] = encoded[processed_queries[i]]
+            
+            return np.stack(cached)
+        
+        except Exception as e:
+            logger.error(f"Failed to generate query embeddings: {e}")
+            raise
+    
+    def _cache_key(self, processed_query):
+        """Build the cache key for a normalized query."""
+        return f"{self.model_name}\x00{processed_query}"
+    
+    def _get_cached_embedding(self, processed_query):
+        """
+        Look up a normalized query in the memory cache, then the disk cache.
+        
+        Args:
+            processed_query: Output of process_query()
+        
+        Returns:
+            np.ndarray: Cached embedding, or None on a miss
+        """
+        key = self._cache_key(processed_query)
+        
+        if self.embedding_cache is not None:
+            embedding = self.embedding_cache.get(key)
+            if embedding is not None:
+                return embedding
+        
+        if self.disk_cache is not None:
+            data = self.disk_cache.get(key)
+            if data is not None:
+                embedding = np.frombuffer(data, dtype='float32')
+                if self.embedding_cache is not None:
+                    self.embedding_cache.set(key, embedding)
+                return embedding
+        
+        return None
+    
+    def _cache_embedding(self, processed_query, embedding):
+        """
+        Store a freshly generated embedding in the caches.
+        
+        Args:
+            processed_query: Output of process_query()
+            embedding: Embedding vector
+        
+        Returns:
+            np.ndarray: Read-only float32 copy of the embedding, as cached
+        """
+        embedding = np.array(embedding, dtype='float32')
+        # Cached arrays are shared between callers, so guard against mutation
+        embedding.setflags(write=False)
+        
+        key = self._cache_key(processed_query)
+        if self.embedding_cache is not None:
+            self.embedding_cache.set(key, embedding)
+        if self.disk_cache is not None:
+            self.disk_cache.set(key, embedding.tobytes())
+        
+        return embedding
+    
+    def get_cache_stats(self):
+        """Get hit/miss statistics for the query embedding caches."""
+        return {
+            'memory': self.embedding_cache.stats() if self.embedding_cache is not None else None,
+            'disk': self.disk_cache.stats() if self.disk_cache is not None else None,
+        }
+    
+    def get_batch_stats(self):
+        """Get micro-batching metrics for async query embedding (None before first use)."""
+        return self.batcher.stats() if self.batcher is not None else None
+    
     def expand_query(self, query_text):
         """
         Expand query with synonyms and related terms (optional enhancement).
@@ -0,0 +1,283 @@
+"""BM25 sparse index over catalogue text for hybrid keyword + vector retrieval."""
+import logging
+import os
+import re
+import tempfile
+from collections import Counter
+from pathlib import Path
+import numpy as np
+from config import Config
+from preprocessing.clean_text import create_embedding_text
+
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+SPARSE_INDEX_FILENAME = "sparse_index.npz"
+
+# Words, numbers and product codes, keeping the symbols that make a token
+# distinct: "c#", "c++", "g+", ".net", "node.js", "opq32r"
+_TOKEN_PATTERN = re.compile(r"\.?[a-z0-9]+(?:\.[a-z0-9]+)*[#+]*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can for from has have in is it its of on or our that the their "
+    "this to was we were which who will with you your".split()
+)
+
+
+def tokenize(text):
+    """
+    Split text into lowercased index terms.
+    
+    Args:
+        text: Text string
+    
+    Returns:
+        list: Terms in order of appearance, stopwords removed
+    """
+    return [token for token in _TOKEN_PATTERN.findall(str(text or "").lower()) if token not in STOPWORDS]
+
+
+class SparseIndex:
+    """
+    BM25 inverted index in CSR layout.
+    
+    Postings of term t are rows doc_ids[indptr[t]:indptr[t + 1]] with the
+    matching term_freqs. Per-posting BM25 impacts are precomputed, so scoring
+    a query is one slice per query term and a single np.bincount over the
+    matched postings.
+    """
+    
+    def __init__(self, vocabulary, indptr, doc_ids, term_freqs, doc_lengths, k1=None, b=None,
+                 index_version=None):
+        """
+        Initialize index from its arrays (use build() or load() to create one).
+        
+        Args:
+            vocabulary: dict of term -> term id
+            indptr: int64 array of length len(vocabulary) + 1 with posting offsets
+            doc_ids: int32 array of posting rows, grouped by term
+            term_freqs: float32 array of term frequencies, aligned with doc_ids
+            doc_lengths: float32 array of terms per row
+            k1: BM25 term frequency saturation (defaults to Config.BM25_K1)
+            b: BM25 length normalization (defaults to Config.BM25_B)
+            index_version: VectorStore.index_version the index was built for
+        """
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.k1 = Config.BM25_K1 if k1 is None else k1
+        self.b = Config.BM25_B if b is None else b
+        self.index_version = index_version
+        self.size = len(doc_lengths)
+        
+        self.impacts = self._impacts()
+    
+    def _impacts(self):
+        """BM25 score contribution of every posting."""
+        if len(self.doc_ids) == 0:
+            return np.zeros(0, dtype='float32')
+        
+        doc_freqs = np.diff(self.indptr).astype('float32')
+        idf = np.log1p((self.size - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        
+        avg_length = max(float(self.doc_lengths.mean()), 1.0)
+        length_norms = self.k1 * (1 - self.b + self.b * self.doc_lengths / avg_length)
+        
+        posting_terms = np.repeat(np.arange(len(doc_freqs)), np.diff(self.indptr))
+        tf = self.term_freqs
+        impacts = idf[posting_terms] * tf * (self.k1 + 1) / (tf + length_norms[self.doc_ids])
+        return impacts.astype('float32')
+    
+    @classmethod
+    def build(cls, products, k1=None, b=None, index_version=None):
+        """
+        Build the index from catalogue metadata.
+        
+        Args:
+            products: Sequence of metadata dicts; row positions match the FAISS ids
+            k1: BM25 k1 (defaults to Config.BM25_K1)
+            b: BM25 b (defaults to Config.BM25_B)
+            index_version: VectorStore.index_version of the rows
+        
+        Returns:
+            SparseIndex: Built index
+        """
+        vocabulary = {}
+        term_ids, rows, freqs = [], [], []
+        doc_lengths = np.zeros(len(products), dtype='float32')
+        
+        for row, product in enumerate(products):
+            # Same text the embeddings were built from, without the punctuation stripping
+            terms = tokenize(create_embedding_text(product, normalize=False))
+            doc_lengths[row] = len(terms)
+            for term, count in Counter(terms).items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                rows.append(row)
+                freqs.append(count)
+        
+        term_ids = np.array(term_ids, dtype='int64')
+        order = np.argsort(term_ids, kind='stable')
+        indptr = np.zeros(len(vocabulary) + 1, dtype='int64')
+        np.cumsum(np.bincount(term_ids, minlength=len(vocabulary)), out=indptr[1:])
+        
+        index = cls(
+            vocabulary,
+            indptr,
+            np.array(rows, dtype='int32')[order],
+            np.array(freqs, dtype='float32')[order],
+            doc_lengths,
+            k1=k1,
+            b=b,
+            index_version=index_version,
+        )
+        logger.info(f"Built BM25 index over {index.size} rows ({len(vocabulary)} terms, {len(rows)} postings)")
+        return index
+    
+    def search(self, query, k=10, allowed=None):
+        """
+        Rank rows by BM25 score for a query.
+        
+        Args:
+            query: Query text
+            k: Number of rows to return
+            allowed: Boolean mask of rows that may be returned (None allows all)
+        
+        Returns:
+            tuple: (rows, scores) arrays, best first; only rows sharing a term
+                with the query are returned
+        """
+        query_terms = Counter(term for term in tokenize(query) if term in self.vocabulary)
+        if not query_terms or k <= 0:
+            return np.zeros(0, dtype='int64'), np.zeros(0, dtype='float32')
+        
+        term_ids = [self.vocabulary[term] for term in query_terms]
+        slices = [slice(self.indptr[term_id], self.indptr[term_id + 1]) for term_id in term_ids]
+        doc_ids = np.concatenate([self.doc_ids[s] for s in slices])
+        # Repeated query terms count once per occurrence
+        weights = np.concatenate([self.impacts[s] * count for s, count in zip(slices, query_terms.values())])
+        
+        scores = np.bincount(doc_ids, weights=weights, minlength=self.size)
+        if allowed is not None:
+            scores[~allowed] = 0
+        
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return candidates, scores[candidates].astype('float32')
+    
+    def save(self, path):
+        """
+        Save the index next to index.faiss.
+        
+        The file is written to a temporary name and renamed into place, so
+        processes loading the store never read a partially written index.
+        
+        Args:
+            path: Vector store directory
+        """
+        index_path = Path(path) / SPARSE_INDEX_FILENAME
+        terms = np.empty(len(self.vocabulary), dtype=object)
+        for term, term_id in self.vocabulary.items():
+            terms[term_id] = term
+        
+        fd, tmp_path = tempfile.mkstemp(dir=index_path.parent, prefix=SPARSE_INDEX_FILENAME, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f,
+                    terms=terms.astype(str),
+                    indptr=self.indptr,
+                    doc_ids=self.doc_ids,
+                    term_freqs=self.term_freqs,
+                    doc_lengths=self.doc_lengths,
+                    params=np.array([self.k1, self.b], dtype='float64'),
+                    index_version=np.array(self.index_version or ""),
+                )
+            os.replace(tmp_path, index_path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        logger.info(f"Saved BM25 index to {index_path}")
+    
+    @classmethod
+    def load(cls, path):
+        """
+        Load an index saved with save().
+        
+        Args:
+            path: Vector store directory
+        
+        Returns:
+            SparseIndex: Loaded index, or None if the directory has none
+        """
+        index_path = Path(path) / SPARSE_INDEX_FILENAME
+        if not index_path.exists():
+            return None
+        
+        with np.load(index_path) as data:
+            k1, b = data['params'].tolist()
+            index = cls(
+                {term: term_id for term_id, term in enumerate(data['terms'].tolist())},
+                data['indptr'],
+                data['doc_ids'],
+                data['term_freqs'],
+                data['doc_lengths'],
+                k1=k1,
+                b=b,
+                index_version=str(data['index_version']) or None,
+            )
+        
+        logger.info(f"Loaded BM25 index from {index_path} ({len(index.vocabulary)} terms)")
+        return index
+
+
+def reciprocal_rank_fusion(rankings, weights=None, rrf_k=None):
+    """
+    Fuse ranked lists with weighted reciprocal rank fusion.
+    
+    Each list contributes weight / (rrf_k + rank) to the rows it contains.
+    
+    Args:
+        rankings: Lists of row ids, best first
+        weights: Weight per list (defaults to 1 each)
+        rrf_k: Rank offset damping the top ranks (defaults to Config.RRF_K)
+    
+    Returns:
+        list: (row, fused score) tuples, best first
+    """
+    rrf_k = Config.RRF_K if rrf_k is None else rrf_k
+    weights = weights or [1.0] * len(rankings)
+    
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, row in enumerate(ranking, 1):
+            fused[row] = fused.get(row, 0.0) + weight / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def weighted_score_fusion(scored_lists, weights=None):
+    """
+    Fuse scored lists by a weighted sum of min-max normalized scores.
+    
+    Args:
+        scored_lists: Lists of (row, score) tuples, higher scores better
+        weights: Weight per list (defaults to 1 each)
+    
+    Returns:
+        list: (row, fused score) tuples, best first
+    """
+    weights = weights or [1.0] * len(scored_lists)
+    
+    fused = {}
+    for scored, weight in zip(scored_lists, weights):
+        if not scored:
+            continue
+        scores = np.array([score for _, score in scored], dtype='float64')
+        low, spread = scores.min(), scores.max() - scores.min()
+        normalized = (scores - low) / spread if spread > 0 else np.ones_like(scores)
+        for (row, _), score in zip(scored, normalized):
+            fused[row] = fused.get(row, 0.0) + weight * float(score)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -1,34 +1,228 @@
 """FAISS-based vector store for similarity search."""
+import math
+import uuid
 import logging
 import numpy as np
 from pathlib import Path
 import faiss
 from config import Config
+from vector_store.attribute_index import AttributeIndex
+from vector_store.sparse_index import SparseIndex
+from preprocessing.chunk_products import product_key
 
 logging.basicConfig(level=Config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 
+INDEX_TYPES = ('flat', 'hnsw', 'ivf_flat', 'ivf_pq')
+METRICS = ('l2', 'cosine')
+
+
+def default_index_params():
+    """Get index build/search parameters from configuration."""
+    return {
+        'nlist': Config.FAISS_NLIST,
+        'nprobe': Config.FAISS_NPROBE,
+        'hnsw_m': Config.FAISS_HNSW_M,
+        'ef_construction': Config.FAISS_EF_CONSTRUCTION,
+        'ef_search': Config.FAISS_EF_SEARCH,
+        'pq_m': Config.FAISS_PQ_M,
+        'pq_nbits': Config.FAISS_PQ_NBITS,
+    }
+
+
 class VectorStore:
     """Vector store using FAISS for similarity search."""
     
-    def __init__(self, dimension=None):
+    def __init__(self, dimension=None, index_type=None, index_params=None, metric=None):
         """
         Initialize vector store.
         
         Args:
             dimension: Embedding dimension (defaults to Config.EMBEDDING_DIMENSION)
+            index_type: One of INDEX_TYPES (defaults to Config.FAISS_INDEX_TYPE)
+            index_params: Overrides for default_index_params() (nlist, nprobe, ef_search, ...)
+            metric: "l2" or "cosine" (defaults to Config.VECTOR_METRIC)
         """
         self.dimension = dimension or Config.EMBEDDING_DIMENSION
+        self.index_type = (index_type or Config.FAISS_INDEX_TYPE).lower()
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown index type '{self.index_type}'. Expected one of: {', '.join(INDEX_TYPES)}"
+            )
+        
+        self.metric = (metric or Config.VECTOR_METRIC).lower()
+        if self.metric not in METRICS:
+            raise ValueError(
+                f"Unknown metric '{self.metric}'. Expected one of: {', '.join(METRICS)}"
+            )
+        
+        self.index_params = default_index_params()
+        if index_params:
+            self.index_params.update(index_params)
+        
         self.index = None
         self.metadata = []
+        # Source (un-normalized) vectors, kept contiguous so save() can write them in bulk
+        self.embeddings = None
+        self.source_path = None
+        self.read_only = False
+        # Changes whenever the indexed data changes; used to invalidate caches
+        self.index_version = uuid.uuid4().hex
+        # Attribute bitsets for filtered search, rebuilt when index_version changes
+        self.attribute_index = None
+        self._attribute_index_version = None
+        # BM25 index over the same rows, persisted next to index.faiss
+        self.sparse_index = None
+        # Row -> product number, so chunks of one product can be collapsed
+        self.row_products = None
+        self.product_count = 0
+        self._row_products_version = None
         self._initialize_index()
     
     def _initialize_index(self):
         """Initialize FAISS index."""
-        # Use IndexFlatL2 for exact L2 distance search
-        self.index = faiss.IndexFlatL2(self.dimension)
-        logger.info(f"Initialized FAISS index with dimension {self.dimension}")
+        self.index = self._create_index()
+        self._apply_search_params()
+        logger.info(
+            f"Initialized FAISS {self.index_type} index ({self.metric}) with dimension {self.dimension}"
+        )
+    
+    def _create_index(self, num_training_vectors=None):
+        """
+        Create an empty FAISS index of the configured type.
+        
+        Args:
+            num_training_vectors: Size of the training set, used to cap nlist and
+                PQ bits for small catalogues (IVF indexes only)
+        
+        Returns:
+            faiss.Index: Untrained, empty index
+        """
+        params = self.index_params
+        metric_type = self._faiss_metric_type()
+        
+        if self.index_type == 'flat':
+            # Exact search (L2 distance or inner product on normalized vectors)
+            return faiss.IndexFlat(self.dimension, metric_type)
+        
+        if self.index_type == 'hnsw':
+            index = faiss.IndexHNSWFlat(self.dimension, params['hnsw_m'], metric_type)
+            index.hnsw.efConstruction = params['ef_construction']
+            return index
+        
+        nlist = params['nlist']
+        pq_nbits = params['pq_nbits']
+        if num_training_vectors is not None:
+            # k-means cannot produce more centroids than training points
+            nlist = max(1, min(nlist, num_training_vectors))
+            # PQ needs at least 2^nbits points to train each codebook
+            while pq_nbits > 1 and 2 ** pq_nbits > num_training_vectors:
+                pq_nbits -= 1
+        
+        quantizer = faiss.IndexFlat(self.dimension, metric_type)
+        
+        if self.index_type == 'ivf_flat':
+            index = faiss.IndexIVFFlat(quantizer, self.dimension, nlist, metric_type)
+        else:
+            if self.dimension % params['pq_m'] != 0:
+                raise ValueError(
+                    f"pq_m ({params['pq_m']}) must divide embedding dimension {self.dimension}"
+                )
+            index = faiss.IndexIVFPQ(
+                quantizer, self.dimension, nlist, params['pq_m'], pq_nbits, metric_type
+            )
+        
+        return index
+    
+    def _faiss_metric_type(self):
+        """Map the configured metric to a FAISS metric constant."""
+        if self.metric == 'cosine':
+            return faiss.METRIC_INNER_PRODUCT
+        return faiss.METRIC_L2
+    
+    def _prepare_vectors(self, vectors):
+        """
+        Convert vectors to a 2D float32 matrix, L2-normalizing rows for cosine search.
+        
+        Args:
+            vectors: numpy array of shape (dimension,) or (n, dimension)
+        
+        Returns:
+            np.ndarray: float32 array of shape (n, dimension)
+        """
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        # astype copies, so normalization never mutates the caller's array
+        vectors = np.ascontiguousarray(vectors.astype('float32'))
+        
+        if self.metric == 'cosine':
+            # Normalize the whole batch in one vectorized call
+            faiss.normalize_L2(vectors)
+        
+        return vectors
+    
+    def _to_similarity(self, distances):
+        """Convert raw FAISS scores to similarity scores (higher is better)."""
+        if self.metric == 'cosine':
+            # Inner product of unit vectors is cosine similarity
+            return distances
+        # Convert L2 distance to similarity score (inverse)
+        return 1.0 / (1.0 + distances)
+    
+    def _apply_search_params(self):
+        """Apply query-time tuning parameters (nprobe / efSearch) to the index."""
+        if self.index is None:
+            return
+        
+        if self.index_type == 'hnsw':
+            self.index.hnsw.efSearch = self.index_params['ef_search']
+        elif self.index_type in ('ivf_flat', 'ivf_pq'):
+            ivf_index = faiss.extract_index_ivf(self.index)
+            ivf_index.nprobe = min(self.index_params['nprobe'], ivf_index.nlist)
+    
+    def set_search_params(self, nprobe=None, ef_search=None):
+        """
+        Update query-time tuning parameters without rebuilding the index.
+        
+        Args:
+            nprobe: Number of IVF lists to visit per query
+            ef_search: HNSW candidate list size per query
+        """
+        if nprobe is not None:
+            self.index_params['nprobe'] = nprobe
+        if ef_search is not None:
+            self.index_params['ef_search'] = ef_search
+        self._apply_search_params()
+    
+    def _train_index(self, embeddings):
+        """
+        Train the index on the first batch of vectors if it requires training.
+        
+        Args:
+            embeddings: float32 numpy array of shape (n, dimension)
+        """
+        if self.index.is_trained:
+            return
+        
+        # Rebuild with parameters sized for the available training data
+        self.index = self._create_index(num_training_vectors=len(embeddings))
+        logger.info(f"Training {self.index_type} index on {len(embeddings)} vectors")
+        self.index.train(embeddings)
+        # IVF lists need a direct map so save() can reconstruct vectors by id
+        faiss.extract_index_ivf(self.index).make_direct_map()
+        self._apply_search_params()
+    
+    @staticmethod
+    def _detect_index_type(index):
+        """Infer the index type name from a loaded FAISS index."""
+        if isinstance(index, faiss.IndexHNSW):
+            return 'hnsw'
+        if isinstance(index, faiss.IndexIVFPQ):
+            return 'ivf_pq'
+        if isinstance(index, faiss.IndexIVF):
+            return 'ivf_flat'
+        return 'flat'
     
     def add_vectors(self, embeddings, metadata):
         """
@@ -38,76 +232,317 @@ class VectorStore:
             embeddings: numpy array of shape (n, dimension)
             metadata: list of metadata dictionaries (length n)
         """
+        if self.read_only:
+            raise RuntimeError(
+                "Vector store was loaded memory-mapped (read-only); load it with mmap=False to add vectors"
+            )
+        
         if len(embeddings) != len(metadata):
             raise ValueError(
                 f"Embeddings ({len(embeddings)}) and metadata ({len(metadata)}) length mismatch"
             )
         
-        # Ensure embeddings are float32
-        embeddings = embeddings.astype('float32')
+        source_embeddings = np.asarray(embeddings, dtype='float32')
+        if source_embeddings.ndim == 1:
+            source_embeddings = source_embeddings.reshape(1, -1)
         
         # Verify dimension
-        if embeddings.shape[1] != self.dimension:
+        if source_embeddings.shape[1] != self.dimension:
             raise ValueError(
-                f"Embedding dimension {embeddings.shape[1]} doesn't match index dimension {self.dimension}"
+                f"Embedding dimension {source_embeddings.shape[1]} doesn't match index dimension {self.dimension}"
             )
         
-        # Add to index
+        # Source vectors already in the index (memory-mapped if loaded from disk)
+        existing = self.get_embeddings()
+        
+        # Ensure embeddings are float32 (and unit length for cosine)
+        embeddings = self._prepare_vectors(source_embeddings)
+        
+        # Train (IVF indexes only) and add to index
+        self._train_index(embeddings)
         self.index.add(embeddings)
+        
+        # Keep source vectors contiguous alongside the index
+        if existing is None or len(existing) == 0:
+            self.embeddings = np.ascontiguousarray(source_embeddings)
+        else:
+            self.embeddings = np.concatenate([existing, source_embeddings])
+        self.source_path = None
+        self.index_version = uuid.uuid4().hex
+        
+        if not isinstance(self.metadata, list):
+            self.metadata = list(self.metadata)
         self.metadata.extend(metadata)
         
         logger.info(f"Added {len(embeddings)} vectors to index (total: {self.index.ntotal})")
     
-    def search(self, query_embedding, k=5):
+    def get_attribute_index(self):
+        """
+        Get the attribute bitset index, building it if the indexed data changed.
+        
+        Returns:
+            AttributeIndex: Index over the current metadata
+        """
+        if self.attribute_index is None or self._attribute_index_version != self.index_version:
+            self.attribute_index = AttributeIndex(self.metadata)
+            self._attribute_index_version = self.index_version
+        return self.attribute_index
+    
+    def get_row_products(self):
+        """
+        Get the product each row belongs to, rebuilding the mapping if stale.
+        
+        Chunks of one product ("<id>_chunk_<i>" rows) share a product number.
+        A lazily loaded MetadataStore is grouped on its stored id array, so
+        no rows are decoded.
+        
+        Returns:
+            tuple: (row_products, product_count) with an int32 array mapping
+                row -> product number in [0, product_count)
+        """
+        if self.row_products is None or self._row_products_version != self.index_version:
+            ids = getattr(self.metadata, 'ids', None)
+            if ids is not None:
+                # Same key as product_key(): the id up to any "_chunk_<i>" suffix
+                keys = np.char.partition(np.asarray(ids), b'_chunk_')[:, 0]
+                products, row_products = np.unique(keys, return_inverse=True)
+                self.row_products = row_products.astype('int32')
+                self.product_count = len(products)
+            else:
+                numbers = {}
+                self.row_products = np.fromiter(
+                    (numbers.setdefault(product_key(row), len(numbers)) for row in self.metadata),
+                    dtype='int32',
+                    count=len(self.metadata)
+                )
+                self.product_count = len(numbers)
+            self._row_products_version = self.index_version
+        return self.row_products, self.product_count
+    
+    def get_sparse_index(self):
+        """
+        Get the BM25 index over the current metadata, rebuilding it in memory
+        if missing or stale (save() persists it).
+        
+        Returns:
+            SparseIndex: Index over the current metadata
+        """
+        if self.sparse_index is None or self.sparse_index.index_version != self.index_version:
+            self.sparse_index = SparseIndex.build(self.metadata, index_version=self.index_version)
+        return self.sparse_index
+    
+    def sparse_search(self, query, k=5, filters=None):
+        """
+        Rank products by BM25 keyword score.
+        
+        Args:
+            query: Query text
+            k: number of results to return
+            filters: AttributeFilter restricting which products can be returned
+        
+        Returns:
+            list: List of result dicts (rank, index, bm25_score, metadata); only
+                products sharing a term with the query are returned
+        """
+        sparse_index = self.get_sparse_index()
+        
+        allowed = None
+        if filters is not None and not filters.is_empty():
+            bitmap, count = self.get_attribute_index().bitmap(filters)
+            if count == 0:
+                return []
+            allowed = np.unpackbits(bitmap, count=sparse_index.size, bitorder='little').astype(bool)
+        
+        rows, scores = sparse_index.search(query, k=k, allowed=allowed)
+        return [
+            {
+                'rank': rank,
+                'index': int(row),
+                'bm25_score': float(score),
+                'metadata': self.metadata[row]
+            }
+            for rank, (row, score) in enumerate(zip(rows, scores), 1)
+        ]
+    
+    def score_rows(self, query_embedding, rows):
+        """
+        Score a query against specific rows exactly, e.g. keyword hits the
+        vector search didn't return.
+        
+        Args:
+            query_embedding: numpy array of shape (dimension,) or (1, dimension)
+            rows: Row ids to score
+        
+        Returns:
+            tuple: (distances, similarities) arrays aligned with rows, on the
+                same scale as search()
+        """
+        query = self._prepare_vectors(query_embedding)[0]
+        vectors = self._prepare_vectors(np.asarray(self.get_embeddings()[np.asarray(rows, dtype='int64')]))
+        
+        if self.metric == 'cosine':
+            distances = vectors @ query
+        else:
+            # FAISS reports squared L2 distances
+            distances = ((vectors - query) ** 2).sum(axis=1)
+        return distances, self._to_similarity(distances)
+    
+    def _search_parameters(self, selector, count, k):
+        """
+        Build FAISS search parameters restricting results to selected ids.
+        
+        Parameters passed to a search replace the index's own nprobe/efSearch,
+        so those are carried over. The selector only applies to the lists or
+        graph nodes the search visits, so both are scaled up by 1/selectivity
+        to keep about as many selected candidates as an unfiltered search.
+        
+        Args:
+            selector: faiss.IDSelector for the selected rows
+            count: Number of selected rows
+            k: Number of results wanted
+        """
+        scale = self.index.ntotal / max(count, 1)
+        if self.index_type == 'hnsw':
+            ef_search = max(math.ceil(self.index_params['ef_search'] * scale), k)
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=min(ef_search, self.index.ntotal))
+        if self.index_type in ('ivf_flat', 'ivf_pq'):
+            nlist = faiss.extract_index_ivf(self.index).nlist
+            nprobe = math.ceil(self.index_params['nprobe'] * scale)
+            return faiss.SearchParametersIVF(sel=selector, nprobe=min(nprobe, nlist))
+        return faiss.SearchParameters(sel=selector)
+    
+    def _exact_filtered_search(self, query, bitmap, k):
+        """
+        Score every selected row against one (prepared) query.
+        
+        Fallback for approximate indexes whose filtered search came back with
+        fewer than k results.
+        
+        Returns:
+            tuple: (distances, indices) arrays of length k, best first
+        """
+        rows = np.flatnonzero(np.unpackbits(bitmap, count=self.index.ntotal, bitorder='little'))
+        distances, _ = self.score_rows(query, rows)
+        # Inner product is higher-better, L2 distance lower-better
+        order_keys = -distances if self.metric == 'cosine' else distances
+        best = np.argsort(order_keys, kind='stable')[:k]
+        return distances[best], rows[best]
+    
+    def search(self, query_embedding, k=5, filters=None):
         """
         Search for top-k most similar vectors.
         
         Args:
             query_embedding: numpy array of shape (dimension,) or (1, dimension)
             k: number of results to return
+            filters: AttributeFilter restricting which products can be returned
         
         Returns:
-            list: List of tuples (index, distance, metadata)
+            list: List of result dicts (rank, index, distance, similarity_score, metadata)
         """
+        return self.search_batch(query_embedding, k=k, filters=filters)[0]
+    
+    def search_batch(self, query_embeddings, k=5, filters=None):
+        """
+        Search for top-k most similar vectors for several queries in one FAISS call.
+        
+        Filters are applied inside FAISS through an ID selector, so the filtered
+        top-k is exact (for the flat index) rather than a post-filtered subset.
+        Approximate indexes widen their search for selective filters and fall
+        back to exact scoring of the selected rows if they still return fewer
+        than min(k, matching rows) results.
+        
+        Args:
+            query_embeddings: numpy array of shape (n, dimension) or (dimension,)
+            k: number of results to return per query
+            filters: AttributeFilter restricting which products can be returned
+        
+        Returns:
+            list: One result list per query row, each as returned by search()
+        """
+        # Ensure queries are 2D and float32 (and unit length for cosine)
+        query_embeddings = self._prepare_vectors(query_embeddings)
+        
         if self.index.ntotal == 0:
             logger.warning("Index is empty")
-            return []
-        
-        # Ensure query is 2D and float32
-        if query_embedding.ndim == 1:
-            query_embedding = query_embedding.reshape(1, -1)
-        query_embedding = query_embedding.astype('float32')
+            return [[] for _ in range(len(query_embeddings))]
         
         # Limit k to available vectors
         k = min(k, self.index.ntotal)
         
-        # Search
-        distances, indices = self.index.search(query_embedding, k)
+        params = None
+        bitmap = None
+        if filters is not None and not filters.is_empty():
+            bitmap, count = self.get_attribute_index().bitmap(filters)
+            if count == 0:
+                logger.info(f"No products match {filters}")
+                return [[] for _ in range(len(query_embeddings))]
+            
+            # bitmap must outlive the search; the selector only holds a pointer to it
+            selector = faiss.IDSelectorBitmap(len(bitmap) * 8, faiss.swig_ptr(bitmap))
+            params = self._search_parameters(selector, count, k)
+            k = min(k, count)
+        
+        # Search all queries at once
+        distances, indices = self.index.search(query_embeddings, k, params=params)
+        
+        if bitmap is not None and self.index_type != 'flat':
+            # Approximate indexes can still miss selected rows; score those queries exactly
+            short = np.flatnonzero((indices >= 0).sum(axis=1) < k)
+            if len(short):
+                logger.info(f"Filtered ANN search returned fewer than {k} results, scoring exactly")
+            for row in short:
+                distances[row], indices[row] = self._exact_filtered_search(query_embeddings[row], bitmap, k)
+        
+        similarities = self._to_similarity(distances)
         
         # Prepare results
-        results = []
-        for i, (idx, dist) in enumerate(zip(indices[0], distances[0])):
-            if idx < len(self.metadata):
-                # Convert L2 distance to similarity score (inverse)
-                # Lower distance = higher similarity
-                similarity_score = 1.0 / (1.0 + dist)
-                
-                results.append({
-                    'rank': i + 1,
-                    'index': int(idx),
-                    'distance': float(dist),
-                    'similarity_score': float(similarity_score),
-                    'metadata': self.metadata[idx]
-                })
-        
-        return results
-    
-    def save(self, path=None):
+        all_results = []
+        for row_indices, row_distances, row_similarities in zip(indices, distances, similarities):
+            results = []
+            for idx, dist, similarity_score in zip(row_indices, row_distances, row_similarities):
+                if 0 <= idx < len(self.metadata):
+                    results.append({
+                        'rank': len(results) + 1,
+                        'index': int(idx),
+                        'distance': float(dist),
+                        'similarity_score': float(similarity_score),
+                        'metadata': self.metadata[idx]
+                    })
+            all_results.append(results)
+        
+        return all_results
+    
+    def get_embeddings(self):
+        """
+        Get the source embeddings for all vectors in the index.
+        
+        Vectors added in this process are returned directly; for a loaded store
+        embeddings.npy is memory-mapped on first use rather than read eagerly.
+        
+        Returns:
+            np.ndarray: Array of shape (ntotal, dimension), or None if the store is empty
+        """
+        if self.embeddings is None and self.source_path is not None:
+            embeddings_path = self.source_path / "embeddings.npy"
+            if embeddings_path.exists():
+                self.embeddings = np.load(embeddings_path, mmap_mode='r')
+        
+        if self.embeddings is None and self.index is not None and self.index.ntotal > 0:
+            # Legacy store without embeddings.npy: recover vectors in one bulk call
+            logger.warning("Source embeddings unavailable, reconstructing from index")
+            self.embeddings = self.index.reconstruct_n(0, self.index.ntotal)
+        
+        return self.embeddings
+    
+    def save(self, path=None, include_data=True):
         """
         Save index and metadata to disk.
         
         Args:
             path: Directory path (defaults to Config.VECTOR_STORE_DIR)
+            include_data: Also write embeddings.npy and metadata. Pass False when
+                they are already on disk at path (e.g. when building from them)
         """
         if path is None:
             path = Config.VECTOR_STORE_DIR
@@ -121,23 +556,48 @@ class VectorStore:
         faiss.write_index(self.index, str(index_path))
         logger.info(f"Saved FAISS index to {index_path}")
         
-        # Save metadata using embeddings module
-        from embeddings.load_embeddings import save_embeddings
+        from embeddings.load_embeddings import save_embeddings, save_embedding_info
+        
+        extra_info = {
+            'metric': self.metric,
+            'index_type': self.index_type,
+            'index_version': self.index_version,
+        }
+        
+        # Data loaded from this directory is unchanged; rewriting it would also
+        # clobber files that may be memory-mapped
+        unchanged_on_disk = (
+            self.source_path is not None and self.source_path.resolve() == path.resolve()
+        )
         
-        # Get embeddings from index
-        embeddings = np.zeros((self.index.ntotal, self.dimension), dtype='float32')
-        for i in range(self.index.ntotal):
-            embeddings[i] = self.index.reconstruct(int(i))
+        self.get_sparse_index().save(path)
         
-        save_embeddings(embeddings, self.metadata, path)
+        if not include_data or unchanged_on_disk:
+            save_embedding_info(self.index.ntotal, self.dimension, path, extra_info=extra_info)
+            return
+        
+        embeddings = self.get_embeddings()
+        if embeddings is None:
+            embeddings = np.zeros((0, self.dimension), dtype='float32')
+        
+        metadata = self.metadata if isinstance(self.metadata, list) else list(self.metadata)
+        
+        save_embeddings(embeddings, metadata, path, extra_info=extra_info)
     
-    def load(self, path=None):
+    def load(self, path=None, mmap=None):
         """
         Load index and metadata from disk.
         
         Args:
             path: Directory path (defaults to Config.VECTOR_STORE_DIR)
+            mmap: Memory-map the FAISS index instead of reading it into memory
+                (defaults to Config.VECTOR_STORE_MMAP). The store is then
+                read-only, but loads near-instantly and its pages are shared
+                between worker processes through the OS page cache.
         """
+        if mmap is None:
+            mmap = Config.VECTOR_STORE_MMAP
+        
         if path is None:
             path = Config.VECTOR_STORE_DIR
         else:
@@ -148,35 +608,106 @@ class VectorStore:
         if not index_path.exists():
             raise FileNotFoundError(f"FAISS index not found at {index_path}")
         
-        self.index = faiss.read_index(str(index_path))
+        # Refuse to serve an index built for a different similarity metric
+        from embeddings.load_embeddings import load_embedding_info
+        info = load_embedding_info(path)
+        stored_metric = info.get('metric', 'l2')
+        if stored_metric != self.metric:
+            raise ValueError(
+                f"Vector store at {path} was built with metric '{stored_metric}' "
+                f"but '{self.metric}' was requested. Rebuild the index or set VECTOR_METRIC={stored_metric}"
+            )
+        
+        self.index = self._read_index(index_path, mmap)
+        self.embeddings = None
+        self.source_path = path
+        
+        # Legacy stores have no recorded version; derive one from the index file
+        index_stat = index_path.stat()
+        self.index_version = info.get(
+            'index_version', f"{int(index_stat.st_mtime)}-{index_stat.st_size}"
+        )
+        if self.index.metric_type != self._faiss_metric_type():
+            raise ValueError(
+                f"FAISS index at {index_path} does not use the '{self.metric}' metric"
+            )
         self.dimension = self.index.d
-        logger.info(f"Loaded FAISS index from {index_path} ({self.index.ntotal} vectors)")
+        self.index_type = self._detect_index_type(self.index)
+        self._apply_search_params()
+        logger.info(
+            f"Loaded FAISS {self.index_type} index from {index_path} ({self.index.ntotal} vectors)"
+        )
         
-        # Load metadata
-        from embeddings.load_embeddings import load_embeddings
-        _, self.metadata = load_embeddings(path)
+        # Load metadata only; the embeddings are already in the index. Rows are
+        # decoded on access, so search only decodes the k results it returns.
+        # The attribute bitsets decode every row, so they are built on the
+        # first filtered search rather than here
+        from embeddings.load_embeddings import load_metadata
+        self.metadata = load_metadata(path)
         
         # Verify consistency
         if self.index.ntotal != len(self.metadata):
             logger.warning(
                 f"Index has {self.index.ntotal} vectors but {len(self.metadata)} metadata items"
             )
+        
+        self.get_row_products()
+        
+        # The BM25 index is written by the offline build; building it here
+        # would decode every row, so a missing one is built on first use
+        self.sparse_index = SparseIndex.load(path)
+        if self.sparse_index is None or self.sparse_index.index_version != self.index_version:
+            logger.warning(
+                f"BM25 index at {path} is missing or stale; it will be built in memory on the "
+                "first hybrid search. Rebuild the vector store to persist it"
+            )
+            self.sparse_index = None
+    
+    def _read_index(self, index_path, mmap):
+        """
+        Read a FAISS index, memory-mapping it when requested and supported.
+        
+        Args:
+            index_path: Path to index.faiss
+            mmap: Whether to memory-map the index
+        
+        Returns:
+            faiss.Index: Loaded index
+        """
+        self.read_only = False
+        
+        if mmap:
+            try:
+                index = faiss.read_index(
+                    str(index_path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+                )
+                self.read_only = True
+                return index
+            except RuntimeError as e:
+                logger.warning(f"Memory-mapped index load not supported ({e}), reading into memory")
+        
+        return faiss.read_index(str(index_path))
     
     def get_stats(self):
         """Get statistics about the vector store."""
         return {
             'total_vectors': self.index.ntotal if self.index else 0,
             'dimension': self.dimension,
+            'index_type': self.index_type,
+            'metric': self.metric,
+            'index_version': self.index_version,
             'metadata_count': len(self.metadata)
         }
 
 
-def build_vector_store_from_embeddings(embeddings_path=None):
+def build_vector_store_from_embeddings(embeddings_path=None, index_type=None, metric=None):
     """
     Build vector store from saved embeddings.
     
     Args:
         embeddings_path: Path to embeddings directory
+        index_type: FAISS index type (defaults to Config.FAISS_INDEX_TYPE)
+        metric: Similarity metric (defaults to Config.VECTOR_METRIC)
     
     Returns:
         VectorStore: Initialized vector store
@@ -191,11 +722,17 @@ def build_vector_store_from_embeddings(embeddings_path=None):
     dimension = info.get('embedding_dimension', embeddings.shape[1])
     
     # Create vector store
-    vector_store = VectorStore(dimension=dimension)
+    vector_store = VectorStore(dimension=dimension, index_type=index_type, metric=metric)
     vector_store.add_vectors(embeddings, metadata)
     
-    # Save as FAISS index
-    vector_store.save(embeddings_path)
+    # Save as FAISS index (embeddings and metadata are already in this directory)
+    vector_store.save(embeddings_path, include_data=False)
+    
+    # Convert legacy metadata.json stores to the binary metadata store
+    from embeddings.metadata_store import metadata_store_exists, write_metadata_store
+    store_path = Path(embeddings_path) if embeddings_path else Config.VECTOR_STORE_DIR
+    if not metadata_store_exists(store_path):
+        write_metadata_store(metadata, store_path)
     
     logger.info("Vector store built successfully")
     return vector_store